@@ -33,6 +33,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'tedx_finance.metrics.MetricsMiddleware',  # Prometheus request/query/export metrics
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -41,6 +42,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'simple_history.middleware.HistoryRequestMiddleware',
     'tedx_finance.audit.AuditLoggingMiddleware',  # Audit logging middleware
+    'tedx_finance.performance.PerformanceSampleMiddleware',  # request samples for the staff performance page
+    'tedx_finance.instrumentation.RequestTimingMiddleware',  # Server-Timing / query timing
+    'tedx_finance.profiling.ProfilingMiddleware',  # cProfile capture for staff (signed token)
 ]
 
 ROOT_URLCONF = 'realtime_tedx.urls'
@@ -111,6 +115,61 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Proof delivery: 'django' streams files from the worker (with Range/ETag support);
+# 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache/lighttpd) hands the transfer
+# to the front-end server after the permission check.
+PROOF_SERVE_METHOD = os.getenv('PROOF_SERVE_METHOD', 'django')
+# nginx 'internal' location that aliases MEDIA_ROOT (used with x-accel-redirect)
+PROOF_ACCEL_REDIRECT_PREFIX = os.getenv('PROOF_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+# Uploaded proofs never change under the same name, so clients may cache them for long
+PROOF_CACHE_MAX_AGE = int(os.getenv('PROOF_CACHE_MAX_AGE', str(60 * 60 * 24 * 365)))
+
+# Dashboard KPI snapshots: refresh stale ones in a background thread (False = inline, in the request)
+KPI_SNAPSHOT_BACKGROUND_REFRESH = env_bool('KPI_SNAPSHOT_BACKGROUND_REFRESH', True)
+
+# Per-request query count/time, template time and total time as Server-Timing headers
+# and 'tedx_finance.timing' log lines (exposes timings to clients; on by default in DEBUG only)
+REQUEST_TIMING_ENABLED = env_bool('REQUEST_TIMING_ENABLED', DEBUG)
+
+# Slow-query log: statements slower than this (ms) are logged with their EXPLAIN plan (0 = off)
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '500'))
+# Rotating log file for slow queries (empty = 'tedx_finance.slow_queries' logger only)
+SLOW_QUERY_LOG_FILE = os.getenv('SLOW_QUERY_LOG_FILE', '')
+# Also keep slow queries in the SlowQuery table (browsable, grouped by fingerprint, in the admin)
+SLOW_QUERY_STORE = env_bool('SLOW_QUERY_STORE', False)
+
+# Prometheus metrics at /metrics: collection on/off, and the bearer token scrapers send
+# (without a token only logged-in staff can read them)
+METRICS_ENABLED = env_bool('METRICS_ENABLED', True)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Directory shared by the gunicorn workers for their metric files (default: <tmp>/tedx_finance_metrics)
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+# How often (seconds) a worker writes its metrics for the others to see
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '5'))
+
+# Staff request profiling (?_profile=<token> or X-Profile-Token header; tokens on the admin page)
+PROFILING_ENABLED = env_bool('PROFILING_ENABLED', True)
+# Where .prof and collapsed-stack flamegraph files are written (not served to the web)
+PROFILING_DIR = os.getenv('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+# Seconds a profiling token stays valid
+PROFILING_TOKEN_MAX_AGE = int(os.getenv('PROFILING_TOKEN_MAX_AGE', '3600'))
+
+# Request samples behind the staff performance page (/performance/): on/off, share of
+# requests sampled (0-1), rows kept, and how often a worker writes its buffered samples
+PERFORMANCE_SAMPLING_ENABLED = env_bool('PERFORMANCE_SAMPLING_ENABLED', True)
+PERFORMANCE_SAMPLE_RATE = float(os.getenv('PERFORMANCE_SAMPLE_RATE', '1.0'))
+PERFORMANCE_SAMPLE_CAPACITY = int(os.getenv('PERFORMANCE_SAMPLE_CAPACITY', '10000'))
+PERFORMANCE_SAMPLE_FLUSH_SIZE = int(os.getenv('PERFORMANCE_SAMPLE_FLUSH_SIZE', '20'))
+PERFORMANCE_SAMPLE_FLUSH_SECONDS = float(os.getenv('PERFORMANCE_SAMPLE_FLUSH_SECONDS', '10'))
+
+# Export memory guard (Excel, ZIP with proofs, proof PDF): output moves to a temporary file
+# past the spool threshold and the export is aborted past the limit (MB of worker growth, 0 = off).
+# Growth is read from the worker's RSS (Linux). EXPORT_TRACEMALLOC adds tracemalloc accounting for
+# diagnostics only: it slows allocation in every thread of the worker while an export runs.
+EXPORT_MEMORY_SPOOL_MB = float(os.getenv('EXPORT_MEMORY_SPOOL_MB', '64'))
+EXPORT_MEMORY_LIMIT_MB = float(os.getenv('EXPORT_MEMORY_LIMIT_MB', '256'))
+EXPORT_TRACEMALLOC = env_bool('EXPORT_TRACEMALLOC', False)
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CRISPY_ALLOWED_TEMPLATE_PACKS = "tailwind"
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from tedx_finance.metrics import metrics_view
 from tedx_finance.views import login_view, signup
 from django.contrib.auth.views import (
     LogoutView,
@@ -13,6 +14,7 @@ from django.contrib.auth.views import (
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     
     # Custom auth routes (email verification)
     path('signup/', signup, name='signup'),
@@ -1,32 +1,53 @@
+import os
+
 from django.contrib import admin
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db.models import Avg, Count, Max, Sum
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
 from simple_history.admin import SimpleHistoryAdmin
 from .models import (
-    ManagementFund, Sponsor, Transaction, Budget, Category,
-    AuditLog, LoginAttempt, EmailVerification, Notification
+    ManagementFund, Sponsor, SponsorTier, Transaction, Budget, Category,
+    AuditLog, LoginAttempt, EmailVerification, ExportLog, Notification, ProfileCapture, SlowQuery
 )
 
 @admin.register(ManagementFund)
 class ManagementFundAdmin(SimpleHistoryAdmin):
+    history_list_display = ('history_changed_fields',)
     # FIX: Changed 'initial_amount' to 'amount' to match the model
     list_display = ('amount', 'date_received')
     search_fields = ('amount',)
 
 @admin.register(Sponsor)
 class SponsorAdmin(SimpleHistoryAdmin):
+    history_list_display = ('history_changed_fields',)
     list_display = ('name', 'amount', 'date_received')
     search_fields = ('name',)
     list_filter = ('date_received',)
 
+@admin.register(SponsorTier)
+class SponsorTierAdmin(admin.ModelAdmin):
+    list_display = ('name', 'min_amount', 'badge_class')
+    ordering = ('-min_amount',)
+
 @admin.register(Transaction)
 class TransactionAdmin(SimpleHistoryAdmin):
-    list_display = ('title', 'amount', 'category', 'date', 'created_by', 'approved')
+    history_list_display = ('history_changed_fields',)
+    list_display = ('title', 'amount', 'category_ref', 'date', 'created_by', 'approved')
     # FIX: Changed 'user' to 'created_by' to match the model
-    list_filter = ('category', 'approved', 'created_by')
+    list_filter = ('category_ref', 'approved', 'created_by')
+    list_select_related = ('category_ref', 'created_by')
     search_fields = ('title', 'created_by__username')
     actions = ['approve_transactions']
 
     def approve_transactions(self, request, queryset):
-        queryset.update(approved=True)
+        from .approvals import approve_matching
+        result = approve_matching(queryset, request.user, ip_address=getattr(request, 'client_ip', None))
+        self.message_user(request, f"{result['count']} transaction(s) approved.")
     approve_transactions.short_description = "Mark selected transactions as approved"
 
 
@@ -34,12 +55,15 @@ class TransactionAdmin(SimpleHistoryAdmin):
 class BudgetAdmin(admin.ModelAdmin):
     list_display = ('category', 'amount', 'start_date', 'end_date', 'spent', 'remaining')
     list_filter = ('category',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('category').annotate(spent_total=Budget.spent_subquery())
     
     def spent(self, obj):
-        return f"₹{obj.spent():.2f}"
+        return f"₹{abs(obj.spent_total or 0):.2f}"
     
     def remaining(self, obj):
-        rem = obj.remaining()
+        rem = obj.amount - abs(obj.spent_total or 0)
         return f"₹{rem:.2f}" if rem >= 0 else f"-₹{abs(rem):.2f}"
 
 
@@ -115,3 +139,155 @@ class NotificationAdmin(admin.ModelAdmin):
         ('Timestamps', {'fields': ('created_at',)}),
     )
 
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'duration_ms', 'view', 'short_sql', 'source')
+    list_filter = ('view', 'created_at')
+    search_fields = ('normalized_sql', 'fingerprint', 'view', 'source')
+    date_hierarchy = 'created_at'
+    readonly_fields = (
+        'created_at', 'duration_ms', 'fingerprint', 'normalized_sql', 'params_fingerprint', 'view', 'source', 'plan'
+    )
+    change_list_template = 'admin/tedx_finance/slowquery/change_list.html'
+    top_offenders_limit = 50
+
+    @admin.display(description='SQL')
+    def short_sql(self, obj):
+        return obj.normalized_sql[:120]
+
+    def has_add_permission(self, request):
+        """Slow queries are recorded by the database wrapper only."""
+        return False
+
+    def get_urls(self):
+        urls = [
+            path(
+                'top-offenders/',
+                self.admin_site.admin_view(self.top_offenders_view),
+                name='tedx_finance_slowquery_top_offenders',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def top_offenders_view(self, request):
+        """Slow queries grouped by fingerprint, worst total time first."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        offenders = (
+            SlowQuery.objects.values('fingerprint')
+            .annotate(
+                count=Count('id'),
+                avg_ms=Avg('duration_ms'),
+                max_ms=Max('duration_ms'),
+                total_ms=Sum('duration_ms'),
+                last_seen=Max('created_at'),
+                normalized_sql=Max('normalized_sql'),
+                views=Max('view'),
+                source=Max('source'),
+            )
+            .order_by('-total_ms')[:self.top_offenders_limit]
+        )
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Top slow queries',
+            'offenders': offenders,
+        }
+        return TemplateResponse(request, 'admin/tedx_finance/slowquery/top_offenders.html', context)
+
+
+@admin.register(ProfileCapture)
+class ProfileCaptureAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'view', 'status_code', 'duration_ms', 'user')
+    list_filter = ('view', 'created_at')
+    search_fields = ('path', 'view', 'user__username')
+    date_hierarchy = 'created_at'
+    readonly_fields = (
+        'created_at', 'user', 'method', 'path', 'view', 'status_code', 'duration_ms', 'downloads', 'top_functions_listing'
+    )
+    exclude = ('prof_file', 'collapsed_file', 'top_functions')
+    change_list_template = 'admin/tedx_finance/profilecapture/change_list.html'
+
+    def has_add_permission(self, request):
+        """Profiles are captured by the profiling middleware only."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Files')
+    def downloads(self, obj):
+        return format_html(
+            '<a href="{}">{}</a> &middot; <a href="{}">{}</a>',
+            reverse('admin:tedx_finance_profilecapture_download', args=[obj.pk, 'prof']), obj.prof_file,
+            reverse('admin:tedx_finance_profilecapture_download', args=[obj.pk, 'collapsed']), obj.collapsed_file,
+        )
+
+    @admin.display(description='Top functions (cumulative time)')
+    def top_functions_listing(self, obj):
+        return format_html('<pre style="white-space: pre; overflow-x: auto;">{}</pre>', obj.top_functions)
+
+    def get_urls(self):
+        urls = [
+            path(
+                '<int:pk>/download/<str:kind>/',
+                self.admin_site.admin_view(self.download_view),
+                name='tedx_finance_profilecapture_download',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def download_view(self, request, pk, kind):
+        from .profiling import profiling_dir
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        capture = get_object_or_404(ProfileCapture, pk=pk)
+        filename = {'prof': capture.prof_file, 'collapsed': capture.collapsed_file}.get(kind)
+        if not filename:
+            raise Http404
+        try:
+            handle = open(os.path.join(profiling_dir(), os.path.basename(filename)), 'rb')
+        except OSError:
+            raise Http404('Profile file is missing')
+        return FileResponse(handle, as_attachment=True, filename=filename)
+
+    def changelist_view(self, request, extra_context=None):
+        from .profiling import HEADER, QUERY_PARAM, profiling_token
+        extra_context = {
+            **(extra_context or {}),
+            'profiling_token': profiling_token(request.user) if request.user.is_staff else '',
+            'profiling_query_param': QUERY_PARAM,
+            'profiling_header': HEADER,
+            'profiling_token_minutes': getattr(settings, 'PROFILING_TOKEN_MAX_AGE', 3600) // 60,
+        }
+        return super().changelist_view(request, extra_context)
+
+
+@admin.register(ExportLog)
+class ExportLogAdmin(admin.ModelAdmin):
+    list_display = (
+        'started_at', 'kind', 'status', 'user', 'rows', 'bytes_out', 'duration_ms', 'peak_traced_mb', 'peak_rss_mb', 'spooled'
+    )
+    list_filter = ('kind', 'status', 'spooled', 'started_at')
+    search_fields = ('user__username', 'error')
+    date_hierarchy = 'started_at'
+    readonly_fields = (
+        'started_at', 'kind', 'status', 'user', 'rows', 'bytes_out', 'duration_ms',
+        'peak_traced_bytes', 'peak_rss_bytes', 'spooled', 'error'
+    )
+
+    def has_add_permission(self, request):
+        """Export runs are recorded by the export guard only."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Peak traced (MB)', ordering='peak_traced_bytes')
+    def peak_traced_mb(self, obj):
+        return None if obj.peak_traced_bytes is None else round(obj.peak_traced_bytes / 1024 / 1024, 1)
+
+    @admin.display(description='Peak RSS (MB)', ordering='peak_rss_bytes')
+    def peak_rss_mb(self, obj):
+        return None if obj.peak_rss_bytes is None else round(obj.peak_rss_bytes / 1024 / 1024, 1)
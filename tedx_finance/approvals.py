@@ -0,0 +1,234 @@
+"""
+Bulk approval and rejection of transactions.
+
+The single-transaction views save rows one at a time, which gives history,
+audit and notification records for free but costs several queries per row.
+Approvals keep the same side effects while doing the work in a constant
+number of queries per batch:
+
+- one SELECT of the affected rows
+- one UPDATE
+- one bulk INSERT each for history rows, notifications and audit entries
+- one aggregate query for the budget check
+- one UPDATE of the ledger version stamp (the bulk writes bypass model signals)
+
+Rejections batch their notifications and audit entries the same way, but
+delete through ``QuerySet.delete()``, whose per-row ``post_delete`` signals
+write the history rows and bump the ledger version.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from .ledger import bump_ledger_version
+from .models import AuditLog, Budget, Notification, Transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _history_enabled():
+    return getattr(settings, 'SIMPLE_HISTORY_ENABLED', True)
+
+
+def _exceeded_budgets(approved):
+    """
+    Return budgets pushed over their limit by the newly approved transactions.
+
+    Spending for every affected budget is computed in a single query; the
+    batch's own contribution is subtracted to tell "just exceeded" apart
+    from "was already exceeded".
+    """
+    category_ids = {tx.category_ref_id for tx in approved if tx.amount < 0 and tx.category_ref_id}
+    if not category_ids:
+        return []
+
+    budgets = (
+        Budget.objects.filter(category_id__in=category_ids)
+        .select_related('category')
+        .annotate(spent_total=Budget.spent_subquery())
+    )
+
+    exceeded = []
+    for budget in budgets:
+        spent_now = abs(budget.spent_total or 0)
+        batch_spend = sum(
+            abs(tx.amount)
+            for tx in approved
+            if tx.category_ref_id == budget.category_id and tx.amount < 0
+            and budget.start_date <= tx.date <= budget.end_date
+        )
+        if spent_now > budget.amount and spent_now - batch_spend <= budget.amount:
+            exceeded.append((budget, spent_now))
+    return exceeded
+
+
+def approve_transactions(transaction_ids, user, ip_address=None):
+    """
+    Approve the given pending transactions with full side effects.
+
+    Args:
+        transaction_ids: Iterable of Transaction primary keys
+        user: The approving user (recorded in history, audit log and notifications)
+        ip_address: Client IP for the audit log
+
+    Returns:
+        dict with 'count' (rows approved) and 'budgets_exceeded' (category names)
+    """
+    with db_transaction.atomic():
+        pending = list(
+            Transaction.objects.select_for_update(of=('self',))
+            .filter(pk__in=list(transaction_ids), approved=False)
+            .select_related('created_by')
+        )
+        if not pending:
+            return {'count': 0, 'budgets_exceeded': []}
+
+        Transaction.objects.filter(pk__in=[tx.pk for tx in pending]).update(approved=True)
+        bump_ledger_version()
+        for tx in pending:
+            tx.approved = True
+
+        now = timezone.now()
+        if _history_enabled():
+            Transaction.history.bulk_history_create(
+                pending,
+                update=True,
+                default_user=user,
+                default_change_reason='Bulk approval',
+                default_date=now,
+                custom_historical_attrs={'history_changed_fields': ['approved']},
+            )
+
+        notifications = [
+            Notification(
+                user=tx.created_by,
+                notification_type='transaction_approved',
+                title='Transaction Approved',
+                message=f"Your transaction '{tx.title}' has been approved by {user.username}.",
+                related_object_type='Transaction',
+                related_object_id=tx.id,
+            )
+            for tx in pending
+            if tx.created_by_id and tx.created_by_id != user.id
+        ]
+        exceeded = _exceeded_budgets(pending)
+        notifications.extend(
+            Notification(
+                user=user,
+                notification_type='budget_exceeded',
+                title='Budget Exceeded',
+                message=(
+                    f"The {budget.category.name} budget (₹{budget.amount}) is now exceeded: "
+                    f"₹{spent:,.2f} spent after your approval."
+                ),
+                related_object_type='Budget',
+                related_object_id=budget.id,
+            )
+            for budget, spent in exceeded
+        )
+        Notification.objects.bulk_create(notifications)
+
+        AuditLog.objects.bulk_create([
+            AuditLog(
+                user=user,
+                action='approve_transaction',
+                object_type='Transaction',
+                object_id=tx.id,
+                description=f"Approved transaction: {tx.title} (₹{tx.amount})",
+                ip_address=ip_address,
+            )
+            for tx in pending
+        ])
+
+    logger.info(f"{user.username} bulk-approved {len(pending)} transaction(s)")
+    return {
+        'count': len(pending),
+        'budgets_exceeded': [budget.category.name for budget, _ in exceeded],
+    }
+
+
+def reject_transactions(transaction_ids, user, ip_address=None):
+    """
+    Reject (delete) the given transactions, notifying their submitters.
+
+    Returns:
+        Number of transactions deleted
+    """
+    with db_transaction.atomic():
+        rejected = list(
+            Transaction.objects.select_for_update(of=('self',))
+            .filter(pk__in=list(transaction_ids))
+            .select_related('created_by')
+        )
+        if not rejected:
+            return 0
+
+        Notification.objects.bulk_create([
+            Notification(
+                user=tx.created_by,
+                notification_type='transaction_rejected',
+                title='Transaction Rejected',
+                message=f"Your transaction '{tx.title}' has been rejected and removed by {user.username}.",
+                related_object_type='Transaction',
+                related_object_id=tx.id,
+            )
+            for tx in rejected
+            if tx.created_by_id
+        ])
+
+        AuditLog.objects.bulk_create([
+            AuditLog(
+                user=user,
+                action='reject_transaction',
+                object_type='Transaction',
+                object_id=tx.id,
+                description=f"Rejected and deleted transaction: {tx.title} (₹{tx.amount})",
+                ip_address=ip_address,
+            )
+            for tx in rejected
+        ])
+
+        # The public delete(), narrowed to the rows locked above, costs a few queries
+        # per row for its signals but keeps history, the ledger version and any
+        # future cascades right without reaching into QuerySet internals.
+        now = timezone.now()
+        rejected_ids = [tx.pk for tx in rejected]
+        Transaction.objects.filter(pk__in=rejected_ids).delete()
+        if _history_enabled():
+            # simple_history only knows the user of the request being served, if any
+            Transaction.history.filter(id__in=rejected_ids, history_type='-', history_date__gte=now).update(
+                history_user=user, history_change_reason='Bulk rejection',
+            )
+
+    logger.info(f"{user.username} bulk-rejected {len(rejected)} transaction(s)")
+    return len(rejected)
+
+
+def approve_matching(queryset, user, ip_address=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Approve every pending transaction in ``queryset`` server-side, in chunks.
+
+    Each chunk is a separate approve_transactions() call (and database
+    transaction), so memory and lock time stay bounded however many rows match.
+
+    Returns:
+        dict with the total 'count' and the combined 'budgets_exceeded' list
+    """
+    pending = queryset.filter(approved=False).order_by('pk')
+    total = 0
+    budgets_exceeded = []
+    while True:
+        chunk_ids = list(pending.values_list('pk', flat=True)[:chunk_size])
+        if not chunk_ids:
+            break
+        result = approve_transactions(chunk_ids, user, ip_address=ip_address)
+        if result['count'] == 0:
+            # Rows matched but none could be approved (e.g. changed concurrently)
+            break
+        total += result['count']
+        budgets_exceeded.extend(name for name in result['budgets_exceeded'] if name not in budgets_exceeded)
+    return {'count': total, 'budgets_exceeded': budgets_exceeded}
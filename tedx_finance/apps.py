@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TedxFinanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tedx_finance'
+
+    def ready(self):
+        # Connects the ledger version, profile file and sample flush signal receivers
+        from . import ledger, performance, profiling  # noqa: F401
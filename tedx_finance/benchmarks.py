@@ -0,0 +1,235 @@
+"""
+Benchmark suite for the heavy pages.
+
+Each scenario is a list of requests made with the Django test client as a
+treasurer (a superuser, so permission-guarded views such as the import are
+reachable) against a dataset from ``generate_scale_data``. For every
+scenario and data size the suite records:
+
+- ``wall_ms``: median wall time over the timed repetitions (``wall_ms_min``
+  is the fastest)
+- ``queries``: SQL queries per run
+- ``peak_kib``: peak Python allocation during one extra run under
+  tracemalloc (kept out of the timed runs, which it would slow down)
+
+Runs are cold: the cache and KPI snapshots are cleared before each one, so
+the numbers reflect the work a first visitor triggers. Scenarios that write
+(import) run inside a rolled-back transaction so every repetition sees the
+same data.
+
+``run_suite`` builds a throwaway test database per data size, so the suite
+never touches the real one. ``compare_results`` diffs a run against a
+stored baseline and lists regressions; see the ``run_benchmarks``
+management command.
+"""
+import io
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+import openpyxl
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from .dashboard_panels import PANELS
+from .models import KPISnapshot
+from .scale_data import generate_scale_data
+
+IMPORT_ROWS = 200
+
+
+def _get(client, name, params=None, args=None):
+    response = client.get(reverse(f'tedx_finance:{name}', args=args), params or {})
+    # Streaming responses (downloads) only do their work when consumed
+    if getattr(response, 'streaming', False):
+        b''.join(response.streaming_content)
+    return response
+
+
+def _dashboard(client):
+    responses = [_get(client, 'dashboard')]
+    responses += [_get(client, 'dashboard_panel', args=[name]) for name in PANELS]
+    return responses
+
+
+def _import_workbook(rows=IMPORT_ROWS):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(['Date', 'Title', 'Category', 'Amount', 'SubmittedBy'])
+    today = timezone.localdate()
+    for i in range(rows):
+        sheet.append([today - timedelta(days=i % 90), f'Imported item {i + 1}', ('Logistics', 'Marketing', 'Venue')[i % 3], -(100 + i), ''])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def _import(client):
+    upload = SimpleUploadedFile(
+        'benchmark.xlsx', _import_workbook(),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+    return [client.post(reverse('tedx_finance:import_transactions'), {'file': upload})]
+
+
+# Scenario name -> {'run': callable(client) returning responses, 'writes': rolled back after each run}
+SCENARIOS = {
+    'dashboard': {'run': _dashboard},
+    'transactions_table': {'run': lambda client: [_get(client, 'transactions_table')]},
+    'search': {'run': lambda client: [_get(client, 'transactions_table', {'search': 'Banner', 'status': 'all'})]},
+    'budget_suggestions': {'run': lambda client: [_get(client, 'budget_suggestions')]},
+    'export_xlsx': {'run': lambda client: [_get(client, 'export_xlsx')]},
+    'export_pdf': {'run': lambda client: [_get(client, 'export_pdf')]},
+    'export_zip': {'run': lambda client: [_get(client, 'export_zip')]},
+    'export_proofs_csv': {'run': lambda client: [_get(client, 'export_proofs_csv')]},
+    'export_proofs_pdf': {'run': lambda client: [_get(client, 'export_proofs_pdf')]},
+    'import_transactions': {'run': _import, 'writes': True},
+}
+
+
+def _reset_caches():
+    cache.clear()
+    KPISnapshot.objects.all().delete()
+
+
+def _run_once(scenario, client):
+    """Run a scenario; returns (responses, seconds, queries)."""
+    _reset_caches()
+    with CaptureQueriesContext(connection) as queries:
+        if scenario.get('writes'):
+            with transaction.atomic():
+                start = time.perf_counter()
+                responses = scenario['run'](client)
+                elapsed = time.perf_counter() - start
+                transaction.set_rollback(True)
+        else:
+            start = time.perf_counter()
+            responses = scenario['run'](client)
+            elapsed = time.perf_counter() - start
+    return responses, elapsed, len(queries.captured_queries)
+
+
+def measure(name, client, repeat=3):
+    """Measure the scenario ``name``; returns a result dict (see module docstring)."""
+    scenario = SCENARIOS[name]
+    timings, query_counts = [], []
+    responses = []
+    for _ in range(max(repeat, 1)):
+        responses, elapsed, query_count = _run_once(scenario, client)
+        timings.append(elapsed)
+        query_counts.append(query_count)
+
+    tracemalloc.start()
+    try:
+        _run_once(scenario, client)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'wall_ms': round(statistics.median(timings) * 1000, 1),
+        'wall_ms_min': round(min(timings) * 1000, 1),
+        'queries': max(query_counts),
+        'peak_kib': round(peak / 1024, 1),
+        'status': [response.status_code for response in responses],
+        'bytes': sum(len(response.content) for response in responses if not getattr(response, 'streaming', False)),
+    }
+
+
+def dataset_options(size):
+    """``generate_scale_data`` arguments for a dataset of ``size`` transactions."""
+    return {
+        'transactions': size,
+        'users': max(size // 2000, 10),
+        'sponsors': max(size // 1000, 20),
+        'management_funds': max(size // 2000, 10),
+        'proofs': min(size // 20, 500),
+        'notifications': size // 10,
+        'login_attempts': size // 10,
+    }
+
+
+def run_suite(sizes, names=None, repeat=3, seed=42, progress=None):
+    """
+    Measure ``names`` (default: every scenario) at each data size, on a fresh test database per size.
+
+    Returns ``{'generated_at', 'seed', 'repeat', 'sizes': {size: {scenario: result}}}``
+    with sizes as strings (JSON keys).
+    """
+    names = list(names or SCENARIOS)
+    report = progress or (lambda size, name, result: None)
+    results = {'generated_at': timezone.now().isoformat(), 'seed': seed, 'repeat': repeat, 'sizes': {}}
+    old_name = connection.settings_dict['NAME']
+
+    setup_test_environment()
+    try:
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root, KPI_SNAPSHOT_BACKGROUND_REFRESH=False, REQUEST_TIMING_ENABLED=False,
+            # Sample flushes and metric files are writes of their own, not the page's
+            PERFORMANCE_SAMPLING_ENABLED=False, METRICS_ENABLED=False,
+        ):
+            for size in sizes:
+                connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                try:
+                    generate_scale_data(seed=seed, **dataset_options(size))
+                    treasurer = User.objects.create_superuser(username='benchmark_treasurer', email='benchmark@example.com', password=None)
+                    # A failing page is recorded with its status instead of aborting the suite
+                    client = Client(raise_request_exception=False)
+                    client.force_login(treasurer)
+                    size_results = results['sizes'][str(size)] = {}
+                    for name in names:
+                        size_results[name] = measure(name, client, repeat)
+                        report(size, name, size_results[name])
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        teardown_test_environment()
+    return results
+
+
+def compare_results(baseline, current, threshold=0.2, min_ms=5.0):
+    """
+    Compare two result sets (``{'sizes': {size: {scenario: result}}}``).
+
+    A scenario regresses when its median wall time grows by more than
+    ``threshold`` (and at least ``min_ms``, to ignore noise on fast pages),
+    its query count grows at all, or its peak memory grows by more than
+    ``threshold``. Returns a list of rows ``{'size', 'scenario', 'metric',
+    'baseline', 'current', 'change', 'regression'}`` for every metric of
+    every scenario present in both sets.
+    """
+    rows = []
+    for size, scenarios in current.get('sizes', {}).items():
+        for name, result in scenarios.items():
+            old = baseline.get('sizes', {}).get(size, {}).get(name)
+            if not old:
+                continue
+            for metric in ('wall_ms', 'queries', 'peak_kib'):
+                before, after = old.get(metric), result.get(metric)
+                if before is None or after is None:
+                    continue
+                change = (after - before) / before if before else (0.0 if after == before else float('inf'))
+                if metric == 'queries':
+                    regression = after > before
+                elif metric == 'wall_ms':
+                    regression = change > threshold and after - before >= min_ms
+                else:
+                    regression = change > threshold
+                rows.append({
+                    'size': size,
+                    'scenario': name,
+                    'metric': metric,
+                    'baseline': before,
+                    'current': after,
+                    'change': change,
+                    'regression': regression,
+                })
+    return rows
@@ -0,0 +1,63 @@
+"""
+Server-side downsampling of chart series.
+
+A wide date range at daily granularity gives Chart.js thousands of points,
+which bloats the panel JSON and stalls rendering on low-end phones. Series
+are reduced to a target point count with Largest-Triangle-Three-Buckets
+(LTTB): the first and last points are kept, the rest are split into equal
+buckets, and from each bucket the point forming the largest triangle with
+the previously kept point and the next bucket's average is kept. Peaks and
+troughs survive; flat stretches are thinned.
+
+Multi-series charts share one x axis, so the points are chosen on the
+summed series and every series is sliced at the same indices.
+"""
+import numpy as np
+
+DEFAULT_MAX_POINTS = 120
+MIN_POINTS = 3
+MAX_POINTS = 2000
+# Periods built per point kept: panels coarsen the granularity of ranges longer than this
+LTTB_OVERSAMPLE = 10
+
+
+def lttb_indices(values, threshold):
+    """
+    Indices of the points LTTB keeps when reducing ``values`` to ``threshold`` points.
+
+    Points are assumed evenly spaced on the x axis (one per period).
+    """
+    y = np.asarray(values, dtype=np.float64)
+    n = len(y)
+    if threshold >= n or threshold < MIN_POINTS:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(np.floor(i * every)) + 1
+        end = int(np.floor((i + 1) * every)) + 1
+        next_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = x[end:next_end].mean() if next_end > end else x[n - 1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[n - 1]
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def downsample_chart(labels, series, max_points):
+    """
+    Reduce a chart with shared ``labels`` and one or more ``series`` to ``max_points`` points.
+
+    Returns:
+        (labels, series) with every series sliced at the same LTTB indices
+    """
+    if not series or len(labels) <= max_points:
+        return labels, series
+    indices = lttb_indices(np.sum(np.asarray(series, dtype=np.float64), axis=0), max_points)
+    return [labels[i] for i in indices], [[values[i] for i in indices] for values in series]
+
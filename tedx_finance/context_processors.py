@@ -1,3 +1,11 @@
+def get_user_preferences(request):
+    """The user's ``UserPreference`` (created on first use), looked up once per request."""
+    if not hasattr(request, '_tedx_user_preferences'):
+        from .models import UserPreference
+        request._tedx_user_preferences, _ = UserPreference.objects.get_or_create(user=request.user)
+    return request._tedx_user_preferences
+
+
 def user_groups(request):
     """
     Context processor to add user group information to all templates.
@@ -7,12 +15,12 @@ def user_groups(request):
     user_theme = None
     if request.user.is_authenticated:
         # Admins (staff users) get automatic treasurer access
-        is_treasurer = request.user.is_staff or request.user.groups.filter(name='Treasurer').exists()
+        from .views import is_in_group
+        is_treasurer = is_in_group(request.user, 'Treasurer')
 
         # Attach or create preferences for theme/notifications
         try:
-            from .models import UserPreference
-            user_preferences, _ = UserPreference.objects.get_or_create(user=request.user)
+            user_preferences = get_user_preferences(request)
             user_theme = user_preferences.theme
         except Exception:
             user_preferences = None
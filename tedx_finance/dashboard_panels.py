@@ -0,0 +1,416 @@
+"""
+Dashboard panels.
+
+The dashboard page is a light shell; its cards are grouped into panels that
+the page fetches concurrently from the ``dashboard_panel`` view, so a slow
+aggregate only delays its own cards. A panel builder takes the selected
+date range and returns ``(context, data)``: ``context`` renders the panel's
+HTML slots (``dashboard_panels/<slot>.html``) and ``data`` feeds its charts.
+
+Each panel has its own cache policy:
+
+- ``ttl``: seconds the builder output stays in the server cache, keyed by
+  panel, ledger version, date range and role
+- ``max_age``: the private ``Cache-Control`` max-age sent to the browser
+
+Time-series panels (``time_series``) take a ``granularity``, coarsened when
+the date range has too many periods for it (``timeseries.fit_granularity``),
+and can shrink their chart series to a point budget (``downsample``, see
+``charts.py``).
+
+Only builder output is cached; the slots are rendered per request so CSRF
+tokens in the pending queue stay per-user. The KPI panel is served from
+stored snapshots instead (see ``kpi_snapshots.py``).
+"""
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+from .charts import LTTB_OVERSAMPLE, downsample_chart
+from .ledger import ledger_version
+from .metrics import record_cache
+from .models import Budget, ManagementFund, Sponsor, Transaction
+from .sponsor_tiers import with_tiers
+from .timeseries import MAX_PERIODS, fit_granularity, pivot_series, spending_pivot
+
+
+def _income_querysets(start_date, end_date):
+    mf_qs = ManagementFund.objects.all()
+    sp_qs = Sponsor.objects.all()
+    if start_date:
+        mf_qs = mf_qs.filter(date_received__gte=start_date)
+        sp_qs = sp_qs.filter(date_received__gte=start_date)
+    if end_date:
+        mf_qs = mf_qs.filter(date_received__lte=end_date)
+        sp_qs = sp_qs.filter(date_received__lte=end_date)
+    return mf_qs, sp_qs
+
+
+def _approved_transactions(start_date, end_date):
+    approved = Transaction.objects.filter(approved=True)
+    if start_date:
+        approved = approved.filter(date__gte=start_date)
+    if end_date:
+        approved = approved.filter(date__lte=end_date)
+    return approved
+
+
+def _spent(queryset):
+    """Absolute approved spending (negative amounts) in ``queryset``."""
+    return abs(queryset.filter(amount__lt=0).aggregate(total=Sum('amount'))['total'] or 0)
+
+
+def build_kpis_panel(start_date, end_date, is_treasurer):
+    """Headline totals, burn rate / runway KPIs, income split and month-over-month spending."""
+    mf_qs, sp_qs = _income_querysets(start_date, end_date)
+    management_funds = mf_qs.aggregate(total=Sum('amount'))['total'] or 0
+    sponsor_funds = sp_qs.aggregate(total=Sum('amount'))['total'] or 0
+    total_income = management_funds + sponsor_funds
+
+    approved_transactions = _approved_transactions(start_date, end_date)
+    total_spent = _spent(approved_transactions)
+    remaining_balance = total_income - total_spent
+
+    # Spending Analytics (Last 30 days)
+    today = datetime.now().date()
+    thirty_days_ago = today - timedelta(days=30)
+    recent_approved_tx = approved_transactions.filter(date__gte=thirty_days_ago)
+    recent_spending_30d = _spent(recent_approved_tx)
+
+    # Burn rate (daily/weekly/monthly)
+    days_with_spending = 30
+    daily_burn_rate = recent_spending_30d / days_with_spending
+    weekly_burn_rate = daily_burn_rate * 7
+    monthly_burn_rate = daily_burn_rate * 30
+
+    # Runway calculation (how many days until funds run out)
+    if daily_burn_rate > 0 and remaining_balance > 0:
+        runway_days = int(remaining_balance / daily_burn_rate)
+        runway_months = runway_days // 30
+    else:
+        runway_days = 0
+        runway_months = 0
+
+    # Transaction metrics
+    total_tx_count = approved_transactions.count()
+    pending_tx_count = Transaction.objects.filter(approved=False).count()
+    recent_tx_count = recent_approved_tx.count()
+    avg_tx_size = (total_spent / total_tx_count) if total_tx_count > 0 else 0
+    velocity = recent_tx_count / days_with_spending
+
+    # Category concentration (top category spending percentage)
+    top_category = (
+        approved_transactions.filter(amount__lt=0)
+        .values('category_ref')
+        .annotate(total=Sum('amount'))
+        .order_by('total')
+        .first()
+    )
+    if top_category and total_spent > 0:
+        category_concentration = abs(top_category['total']) / total_spent * 100
+    else:
+        category_concentration = 0
+
+    # Growth rate (compare last 30 days to previous 30 days)
+    sixty_days_ago = today - timedelta(days=60)
+    previous_30d_spending = _spent(approved_transactions.filter(date__gte=sixty_days_ago, date__lt=thirty_days_ago))
+    if previous_30d_spending > 0:
+        growth_rate = ((recent_spending_30d - previous_30d_spending) / previous_30d_spending) * 100
+    else:
+        growth_rate = 0 if recent_spending_30d == 0 else 100
+
+    spending_ratio = (total_spent / total_income) * 100 if total_income > 0 else 0
+
+    # Monthly Comparison Data (This Month vs Last Month)
+    first_day_this_month = today.replace(day=1)
+    last_day_last_month = first_day_this_month - timedelta(days=1)
+    first_day_last_month = last_day_last_month.replace(day=1)
+    this_month_spending = _spent(approved_transactions.filter(date__gte=first_day_this_month))
+    last_month_spending = _spent(approved_transactions.filter(
+        date__gte=first_day_last_month,
+        date__lte=last_day_last_month,
+    ))
+    month_comparison_data = {
+        'this_month': float(this_month_spending),
+        'last_month': float(last_month_spending),
+        'this_month_name': first_day_this_month.strftime('%B'),
+        'last_month_name': first_day_last_month.strftime('%B'),
+        'monthly_change': float((this_month_spending - last_month_spending) / last_month_spending * 100) if last_month_spending > 0 else 0,
+    }
+
+    kpis = {
+        'burn_rate_daily': daily_burn_rate,
+        'burn_rate_weekly': weekly_burn_rate,
+        'burn_rate_monthly': monthly_burn_rate,
+        'runway_days': runway_days,
+        'runway_months': runway_months,
+        'total_tx_count': total_tx_count,
+        'pending_tx_count': pending_tx_count,
+        'recent_tx_count_30d': recent_tx_count,
+        'avg_tx_size': avg_tx_size,
+        'velocity_per_day': velocity,
+        'category_concentration': category_concentration,
+        'growth_rate': growth_rate,
+        'spending_ratio': spending_ratio,
+        'recent_spending_30d': recent_spending_30d,
+        'avg_transaction_size': avg_tx_size,
+    }
+    context = {
+        'total_funds': total_income,
+        'total_income': total_income,
+        'total_spent': total_spent,
+        'remaining_balance': remaining_balance,
+        'net_balance': remaining_balance,
+        'kpis': kpis,
+        'month_comparison_data': month_comparison_data,
+    }
+    data = {
+        'income_data': [float(management_funds), float(sponsor_funds)],
+        'month_comparison_data': month_comparison_data,
+    }
+    return context, data
+
+
+def build_spending_trend_panel(start_date, end_date, is_treasurer, granularity='month', max_periods=MAX_PERIODS):
+    """Spending by category and the spending trend (monthly unless another granularity is asked for)."""
+    expenses = _approved_transactions(start_date, end_date).filter(amount__lt=0)
+    category_spending = [
+        {'category': item['category_ref__name'] or 'Uncategorized', 'total': float(item['total'])}
+        for item in expenses.values('category_ref', 'category_ref__name')
+        .annotate(total=Sum('amount'))
+        .order_by('category_ref__name')
+    ]
+
+    # Within the selected range, else the last 6 months
+    trend_start, trend_end = start_date, end_date
+    if not (start_date or end_date):
+        trend_end = datetime.now().date()
+        trend_start = trend_end - timedelta(days=180)
+    trend = spending_pivot(trend_start, trend_end, granularity, max_periods=max_periods)
+    data = {
+        'category_spending': category_spending,
+        'spending_months': trend['labels'],
+        'spending_amounts': trend['totals'].round(2).tolist(),
+    }
+    return {}, data
+
+
+def build_category_trend_panel(start_date, end_date, is_treasurer, granularity='month', max_periods=MAX_PERIODS):
+    """Spending of the top 3 categories over the last 6 months."""
+    last_6_months = datetime.now().date() - timedelta(days=180)
+    trend_start = max(start_date, last_6_months) if start_date else last_6_months
+    trend_end = end_date or datetime.now().date()
+    pivot = spending_pivot(trend_start, trend_end, granularity, top_n=3, max_periods=max_periods)
+
+    colors = ['#F87171', '#60A5FA', '#34D399']
+    category_trend_labels = pivot['labels'] if pivot['categories'] else []
+    category_trend_datasets = [
+        {
+            'label': series['label'],
+            'data': series['data'],
+            'borderColor': colors[idx],
+            'backgroundColor': f'rgba({colors[idx].replace("#", "")}, 0.1)',
+            'tension': 0.3,
+        }
+        for idx, series in enumerate(pivot_series(pivot))
+    ]
+
+    context = {'category_trend_labels': category_trend_labels}
+    data = {
+        'category_trend_labels': category_trend_labels,
+        'category_trend_datasets': category_trend_datasets,
+    }
+    return context, data
+
+
+def build_budget_panel(start_date, end_date, is_treasurer):
+    """Budget alerts and the budget vs actual table and chart."""
+    budgets = (
+        Budget.objects.select_related('category')
+        .annotate(spent_total=Budget.spent_subquery())
+        .order_by('category__name')
+    )
+
+    budget_comparison = []
+    total_budget_amount = 0
+    total_budget_spent = 0
+    budget_exceeded_count = 0
+    budget_warning_count = 0
+    for budget in budgets:
+        amount = float(budget.amount)
+        spent = abs(float(budget.spent_total or 0))
+        utilization = min(100, spent / amount * 100) if amount else 0
+        if spent > amount:
+            status = 'exceeded'
+            budget_exceeded_count += 1
+        elif utilization >= 80:
+            status = 'warning'
+            budget_warning_count += 1
+        else:
+            status = 'healthy'
+
+        budget_comparison.append({
+            'category': budget.category.name,
+            'budget_amount': amount,
+            'spent': spent,
+            'remaining': amount - spent,
+            'utilization': utilization,
+            'status': status,
+            'start_date': budget.start_date,
+            'end_date': budget.end_date,
+        })
+        total_budget_amount += amount
+        total_budget_spent += spent
+
+    context = {
+        'has_budgets': bool(budget_comparison),
+        'budget_comparison': budget_comparison,
+        'total_budget_amount': total_budget_amount,
+        'total_budget_spent': total_budget_spent,
+        'overall_budget_utilization': (total_budget_spent / total_budget_amount * 100) if total_budget_amount > 0 else 0,
+        'budget_exceeded_count': budget_exceeded_count,
+        'budget_warning_count': budget_warning_count,
+    }
+    data = {
+        'budget_categories': [item['category'] for item in budget_comparison],
+        'budget_amounts': [item['budget_amount'] for item in budget_comparison],
+        'actual_amounts': [item['spent'] for item in budget_comparison],
+    }
+    return context, data
+
+
+def build_sponsors_panel(start_date, end_date, is_treasurer):
+    """Management fund and sponsor listings for the selected range, with sponsor tiers from SQL."""
+    mf_qs, sp_qs = _income_querysets(start_date, end_date)
+    context = {
+        'management_funds_list': list(mf_qs.order_by('-date_received').values('id', 'amount', 'date_received')),
+        'sponsors_list': list(
+            with_tiers(sp_qs).order_by('-date_received').values('id', 'name', 'amount', 'date_received', 'tier', 'tier_badge')
+        ),
+    }
+    return context, {}
+
+
+def build_pending_panel(start_date, end_date, is_treasurer):
+    """Pending approval queue (treasurers only) and recent approved transactions."""
+    recent = (
+        _approved_transactions(start_date, end_date)
+        .select_related('category_ref')
+        .order_by('-date')[:10]
+    )
+    pending = []
+    if is_treasurer:
+        pending = list(
+            Transaction.objects.filter(approved=False)
+            .select_related('created_by', 'category_ref')
+            .order_by('-date')
+        )
+    context = {
+        'transactions': list(recent),
+        'pending_transactions': pending,
+    }
+    return context, {}
+
+
+def downsample_spending_trend(data, max_points):
+    labels, (amounts,) = downsample_chart(data['spending_months'], [data['spending_amounts']], max_points)
+    return {**data, 'spending_months': labels, 'spending_amounts': amounts}
+
+
+def downsample_category_trend(data, max_points):
+    datasets = data['category_trend_datasets']
+    labels, series = downsample_chart(data['category_trend_labels'], [ds['data'] for ds in datasets], max_points)
+    return {
+        **data,
+        'category_trend_labels': labels,
+        'category_trend_datasets': [{**ds, 'data': values} for ds, values in zip(datasets, series)],
+    }
+
+
+PANELS = {
+    # Served from KPISnapshot (kpi_snapshots.py) rather than the cache; role-independent
+    'kpis': {
+        'builder': build_kpis_panel,
+        'slots': ('quick_stats', 'metrics', 'income_sources', 'month_comparison'),
+        'snapshot': True,
+        'ttl': 120,
+        'max_age': 60,
+    },
+    'spending_trend': {
+        'builder': build_spending_trend_panel,
+        'slots': ('category_spending', 'spending_trend'),
+        'time_series': True,
+        'downsample': downsample_spending_trend,
+        'ttl': 300,
+        'max_age': 120,
+    },
+    'category_trend': {
+        'builder': build_category_trend_panel,
+        'slots': ('category_trend',),
+        'time_series': True,
+        'downsample': downsample_category_trend,
+        'ttl': 600,
+        'max_age': 300,
+    },
+    'budget': {
+        'builder': build_budget_panel,
+        'slots': ('budget_alerts', 'budget_vs_actual'),
+        'ttl': 300,
+        'max_age': 120,
+    },
+    'sponsors': {
+        'builder': build_sponsors_panel,
+        'slots': ('fund_tables', 'sidebar_funds'),
+        'ttl': 300,
+        'max_age': 120,
+    },
+    # The approval queue changes under the treasurer's hands; never let the browser reuse it
+    'pending': {
+        'builder': build_pending_panel,
+        'slots': ('pending_queue', 'recent_transactions'),
+        'ttl': 30,
+        'max_age': 0,
+    },
+}
+
+
+def get_panel(name, start_date=None, end_date=None, is_treasurer=False, granularity='month', max_points=None):
+    """
+    Return ``(context, data)`` for panel ``name``, from cache when possible.
+
+    Time-series panels are built at ``granularity``, coarsened so the range
+    fits in ``LTTB_OVERSAMPLE * max_points`` periods (``MAX_PERIODS`` at most)
+    before anything is laid out. When ``max_points`` is given, their chart
+    series are then downsampled to at most that many points (after the cache,
+    so one cached build serves screens with similar point budgets).
+
+    Raises:
+        KeyError: if ``name`` is not a known panel
+    """
+    panel = PANELS[name]
+    if panel.get('snapshot'):
+        from .kpi_snapshots import get_kpi_snapshot
+        return get_kpi_snapshot(start_date, end_date)
+
+    options = {}
+    if panel.get('time_series'):
+        # Ranges come from the query string; bound the periods before they are laid out
+        max_periods = min(MAX_PERIODS, max_points * LTTB_OVERSAMPLE) if max_points else MAX_PERIODS
+        options['granularity'] = fit_granularity(start_date, end_date or datetime.now().date(), granularity, max_periods)
+        options['max_periods'] = max_periods
+    role = 'treasurer' if is_treasurer else 'member'
+    cache_key = (
+        f"dashboard_panel:{name}:{ledger_version()}:{start_date}:{end_date}:{role}:"
+        f"{options.get('granularity', '')}:{options.get('max_periods', '')}"
+    )
+    result = cache.get(cache_key)
+    record_cache('dashboard_panel', result is not None)
+    if result is None:
+        result = panel['builder'](start_date, end_date, is_treasurer, **options)
+        cache.set(cache_key, result, panel['ttl'])
+
+    context, data = result
+    if max_points and panel.get('downsample'):
+        data = panel['downsample'](data, max_points)
+    return context, data
@@ -0,0 +1,83 @@
+"""
+Conditional GET for ledger-derived pages.
+
+Most reloads of the dashboard, reports and galleries happen when nothing in
+the ledger has changed. ``ledger_conditional`` derives a weak ETag from the
+view, its URL arguments and query string, the user's role and the ledger
+version stamp, and answers a matching ``If-None-Match`` with
+``304 Not Modified`` before the view (and its aggregation) runs.
+
+The tag also covers the user and the CSRF cookie, because rendered pages
+embed the username and CSRF tokens, the user's preferences (``updated_at``),
+because ``base.html`` renders their theme, and the local date, because
+several KPIs are relative to today.
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.contrib.messages import get_messages
+from django.http import HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+
+from .ledger import ledger_version
+
+
+def build_ledger_etag(request, view_name, view_kwargs=None):
+    """Weak ETag for ``view_name`` as seen by this request's user at the current ledger version."""
+    from .context_processors import get_user_preferences
+    from .views import is_in_group
+
+    preferences = get_user_preferences(request) if request.user.is_authenticated else None
+    parts = [
+        view_name,
+        urlencode(sorted((view_kwargs or {}).items())),
+        urlencode(sorted(request.GET.lists()), doseq=True),
+        'treasurer' if is_in_group(request.user, 'Treasurer') else 'member',
+        str(request.user.pk),
+        preferences.updated_at.isoformat() if preferences else '',
+        request.META.get('CSRF_COOKIE') or '',
+        timezone.localdate().isoformat(),
+        str(ledger_version()),
+    ]
+    digest = hashlib.md5('\n'.join(parts).encode('utf-8'), usedforsecurity=False).hexdigest()
+    return f'W/"{digest}"'
+
+
+def ledger_conditional(view_name):
+    """
+    Decorator: serve ``304 Not Modified`` for unchanged ledger pages.
+
+    Successful GET responses get the ETag (unless the view marked them
+    ``no-store``) and, unless the view set its own Cache-Control,
+    ``private, no-cache`` so browsers revalidate every load.
+    Requests with pending flash messages always render in full so the
+    messages are shown.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+                return view_func(request, *args, **kwargs)
+
+            csrf_secret = request.META.get('CSRF_COOKIE')
+            etag = build_ledger_etag(request, view_name, kwargs)
+            if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+            if if_none_match and (etag in parse_etags(if_none_match) or '*' in parse_etags(if_none_match)):
+                response = HttpResponseNotModified()
+                response['ETag'] = etag
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.has_header('ETag') and 'no-store' not in response.get('Cache-Control', ''):
+                if request.META.get('CSRF_COOKIE') != csrf_secret:
+                    # Rendering issued the first CSRF secret; tag what the next request will send
+                    etag = build_ledger_etag(request, view_name, kwargs)
+                response['ETag'] = etag
+                if not response.has_header('Cache-Control'):
+                    patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapped
+    return decorator
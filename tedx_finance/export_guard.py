@@ -0,0 +1,197 @@
+"""
+Memory accounting and limits for exports.
+
+An export runs inside ``ExportRun``, writes its file to ``run.output`` and
+calls ``run.add_rows()`` / ``run.check()`` as it goes::
+
+    with ExportRun('xlsx', request.user) as run:
+        for tx in transactions:
+            ...
+            run.add_rows()
+        workbook.save(run.output)
+    return run.response(content_type, filename)
+
+Checks measure how much the worker's resident set size has grown since
+the export started (read from ``/proc/self/statm`` where available). With
+``EXPORT_TRACEMALLOC`` on they also count memory traced by ``tracemalloc``
+and act on the larger of the two. That is meant for diagnosing a single
+export: tracing is process-wide, so it slows allocation in every thread
+of the worker while any export runs, and exports that overlap in a
+threaded worker see each other's allocations. The checks:
+
+- past ``EXPORT_MEMORY_SPOOL_MB`` the output moves from memory to a
+  temporary file, and the response is streamed from that file;
+- past ``EXPORT_MEMORY_LIMIT_MB`` the export raises ``ExportMemoryExceeded``,
+  which views turn into an error message. Its objects are released when the
+  view returns, so the worker keeps serving other users.
+
+Each run is recorded in ``ExportLog`` with its rows, bytes out, duration
+and peak memory.
+"""
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+
+logger = logging.getLogger('tedx_finance.exports')
+
+CHECK_INTERVAL_SECONDS = 0.05
+MB = 1024 * 1024
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+_lock = threading.Lock()
+_tracing = {'runs': 0, 'started_here': False}
+
+
+class ExportMemoryExceeded(Exception):
+    """Raised inside an export that grew past ``EXPORT_MEMORY_LIMIT_MB``."""
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None where it cannot be read."""
+    try:
+        with open('/proc/self/statm') as handle:
+            return int(handle.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _start_tracing():
+    with _lock:
+        if _tracing['runs'] == 0:
+            _tracing['started_here'] = not tracemalloc.is_tracing()
+            if _tracing['started_here']:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        _tracing['runs'] += 1
+
+
+def _stop_tracing():
+    with _lock:
+        _tracing['runs'] -= 1
+        if _tracing['runs'] == 0 and _tracing['started_here']:
+            tracemalloc.stop()
+
+
+def _limit(name, default_mb):
+    return int(getattr(settings, name, default_mb) * MB)
+
+
+class ExportRun:
+    """Track and cap the memory of one export, and log it to ``ExportLog`` on exit."""
+
+    def __init__(self, kind, user=None):
+        self.kind = kind
+        self.user = user if user is not None and user.is_authenticated else None
+        self.rows = 0
+        self.spool_bytes = _limit('EXPORT_MEMORY_SPOOL_MB', 64)
+        self.limit_bytes = _limit('EXPORT_MEMORY_LIMIT_MB', 256)
+        self.trace = getattr(settings, 'EXPORT_TRACEMALLOC', False)
+        # Output bigger than the spool threshold goes to disk on its own, too
+        self.output = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+        self.peak_traced = None
+        self.peak_rss = None
+        self.bytes_out = 0
+
+    @property
+    def spooled(self):
+        return self.output._rolled
+
+    def __enter__(self):
+        if self.trace:
+            _start_tracing()
+            self.traced_base = tracemalloc.get_traced_memory()[0]
+            self.peak_traced = 0
+        self.rss_base = current_rss()
+        if self.rss_base is not None:
+            self.peak_rss = 0
+        self.started = time.perf_counter()
+        self.last_check = 0.0
+        return self
+
+    def _sample(self):
+        """Update the peaks; return the current growth in bytes."""
+        growth = 0
+        if self.trace:
+            traced = max(tracemalloc.get_traced_memory()[0] - self.traced_base, 0)
+            self.peak_traced = max(self.peak_traced, traced)
+            growth = traced
+        if self.rss_base is not None:
+            rss = current_rss()
+            if rss is not None:
+                self.peak_rss = max(self.peak_rss, rss - self.rss_base)
+                growth = max(growth, rss - self.rss_base)
+        return growth
+
+    def check(self, force=False):
+        """Spool the output to disk or abort the export when it has grown too much."""
+        now = time.perf_counter()
+        if not force and now - self.last_check < CHECK_INTERVAL_SECONDS:
+            return
+        self.last_check = now
+        growth = self._sample()
+        if self.limit_bytes and growth > self.limit_bytes:
+            raise ExportMemoryExceeded(
+                f'{self.kind} export grew by {growth / MB:.0f} MB, over the '
+                f'{self.limit_bytes / MB:.0f} MB limit, after {self.rows} rows'
+            )
+        if self.spool_bytes and growth > self.spool_bytes and not self.spooled:
+            self.output.rollover()
+
+    def add_rows(self, count=1):
+        self.rows += count
+        self.check()
+
+    def __exit__(self, exc_type, exc, tb):
+        from .models import ExportLog
+
+        self._sample()
+        if self.trace:
+            # The peak between checks; only this export's when no other one overlaps
+            self.peak_traced = max(self.peak_traced, tracemalloc.get_traced_memory()[1] - self.traced_base)
+            _stop_tracing()
+        duration_ms = (time.perf_counter() - self.started) * 1000
+
+        if exc_type is None:
+            status = 'ok'
+            self.output.seek(0, io.SEEK_END)
+            self.bytes_out = self.output.tell()
+        else:
+            status = 'aborted' if issubclass(exc_type, ExportMemoryExceeded) else 'failed'
+            self.output.close()
+        if status == 'aborted':
+            logger.warning('Export aborted: %s', exc)
+
+        ExportLog.objects.create(
+            kind=self.kind,
+            user=self.user,
+            status=status,
+            rows=self.rows,
+            bytes_out=self.bytes_out,
+            duration_ms=duration_ms,
+            peak_traced_bytes=self.peak_traced,
+            peak_rss_bytes=self.peak_rss,
+            spooled=self.spooled,
+            error='' if exc is None else str(exc)[:1000],
+        )
+        return False
+
+    def response(self, content_type, filename):
+        """The finished export as an attachment, streamed from disk when it was spooled."""
+        self.output.seek(0)
+        if self.spooled:
+            return FileResponse(self.output, as_attachment=True, filename=filename, content_type=content_type)
+        response = HttpResponse(self.output.read(), content_type=content_type)
+        self.output.close()
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
@@ -0,0 +1,250 @@
+"""
+Access-controlled file delivery for uploaded proofs.
+
+Views decide *whether* a user may see a file; this module decides *how* the
+bytes leave the server. When a front-end server is configured
+(``PROOF_SERVE_METHOD``), Django only emits an ``X-Accel-Redirect`` (nginx) or
+``X-Sendfile`` (Apache/lighttpd) header and the worker is released
+immediately. Otherwise the file is streamed by Django with ETag,
+conditional-GET and single-range ``Range`` support.
+"""
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_etags
+
+logger = logging.getLogger(__name__)
+
+SERVE_METHOD_DJANGO = 'django'
+SERVE_METHOD_X_ACCEL = 'x-accel-redirect'
+SERVE_METHOD_X_SENDFILE = 'x-sendfile'
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_CHUNK_SIZE = 64 * 1024
+
+THUMBNAIL_DIR = 'proofs/thumbnails'
+THUMBNAIL_SIZE = 320
+THUMBNAIL_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+
+# Compressed uploads are served as the archive they are (as FileResponse does):
+# a Content-Encoding header would make browsers unpack them on download
+ENCODED_CONTENT_TYPES = {
+    'br': 'application/x-brotli',
+    'bzip2': 'application/x-bzip',
+    'compress': 'application/x-compress',
+    'gzip': 'application/gzip',
+    'xz': 'application/x-xz',
+}
+
+
+def get_serve_method():
+    """Return the configured delivery method, defaulting to Django streaming."""
+    method = (getattr(settings, 'PROOF_SERVE_METHOD', SERVE_METHOD_DJANGO) or SERVE_METHOD_DJANGO).lower()
+    if method not in (SERVE_METHOD_DJANGO, SERVE_METHOD_X_ACCEL, SERVE_METHOD_X_SENDFILE):
+        logger.warning(f"Unknown PROOF_SERVE_METHOD '{method}', falling back to Django streaming")
+        return SERVE_METHOD_DJANGO
+    return method
+
+
+def build_etag(field_file):
+    """
+    Build a strong ETag from the storage name, size and modification time.
+
+    Storage never overwrites an existing name (a re-upload gets a new suffix),
+    so the tag changes whenever the content can have changed.
+    """
+    storage = field_file.storage
+    parts = [field_file.name]
+    try:
+        parts.append(str(storage.size(field_file.name)))
+    except Exception:
+        pass
+    try:
+        parts.append(str(storage.get_modified_time(field_file.name).timestamp()))
+    except Exception:
+        pass
+    digest = hashlib.md5(':'.join(parts).encode('utf-8'), usedforsecurity=False).hexdigest()
+    return f'"{digest}"'
+
+
+def parse_range_header(header, size):
+    """
+    Parse a single-range ``Range`` header.
+
+    Returns ``(start, end)`` inclusive, ``None`` when the header should be
+    ignored (absent, malformed or multi-range), or ``False`` when the range is
+    unsatisfiable.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def _ranged_iterator(fileobj, start, length, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield ``length`` bytes from ``fileobj`` beginning at ``start``."""
+    try:
+        fileobj.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = fileobj.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        fileobj.close()
+
+
+def _content_disposition(filename, as_attachment):
+    disposition = 'attachment' if as_attachment else 'inline'
+    try:
+        filename.encode('ascii')
+        return f'{disposition}; filename="{filename}"'
+    except UnicodeEncodeError:
+        return f"{disposition}; filename*=utf-8''{quote(filename)}"
+
+
+def _apply_cache_headers(response, etag):
+    max_age = getattr(settings, 'PROOF_CACHE_MAX_AGE', 60 * 60 * 24 * 365)
+    # Private: proofs are only visible to authorised users, so shared caches must not keep them
+    response['Cache-Control'] = f'private, max-age={max_age}, immutable'
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def guess_content_type(filename):
+    """Content type for a stored file, by extension; compressed files keep their archive type."""
+    content_type, encoding = mimetypes.guess_type(filename)
+    return ENCODED_CONTENT_TYPES.get(encoding, content_type) or 'application/octet-stream'
+
+
+def serve_protected_file(request, field_file, as_attachment=False):
+    """
+    Return a response delivering ``field_file`` to an already-authorised user.
+
+    Args:
+        request: HTTP request (used for conditional and Range headers)
+        field_file: FieldFile from a FileField (e.g. ``transaction.proof``)
+        as_attachment: Force a download instead of inline display
+
+    Returns:
+        HttpResponse (304 / 206 / 200 / 416) or an offloaded response for the front-end server
+    """
+    filename = os.path.basename(field_file.name)
+    content_type = guess_content_type(filename)
+    etag = build_etag(field_file)
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and (etag in parse_etags(if_none_match) or '*' in parse_etags(if_none_match)):
+        return _apply_cache_headers(HttpResponseNotModified(), etag)
+
+    method = get_serve_method()
+    if method != SERVE_METHOD_DJANGO:
+        # Hand the transfer to the front-end server; it handles Range itself
+        response = HttpResponse(content_type=content_type)
+        if method == SERVE_METHOD_X_ACCEL:
+            prefix = getattr(settings, 'PROOF_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + field_file.name.lstrip('/'))
+        else:
+            response['X-Sendfile'] = field_file.path
+        response['Content-Disposition'] = _content_disposition(filename, as_attachment)
+        return _apply_cache_headers(response, etag)
+
+    storage = field_file.storage
+    size = storage.size(field_file.name)
+
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range or if_range.strip() == etag:
+        byte_range = parse_range_header(request.META.get('HTTP_RANGE'), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return _apply_cache_headers(response, etag)
+
+    fileobj = storage.open(field_file.name, 'rb')
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _ranged_iterator(fileobj, start, length),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    else:
+        response = FileResponse(fileobj, content_type=content_type)
+        response['Content-Length'] = str(size)
+    response['Content-Disposition'] = _content_disposition(filename, as_attachment)
+    return _apply_cache_headers(response, etag)
+
+
+def is_thumbnailable(name):
+    """True when a thumbnail can be generated for the file (images only)."""
+    return os.path.splitext(name or '')[1].lower() in THUMBNAIL_EXTENSIONS
+
+
+def get_thumbnail_name(name, size=THUMBNAIL_SIZE):
+    """Storage name of the thumbnail for ``name``; stable because proof names are immutable.
+
+    The proof's own path is kept under ``THUMBNAIL_DIR``, so ``proofs/a_b.png``
+    and ``proofs/a/b.png`` cannot share a thumbnail.
+    """
+    base = os.path.splitext(name)[0].lstrip('/')
+    return f'{THUMBNAIL_DIR}/{base}_{size}.jpg'
+
+
+def get_or_create_thumbnail(field_file, size=THUMBNAIL_SIZE):
+    """
+    Return the storage name of a JPEG thumbnail for an image proof, creating it on first use.
+
+    Returns None when the file is not an image or Pillow cannot read it.
+    """
+    if not is_thumbnailable(field_file.name):
+        return None
+    storage = field_file.storage
+    thumb_name = get_thumbnail_name(field_file.name, size)
+    if storage.exists(thumb_name):
+        return thumb_name
+
+    try:
+        from io import BytesIO
+        from PIL import Image
+        from django.core.files.base import ContentFile
+
+        with storage.open(field_file.name, 'rb') as source:
+            image = Image.open(source)
+            image.thumbnail((size, size))
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            buffer = BytesIO()
+            image.save(buffer, format='JPEG', quality=80, optimize=True)
+        return storage.save(thumb_name, ContentFile(buffer.getvalue()))
+    except Exception as e:
+        logger.warning(f"Could not create thumbnail for {field_file.name}: {str(e)}")
+        return None
@@ -123,6 +123,9 @@ class TransactionForm(forms.ModelForm):
                 seen.add(val)
         if merged:
             self.fields['category'].choices = merged
+        # The stored label may predate a category rename; show the current name
+        if self.instance.pk and self.instance.category_ref_id and not self.is_bound:
+            self.initial['category'] = self.instance.category_ref.name
         # Only show the 'approve_now' checkbox to staff members
         if not self.user or not self.user.is_staff:
             del self.fields['approve_now']
@@ -0,0 +1,130 @@
+"""
+History policy for models tracked with django-simple-history.
+
+simple_history writes a full historical row on every ``save()``, even when
+nothing changed. ``DiffAwareHistoryMixin`` snapshots tracked values when a
+row is loaded and, on save:
+
+- skips the historical row when no tracked field changed (or when
+  ``update_fields`` only lists unchanged fields)
+- records the names of the changed fields on the historical row
+  (``history_changed_fields``)
+
+``IndexedHistoricalRecords`` adds an ``(id, history_date)`` index to the
+historical table so "latest version of object N as of time T" lookups
+(used by the point-in-time ledger in ``ledger.py``) are index seeks.
+"""
+from django.db import models
+from django.db.models.fields.files import FieldFile
+from django.dispatch import receiver
+from simple_history.models import HistoricalRecords
+from simple_history.signals import pre_create_historical_record
+
+
+class IndexedHistoricalRecords(HistoricalRecords):
+    """HistoricalRecords with a composite (id, history_date) index for as-of lookups."""
+
+    def get_meta_options(self, model):
+        meta_fields = super().get_meta_options(model)
+        meta_fields['indexes'] = tuple(meta_fields.get('indexes', ())) + (
+            models.Index(fields=(model._meta.pk.attname, 'history_date')),
+        )
+        return meta_fields
+
+
+class ChangedFieldsHistoricalModel(models.Model):
+    """Abstract base for historical models: stores which fields a change touched."""
+    history_changed_fields = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        abstract = True
+
+
+class DiffAwareHistoryMixin(models.Model):
+    """Skip no-op history rows and remember which tracked fields changed."""
+
+    # Fields whose changes alone should not produce a history row
+    history_ignored_fields = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_values()
+        return instance
+
+    @classmethod
+    def history_tracked_fields(cls):
+        return [
+            field for field in cls._meta.concrete_fields
+            if not field.primary_key and field.name not in cls.history_ignored_fields
+        ]
+
+    def _tracked_value(self, field):
+        value = getattr(self, field.attname)
+        if isinstance(value, FieldFile):
+            return value.name or None
+        return value
+
+    def _snapshot_tracked_values(self):
+        deferred = self.get_deferred_fields()
+        self._history_loaded_values = {
+            field.attname: self._tracked_value(field)
+            for field in self.history_tracked_fields()
+            if field.attname not in deferred
+        }
+
+    def _refresh_snapshot(self, update_fields=None):
+        """After a save, the saved fields match the database again (only those, for partial saves)."""
+        if update_fields is None or getattr(self, '_history_loaded_values', None) is None:
+            self._snapshot_tracked_values()
+            return
+        names = set(update_fields)
+        for field in self.history_tracked_fields():
+            if field.name in names or field.attname in names:
+                self._history_loaded_values[field.attname] = self._tracked_value(field)
+
+    def get_changed_tracked_fields(self):
+        """Names of tracked fields that differ from the values loaded from the database."""
+        if self._state.adding:
+            return [field.name for field in self.history_tracked_fields()]
+        loaded = getattr(self, '_history_loaded_values', None)
+        if loaded is None:
+            # Instance was not loaded through the ORM; assume everything may have changed
+            return [field.name for field in self.history_tracked_fields()]
+        deferred = self.get_deferred_fields()
+        changed = []
+        for field in self.history_tracked_fields():
+            if field.attname in deferred:
+                continue
+            if field.attname not in loaded or loaded[field.attname] != self._tracked_value(field):
+                changed.append(field.name)
+        return changed
+
+    def save(self, *args, **kwargs):
+        changed = self.get_changed_tracked_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            changed = [name for name in changed if name in set(update_fields)]
+
+        self._history_changed_fields = changed
+        skip_history = not self._state.adding and not changed
+        if skip_history:
+            self.skip_history_when_saving = True
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            if skip_history:
+                del self.skip_history_when_saving
+            del self._history_changed_fields
+        self._refresh_snapshot(update_fields)
+
+
+@receiver(pre_create_historical_record)
+def record_changed_fields(sender, instance, history_instance, **kwargs):
+    """Copy the changed-field list computed in save() onto the historical row."""
+    if not hasattr(history_instance, 'history_changed_fields') or history_instance.history_type == '-':
+        return
+    history_instance.history_changed_fields = getattr(instance, '_history_changed_fields', [])
@@ -0,0 +1,221 @@
+"""
+Per-request timing instrumentation.
+
+``RequestTimingMiddleware`` measures, for each request:
+
+- ``db``: number of SQL queries and time spent executing them (through
+  ``connection.execute_wrapper``)
+- ``tpl``: time spent rendering templates (outermost renders only, so
+  ``{% include %}`` is not counted twice). This patches ``Template.render``
+  for the whole process, so the patch is only in place while
+  ``REQUEST_TIMING_ENABLED`` is on and is undone when it is turned off
+- named spans recorded by views with ``timing_span`` (e.g. ``pdf``, ``xlsx``)
+- ``total``: time spent in the view and the middleware below this one
+
+The numbers are sent as a ``Server-Timing`` header, which browser dev tools
+show next to the request, and logged as one ``key=value`` line per request
+on the ``tedx_finance.timing`` logger (also passed as ``extra`` for
+structured handlers). Enabled by the ``REQUEST_TIMING_ENABLED`` setting;
+with it off the middleware still tracks queries when the slow-query log
+is on (``SLOW_QUERY_THRESHOLD_MS``), since that log is fed from here.
+
+The request being processed is available from ``current_request()`` either
+way, so code far from the view (e.g. the slow-query log) can tell which
+page issued a query.
+
+Other middleware that needs query counts or DB time (metrics) reads them
+from ``track_request()`` rather than wrapping the connection again: the
+first middleware to ask starts the request's ``RequestTimings`` and its
+execute wrapper, and the ones below it share them, so each statement is
+timed once.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection
+from django.dispatch import receiver
+from django.template.base import Template
+
+timing_logger = logging.getLogger('tedx_finance.timing')
+
+_current_timings = ContextVar('tedx_request_timings', default=None)
+_current_request = ContextVar('tedx_current_request', default=None)
+
+
+class RequestTimings:
+    """Timings collected while a single request is processed."""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.spans = {}
+
+    def add_span(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook; also the slow-query log's timer
+        start = time.perf_counter()
+        try:
+            result = execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.db_time += elapsed
+            self.db_queries += 1
+        threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 0)
+        if threshold and elapsed * 1000 >= threshold:
+            from .slow_queries import log_slow_query
+            log_slow_query(context['connection'], sql, params, many, elapsed * 1000)
+        return result
+
+
+def current_request():
+    """The request being processed by ``RequestTimingMiddleware``, or None."""
+    return _current_request.get()
+
+
+def current_timings():
+    """Timings of the request being processed, or None outside an instrumented request."""
+    return _current_timings.get()
+
+
+@contextmanager
+def track_request():
+    """Timings of the current request, started here (with the execute wrapper) if nothing tracks it yet."""
+    timings = _current_timings.get()
+    if timings is not None:
+        yield timings
+        return
+    timings = RequestTimings()
+    token = _current_timings.set(timings)
+    try:
+        with connection.execute_wrapper(timings):
+            yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+@contextmanager
+def timing_span(name):
+    """Time a block as a named ``Server-Timing`` metric of the current request (no-op when off)."""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_span(name, time.perf_counter() - start)
+
+
+_original_template_render = Template.render
+
+
+def _timed_template_render(self, context):
+    timings = _current_timings.get()
+    if timings is None:
+        return _original_template_render(self, context)
+    timings.template_depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_template_render(self, context)
+    finally:
+        timings.template_depth -= 1
+        if timings.template_depth == 0:
+            timings.template_time += time.perf_counter() - start
+
+
+def install_template_timer():
+    """Route template renders through the timer (idempotent)."""
+    if Template.render is not _timed_template_render:
+        Template.render = _timed_template_render
+
+
+def uninstall_template_timer():
+    """Give templates their own ``render`` back (idempotent)."""
+    if Template.render is _timed_template_render:
+        Template.render = _original_template_render
+
+
+def sync_template_timer():
+    """Install the template timer while ``REQUEST_TIMING_ENABLED`` is on, remove it otherwise."""
+    if getattr(settings, 'REQUEST_TIMING_ENABLED', False):
+        install_template_timer()
+    else:
+        uninstall_template_timer()
+
+
+@receiver(setting_changed)
+def _request_timing_setting_changed(setting, **kwargs):
+    if setting == 'REQUEST_TIMING_ENABLED':
+        sync_template_timer()
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+def server_timing_header(timings, total):
+    metrics = [
+        f'db;dur={_ms(timings.db_time)};desc="{timings.db_queries} queries"',
+        f'tpl;dur={_ms(timings.template_time)}',
+    ]
+    metrics += [f'{name};dur={_ms(seconds)}' for name, seconds in timings.spans.items()]
+    metrics.append(f'total;dur={_ms(total)}')
+    return ', '.join(metrics)
+
+
+class RequestTimingMiddleware:
+    """Record query count/time, template time and total time; emit Server-Timing and a log line."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        sync_template_timer()
+
+    def __call__(self, request):
+        request_token = _current_request.set(request)
+        try:
+            return self.process(request)
+        finally:
+            _current_request.reset(request_token)
+
+    def process(self, request):
+        enabled = getattr(settings, 'REQUEST_TIMING_ENABLED', False)
+        if not enabled and not getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 0):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with track_request() as timings:
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+        if not enabled:
+            return response
+
+        response['Server-Timing'] = server_timing_header(timings, total)
+        self.log(request, response, timings, total)
+        return response
+
+    def log(self, request, response, timings, total):
+        match = getattr(request, 'resolver_match', None)
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else '',
+            'status': response.status_code,
+            'db_queries': timings.db_queries,
+            'db_ms': _ms(timings.db_time),
+            'template_ms': _ms(timings.template_time),
+            **{f'{name}_ms': _ms(seconds) for name, seconds in timings.spans.items()},
+            'total_ms': _ms(total),
+        }
+        timing_logger.info(
+            ' '.join(f'{key}={value}' for key, value in fields.items()),
+            extra={'timing': fields},
+        )
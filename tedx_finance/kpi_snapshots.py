@@ -0,0 +1,225 @@
+"""
+Stored snapshots of the dashboard KPI panel.
+
+Burn rates, runway, velocity, growth rate, category concentration and the
+month comparison take a dozen aggregates to compute. Instead of running them
+on every dashboard load, the result of ``build_kpis_panel`` is stored per
+date range in ``KPISnapshot`` and served as-is.
+
+Only canonical ranges are stored (``is_canonical``): the default views and
+whole calendar months and years of this year and last. Any other range
+comes from the query string, so it is computed on request and kept in the
+cache for ``ADHOC_CACHE_SECONDS`` (keyed by ledger version) instead of
+growing the table. Snapshots whose range is no longer canonical (yesterday's "this
+month") are purged whenever a new snapshot row is created.
+
+A snapshot is stale once the ledger version has moved on (any write to the
+ledger invalidates every snapshot, without touching the table) or once the
+day it was computed for has passed. Stale snapshots are still served
+immediately; a single background thread per range recomputes them. The
+refresh is claimed on the snapshot row itself (``refresh_started_at``, set by
+a conditional UPDATE), so a crowd of reloads across every worker process
+triggers one refresh. The
+``refresh_kpis`` management command recomputes the default ranges ahead of
+time (e.g. from cron).
+"""
+import logging
+import threading
+import calendar
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .ledger import ledger_version
+from .models import KPISnapshot
+
+logger = logging.getLogger(__name__)
+
+# A claim older than this is taken to belong to a worker that died mid-refresh
+REFRESH_LOCK_SECONDS = 5 * 60
+# Ad-hoc ranges are cached as long as the KPI panel's builder output would be
+ADHOC_CACHE_SECONDS = 120
+
+
+def range_key(start_date=None, end_date=None):
+    """Snapshot key for a dashboard date range."""
+    if not start_date and not end_date:
+        return 'all'
+    return f"{start_date.isoformat() if start_date else ''}:{end_date.isoformat() if end_date else ''}"
+
+
+def default_ranges(today=None):
+    """Ranges kept warm by ``refresh_kpis``: all time, this month and the last 30 days."""
+    today = today or timezone.localdate()
+    return [
+        (None, None),
+        (today.replace(day=1), today),
+        (today - timedelta(days=29), today),
+    ]
+
+
+def is_canonical(start_date=None, end_date=None, today=None):
+    """True for ranges worth a stored snapshot: a default range, or a whole month or year of this year or last."""
+    today = today or timezone.localdate()
+    if (start_date, end_date) in default_ranges(today):
+        return True
+    if not start_date or not end_date or start_date.year < today.year - 1 or start_date.year != end_date.year:
+        return False
+    if start_date.day == 1 and start_date.month == end_date.month:
+        return end_date.day == calendar.monthrange(end_date.year, end_date.month)[1]
+    return (start_date.month, start_date.day, end_date.month, end_date.day) == (1, 1, 12, 31)
+
+
+def purge_snapshots(today=None):
+    """Delete snapshots of ranges that are no longer canonical; returns how many."""
+    stale_ids = [
+        snapshot_id
+        for snapshot_id, start_date, end_date in KPISnapshot.objects.values_list('id', 'start_date', 'end_date')
+        if not is_canonical(start_date, end_date, today)
+    ]
+    if not stale_ids:
+        return 0
+    return KPISnapshot.objects.filter(id__in=stale_ids).delete()[0]
+
+
+def _jsonable(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+def is_stale(snapshot, version=None, today=None):
+    """True when the ledger changed or the day moved on since ``snapshot`` was computed."""
+    version = ledger_version() if version is None else version
+    today = today or timezone.localdate()
+    return snapshot.ledger_version != version or snapshot.computed_for != today
+
+
+def refresh_snapshot(start_date=None, end_date=None):
+    """Recompute and store the KPI panel for a (canonical) date range; returns the snapshot."""
+    from .dashboard_panels import build_kpis_panel
+
+    # Read the version first: writes racing with the computation leave the snapshot stale, not wrong
+    version = ledger_version()
+    today = timezone.localdate()
+    context, data = build_kpis_panel(start_date, end_date, False)
+    snapshot, created = KPISnapshot.objects.update_or_create(
+        range_key=range_key(start_date, end_date),
+        defaults={
+            'start_date': start_date,
+            'end_date': end_date,
+            'context': _jsonable(context),
+            'data': _jsonable(data),
+            'ledger_version': version,
+            'computed_for': today,
+            'computed_at': timezone.now(),
+            'refresh_started_at': None,
+        },
+    )
+    if created:
+        # A new row usually means the day moved on; drop the ranges that went with it
+        purge_snapshots(today)
+    return snapshot
+
+
+def claim_refresh(key):
+    """
+    Mark the snapshot for ``key`` as being refreshed; True if this caller got the claim.
+
+    A single conditional UPDATE in the shared database, so only one worker
+    process wins even when several see the same stale snapshot at once.
+    """
+    now = timezone.now()
+    unclaimed = Q(refresh_started_at__isnull=True) | Q(refresh_started_at__lt=now - timedelta(seconds=REFRESH_LOCK_SECONDS))
+    return KPISnapshot.objects.filter(unclaimed, range_key=key).update(refresh_started_at=now) == 1
+
+
+def release_refresh(key):
+    """Drop the claim on a snapshot whose refresh failed; a successful refresh clears it when saving."""
+    KPISnapshot.objects.filter(range_key=key).update(refresh_started_at=None)
+
+
+def _refresh_in_background(start_date, end_date):
+    try:
+        refresh_snapshot(start_date, end_date)
+    except Exception as e:
+        logger.error(f"KPI snapshot refresh failed for {range_key(start_date, end_date)}: {e}", exc_info=True)
+        release_refresh(range_key(start_date, end_date))
+    finally:
+        connection.close()
+
+
+def schedule_refresh(start_date=None, end_date=None):
+    """
+    Refresh a range's stored snapshot unless a refresh is already running in any worker.
+
+    Runs in a daemon thread, or inline when ``KPI_SNAPSHOT_BACKGROUND_REFRESH``
+    is False. Returns True when this call started a refresh.
+    """
+    key = range_key(start_date, end_date)
+    if not claim_refresh(key):
+        return False
+    if not getattr(settings, 'KPI_SNAPSHOT_BACKGROUND_REFRESH', True):
+        try:
+            refresh_snapshot(start_date, end_date)
+        except Exception:
+            release_refresh(key)
+            raise
+        return True
+    threading.Thread(
+        target=_refresh_in_background,
+        args=(start_date, end_date),
+        name='kpi-snapshot-refresh',
+        daemon=True,
+    ).start()
+    return True
+
+
+def get_kpi_snapshot(start_date=None, end_date=None):
+    """
+    Return the KPI panel ``(context, data)`` for a date range without waiting on a stale refresh.
+
+    ``data['snapshot']`` carries ``computed_at`` and whether the values are stale.
+    Ranges that are not canonical are computed (or read from the cache) without
+    storing a snapshot.
+    """
+    version = ledger_version()
+    if not is_canonical(start_date, end_date):
+        return _adhoc_kpis(start_date, end_date, version)
+
+    snapshot = KPISnapshot.objects.filter(range_key=range_key(start_date, end_date)).first()
+    if snapshot is None:
+        # Nothing to serve yet: compute once in the request
+        snapshot = refresh_snapshot(start_date, end_date)
+    elif is_stale(snapshot, version):
+        if schedule_refresh(start_date, end_date) and not getattr(settings, 'KPI_SNAPSHOT_BACKGROUND_REFRESH', True):
+            snapshot.refresh_from_db()
+
+    data = dict(snapshot.data)
+    data['snapshot'] = {
+        'computed_at': snapshot.computed_at.isoformat(),
+        'stale': is_stale(snapshot, version),
+    }
+    return snapshot.context, data
+
+
+def _adhoc_kpis(start_date, end_date, version):
+    from .dashboard_panels import build_kpis_panel
+
+    cache_key = f'kpi_adhoc:{version}:{range_key(start_date, end_date)}'
+    result = cache.get(cache_key)
+    if result is None:
+        context, data = build_kpis_panel(start_date, end_date, False)
+        data = dict(data, snapshot={'computed_at': timezone.now().isoformat(), 'stale': False})
+        result = (_jsonable(context), _jsonable(data))
+        cache.set(cache_key, result, ADHOC_CACHE_SECONDS)
+    return result
@@ -0,0 +1,217 @@
+"""
+Point-in-time ledger queries reconstructed from the simple_history tables.
+
+``ledger_as_of(at)`` answers "what were income, spending, balance and budget
+utilization at time X". It starts from the nearest ``LedgerCheckpoint``
+at or before X and replays only objects whose history changed between the
+checkpoint and X: their contribution at the checkpoint is subtracted and
+their contribution at X added. "Latest version of object N at time T" is
+a correlated lookup served by the (id, history_date) index on each
+historical table.
+
+Spending is keyed by category id, so renamed categories keep their history.
+Budgets themselves are not historical, so utilization is computed against
+the current budget definitions.
+
+``ledger_version()`` is a stamp bumped on every ledger write; caches and
+ETags (see ``etags.py``) key on it.
+"""
+import logging
+from decimal import Decimal
+
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Budget, Category, LedgerCheckpoint, LedgerVersion, ManagementFund, Sponsor, SponsorTier, Transaction
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0')
+
+
+def empty_state():
+    return {
+        'management_funds': ZERO,
+        'sponsor_funds': ZERO,
+        'spent': ZERO,
+        'spent_by_category_date': {},
+    }
+
+
+def _latest_versions(history_model, at, ids=None, fields=()):
+    """
+    Latest historical row per object with history_date <= ``at``.
+
+    Args:
+        history_model: e.g. Transaction.history.model
+        at: Timestamp to reconstruct
+        ids: Optional queryset/list restricting which objects to look up
+        fields: Columns to fetch (history_type is always included)
+    """
+    latest = (
+        history_model.objects.filter(id=OuterRef('id'), history_date__lte=at)
+        .order_by('-history_date', '-history_id')
+        .values('history_id')[:1]
+    )
+    rows = history_model.objects.filter(history_date__lte=at)
+    if ids is not None:
+        rows = rows.filter(id__in=ids)
+    return rows.filter(history_id=Subquery(latest)).values('id', 'history_type', *fields)
+
+
+def _apply_income(state, key, rows, sign):
+    for row in rows:
+        if row['history_type'] != '-':
+            state[key] += sign * row['amount']
+
+
+def _apply_spending(state, rows, sign):
+    by_category = state['spent_by_category_date']
+    for row in rows:
+        if row['history_type'] == '-' or not row['approved'] or row['amount'] >= 0:
+            continue
+        amount = sign * abs(row['amount'])
+        state['spent'] += amount
+        key = str(row['category_ref_id']) if row['category_ref_id'] else ''
+        dates = by_category.setdefault(key, {})
+        day = row['date'].isoformat()
+        dates[day] = dates.get(day, ZERO) + amount
+
+
+def _replay(state, since, at):
+    """Bring ``state`` (valid at ``since``, or empty when since is None) forward to ``at``."""
+    sources = (
+        (ManagementFund, lambda st, rows, sign: _apply_income(st, 'management_funds', rows, sign), ('amount',)),
+        (Sponsor, lambda st, rows, sign: _apply_income(st, 'sponsor_funds', rows, sign), ('amount',)),
+        (Transaction, _apply_spending, ('amount', 'approved', 'category_ref_id', 'date')),
+    )
+    for model, apply, fields in sources:
+        history_model = model.history.model
+        if since is None:
+            apply(state, _latest_versions(history_model, at, fields=fields), 1)
+            continue
+        changed_ids = (
+            history_model.objects.filter(history_date__gt=since, history_date__lte=at)
+            .values('id')
+        )
+        apply(state, _latest_versions(history_model, since, ids=changed_ids, fields=fields), -1)
+        apply(state, _latest_versions(history_model, at, ids=changed_ids, fields=fields), 1)
+    return state
+
+
+def _checkpoint_to_state(checkpoint):
+    return {
+        'management_funds': checkpoint.management_fund_total,
+        'sponsor_funds': checkpoint.sponsor_total,
+        'spent': checkpoint.spent_total,
+        'spent_by_category_date': {
+            category: {day: Decimal(value) for day, value in days.items()}
+            for category, days in (checkpoint.spent_by_category_date or {}).items()
+        },
+    }
+
+
+def ledger_state_as_of(at):
+    """Raw reconstructed totals at ``at`` (see empty_state() for the shape)."""
+    checkpoint = LedgerCheckpoint.objects.filter(as_of__lte=at).order_by('-as_of').first()
+    if checkpoint:
+        return _replay(_checkpoint_to_state(checkpoint), checkpoint.as_of, at)
+    return _replay(empty_state(), None, at)
+
+
+def ledger_as_of(at=None):
+    """
+    Ledger totals and budget utilization as they were at ``at`` (default: now).
+
+    Returns:
+        dict with totals, balance and a 'budgets' list of per-budget utilization
+    """
+    at = at or timezone.now()
+    state = ledger_state_as_of(at)
+    total_income = state['management_funds'] + state['sponsor_funds']
+
+    category_names = dict(Category.objects.values_list('id', 'name'))
+    budgets = []
+    for budget in Budget.objects.select_related('category').order_by('category__name'):
+        days = state['spent_by_category_date'].get(str(budget.category_id), {})
+        start, end = budget.start_date.isoformat(), budget.end_date.isoformat()
+        spent = sum((value for day, value in days.items() if start <= day <= end), ZERO)
+        utilization = float(spent / budget.amount * 100) if budget.amount else 0
+        budgets.append({
+            'category': budget.category.name,
+            'budget_amount': budget.amount,
+            'spent': spent,
+            'remaining': budget.amount - spent,
+            'utilization': round(utilization, 1),
+            'exceeded': spent > budget.amount,
+        })
+
+    return {
+        'as_of': at,
+        'management_funds': state['management_funds'],
+        'sponsor_funds': state['sponsor_funds'],
+        'total_income': total_income,
+        'total_spent': state['spent'],
+        'balance': total_income - state['spent'],
+        'spent_by_category': dict(sorted(
+            (category_names.get(int(key), 'Uncategorized') if key else 'Uncategorized', sum(days.values(), ZERO))
+            for key, days in state['spent_by_category_date'].items()
+        )),
+        'budgets': budgets,
+    }
+
+
+def create_checkpoint(at=None):
+    """Materialize the ledger state at ``at`` (default: now) as a LedgerCheckpoint."""
+    at = at or timezone.now()
+    state = ledger_state_as_of(at)
+    spent_by_category_date = {
+        category: {day: str(value) for day, value in days.items() if value}
+        for category, days in state['spent_by_category_date'].items()
+    }
+    checkpoint, _ = LedgerCheckpoint.objects.update_or_create(
+        as_of=at,
+        defaults={
+            'management_fund_total': state['management_funds'],
+            'sponsor_total': state['sponsor_funds'],
+            'spent_total': state['spent'],
+            'spent_by_category_date': {k: v for k, v in spent_by_category_date.items() if v},
+        },
+    )
+    logger.info(f"Ledger checkpoint created at {at}")
+    return checkpoint
+
+
+def ledger_version():
+    """
+    Current ledger version stamp, for cache keys and ETags.
+
+    A single primary-key lookup; the stamp changes on every write to a
+    transaction, fund, sponsor, budget or category.
+    """
+    return LedgerVersion.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+def bump_ledger_version():
+    """
+    Advance the ledger version stamp.
+
+    Runs in the caller's database transaction, so the new version becomes
+    visible together with the write that caused it. Bulk operations that
+    bypass model signals (``QuerySet.update``, raw deletes) call this directly.
+    """
+    if not LedgerVersion.objects.filter(pk=1).update(version=F('version') + 1, updated_at=timezone.now()):
+        LedgerVersion.objects.get_or_create(pk=1)
+        LedgerVersion.objects.filter(pk=1).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+@receiver([post_save, post_delete], sender=Sponsor)
+@receiver([post_save, post_delete], sender=ManagementFund)
+@receiver([post_save, post_delete], sender=Budget)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=SponsorTier)
+def bump_ledger_version_on_write(sender, **kwargs):
+    bump_ledger_version()
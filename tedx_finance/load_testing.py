@@ -0,0 +1,368 @@
+"""
+Load testing against a running server.
+
+Virtual users log in over HTTP and repeat a scenario until the test ends,
+pausing for a randomized think time between iterations, the way people
+use the app on event day:
+
+- ``treasurer_approver``: opens the approval queue and approves a pending
+  transaction
+- ``volunteer_submitter``: opens the add form and submits an expense with
+  a proof image
+- ``dashboard_viewer``: loads the dashboard and every panel, like the
+  browser does, and now and then the finance report
+- ``background_export``: a treasurer downloading the Excel and ZIP exports
+  every so often
+
+Every request is recorded with its endpoint (URL name), latency and status;
+``summarize`` turns the samples into throughput, p50/p95/p99 latency and
+error rates per endpoint. Redirects are not followed: a form POST must be
+answered with a redirect (a re-rendered form means it was rejected), and
+statuses of 400 and above and connection errors are errors.
+
+The client is the standard library (one cookie jar per user), so the
+harness runs wherever the app does. ``ensure_accounts`` creates the
+``loadtest_*`` accounts in the configured database, which the server under
+test must share; see the ``load_test`` management command.
+"""
+import http.cookiejar
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+
+from .dashboard_panels import PANELS
+from .scale_data import PROOF_PNG
+
+ACCOUNT_PREFIX = 'loadtest'
+DEFAULT_PASSWORD = 'loadtest-password'
+APPROVE_LINK = re.compile(r'/transaction/(\d+)/approve/')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def _multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content, content_type) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode() + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class Recorder:
+    """Thread-safe collection of ``(endpoint, ms, status, error)`` samples."""
+
+    def __init__(self):
+        self.samples = []
+        self.lock = threading.Lock()
+
+    def add(self, endpoint, ms, status, error=''):
+        with self.lock:
+            self.samples.append((endpoint, ms, status, error))
+
+
+class VirtualUser:
+    """One simulated person: a logged-in cookie session that records every request."""
+
+    def __init__(self, base_url, recorder, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect())
+
+    def csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def request(self, endpoint, path, data=None, files=None, expect=None):
+        """
+        Make a request and record it; returns ``(status, body)`` (status 0 on connection errors).
+
+        With ``expect``, any other status is an error (e.g. a form re-rendered with errors instead of redirecting).
+        """
+        url = self.base_url + path
+        headers = {}
+        body = None
+        if data is not None or files:
+            headers['X-CSRFToken'] = self.csrf_token()
+            headers['Referer'] = url
+            if files:
+                body, headers['Content-Type'] = _multipart(data or {}, files)
+            else:
+                body = urllib.parse.urlencode(data).encode()
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        start = time.perf_counter()
+        try:
+            with self.opener.open(urllib.request.Request(url, data=body, headers=headers), timeout=self.timeout) as response:
+                status, content = response.status, response.read()
+            error = ''
+        except urllib.error.HTTPError as e:
+            status, content = e.code, e.read()
+            error = f'HTTP {e.code}' if e.code >= 400 else ''
+        except (urllib.error.URLError, OSError) as e:
+            status, content = 0, b''
+            error = type(getattr(e, 'reason', e)).__name__
+        if expect and not error and status != expect:
+            error = f'{endpoint}: expected {expect}, got {status}'
+        self.recorder.add(endpoint, (time.perf_counter() - start) * 1000, status, error)
+        return status, content
+
+    def get(self, endpoint, path):
+        return self.request(endpoint, path)
+
+    def post(self, endpoint, path, data, files=None, expect=302):
+        return self.request(endpoint, path, data, files, expect)
+
+    def login(self, username, password):
+        self.get('login', '/login/')
+        # A successful login redirects to the dashboard; a failed one re-renders the form
+        status, _ = self.post('login', '/login/', {'username': username, 'password': password})
+        return status == 302
+
+
+def _dashboard(user, rng):
+    user.get('dashboard', '/')
+    for name in PANELS:
+        user.get(f'dashboard_panel:{name}', f'/dashboard/panels/{name}/')
+
+
+def _treasurer_approving(user, rng):
+    _, queue = user.get('dashboard_panel:pending', '/dashboard/panels/pending/')
+    user.get('transactions_table', '/transactions/?status=pending')
+    pending = APPROVE_LINK.findall(queue.decode('utf-8', 'replace'))
+    if pending:
+        pk = rng.choice(pending)
+        user.post('approve_transaction', f'/transaction/{pk}/approve/', {})
+
+
+def _volunteer_submitting(user, rng):
+    user.get('add_transaction', '/add/')
+    user.post(
+        'add_transaction',
+        '/add/',
+        {
+            'title': f'Load test expense {rng.randrange(1_000_000)}',
+            'amount': f'-{rng.randrange(100, 20000)}.00',
+            'category': rng.choice(['Logistics', 'Marketing', 'Venue', 'Other']),
+            'date': date.today().isoformat(),
+        },
+        files={'proof': ('receipt.png', PROOF_PNG, 'image/png')},
+    )
+    user.get('get_unread_count', '/notifications/api/unread/')
+
+
+def _dashboard_viewing(user, rng):
+    _dashboard(user, rng)
+    if rng.random() < 0.2:
+        user.get('finance_report', '/report/')
+
+
+def _background_export(user, rng):
+    user.get('export_xlsx', '/export/excel/')
+    if rng.random() < 0.3:
+        user.get('export_zip', '/export/zip/')
+
+
+# Scenario name -> {'role': account type, 'weight': default share of users,
+#                   'run': callable(user, rng) for one iteration, 'think': think-time multiplier}
+SCENARIOS = {
+    'treasurer_approver': {'role': 'treasurer', 'weight': 2, 'run': _treasurer_approving, 'think': 1},
+    'volunteer_submitter': {'role': 'volunteer', 'weight': 4, 'run': _volunteer_submitting, 'think': 1},
+    'dashboard_viewer': {'role': 'volunteer', 'weight': 6, 'run': _dashboard_viewing, 'think': 1},
+    'background_export': {'role': 'treasurer', 'weight': 1, 'run': _background_export, 'think': 10},
+}
+
+
+def ensure_accounts(treasurers=3, volunteers=10, password=DEFAULT_PASSWORD, prefix=ACCOUNT_PREFIX):
+    """
+    Create (or reset the password of) the load test accounts.
+
+    Treasurers are superusers in the Treasurer group, as ``create_treasurer``
+    makes them. Returns ``{'treasurer': [(username, password)], 'volunteer': [...]}``.
+    """
+    group, _ = Group.objects.get_or_create(name='Treasurer')
+    accounts = {'treasurer': [], 'volunteer': []}
+    for role, count in (('treasurer', treasurers), ('volunteer', volunteers)):
+        for i in range(1, count + 1):
+            username = f'{prefix}_{role}_{i:03d}'
+            user, _ = User.objects.get_or_create(username=username, defaults={'email': f'{username}@example.com'})
+            user.set_password(password)
+            user.is_staff = user.is_superuser = role == 'treasurer'
+            user.save()
+            if role == 'treasurer':
+                user.groups.add(group)
+            accounts[role].append((username, password))
+    return accounts
+
+
+def assign_scenarios(users, mix=None, seed=42):
+    """Scenario per virtual user, in proportion to ``mix`` (default: the scenario weights)."""
+    weights = mix or {name: scenario['weight'] for name, scenario in SCENARIOS.items()}
+    names = [name for name, weight in weights.items() if weight > 0]
+    total = sum(weights[name] for name in names)
+    # Largest-remainder apportionment, so small runs still get every scenario with weight
+    quotas = {name: users * weights[name] / total for name in names}
+    counts = {name: int(quota) for name, quota in quotas.items()}
+    for name in sorted(names, key=lambda n: quotas[n] - counts[n], reverse=True)[:users - sum(counts.values())]:
+        counts[name] += 1
+    assigned = [name for name in names for _ in range(counts[name])]
+    random.Random(seed).shuffle(assigned)
+    return assigned
+
+
+def run_load_test(base_url, accounts, users=10, duration=60, ramp_up=0, mix=None, think_time=1.0, seed=42, timeout=30):
+    """
+    Drive ``base_url`` with ``users`` concurrent virtual users for ``duration`` seconds.
+
+    Users start evenly over ``ramp_up`` seconds and log in with the
+    ``accounts`` of their scenario's role (shared round-robin). Returns
+    ``summarize`` output plus the scenario of each user.
+    """
+    recorder = Recorder()
+    assigned = assign_scenarios(users, mix, seed)
+    next_account = {role: 0 for role in accounts}
+    account_lock = threading.Lock()
+    start = time.monotonic()
+
+    def account_for(role):
+        with account_lock:
+            index = next_account[role]
+            next_account[role] += 1
+        return accounts[role][index % len(accounts[role])]
+
+    def simulate(index, name):
+        scenario = SCENARIOS[name]
+        rng = random.Random(seed * 1000 + index)
+        time.sleep(ramp_up * index / max(users, 1))
+        user = VirtualUser(base_url, recorder, timeout)
+        if not user.login(*account_for(scenario['role'])):
+            return
+        # The clock starts once logged in (password hashing can take a while), and
+        # every user runs its scenario at least once
+        deadline = time.monotonic() + duration
+        while True:
+            scenario['run'](user, rng)
+            if time.monotonic() >= deadline:
+                break
+            pause = think_time * scenario['think'] * rng.uniform(0.5, 1.5)
+            time.sleep(max(min(pause, deadline - time.monotonic()), 0))
+
+    threads = [threading.Thread(target=simulate, args=(i, name), daemon=True) for i, name in enumerate(assigned)]
+    for thread in threads:
+        thread.start()
+    # Room for each user's login and last request on top of the run itself
+    join_until = start + ramp_up + duration + 2 * timeout + 5
+    for thread in threads:
+        thread.join(max(join_until - time.monotonic(), 0))
+    elapsed = time.monotonic() - start
+
+    with recorder.lock:
+        samples = list(recorder.samples)
+    summary = summarize(samples, elapsed)
+    summary['scenarios'] = {name: assigned.count(name) for name in SCENARIOS if name in assigned}
+    return summary
+
+
+def _stats(latencies, errors, elapsed):
+    values = np.array(latencies, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'errors': errors,
+        'error_rate': round(errors / len(latencies), 4),
+        'p50_ms': round(float(p50), 1),
+        'p95_ms': round(float(p95), 1),
+        'p99_ms': round(float(p99), 1),
+        'max_ms': round(float(values.max()), 1),
+    }
+
+
+def summarize(samples, elapsed):
+    """Overall and per-endpoint throughput, latency percentiles and error rates."""
+    by_endpoint = {}
+    for endpoint, ms, _, error in samples:
+        entry = by_endpoint.setdefault(endpoint, {'latencies': [], 'errors': 0})
+        entry['latencies'].append(ms)
+        entry['errors'] += bool(error)
+    summary = {'duration_s': round(elapsed, 1)}
+    if samples:
+        summary['total'] = _stats([ms for _, ms, _, _ in samples], sum(bool(s[3]) for s in samples), elapsed)
+    else:
+        summary['total'] = {'requests': 0, 'throughput_rps': 0.0, 'errors': 0, 'error_rate': 0.0}
+    summary['endpoints'] = {
+        endpoint: _stats(entry['latencies'], entry['errors'], elapsed)
+        for endpoint, entry in sorted(by_endpoint.items())
+    }
+    summary['error_kinds'] = {}
+    for _, _, _, error in samples:
+        if error:
+            summary['error_kinds'][error] = summary['error_kinds'].get(error, 0) + 1
+    return summary
+
+
+# --- Local server -----------------------------------------------------------
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(base_url, timeout=30):
+    """Poll the login page until the server answers; returns False on timeout."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(base_url.rstrip('/') + '/login/', timeout=2):
+                return True
+        except urllib.error.HTTPError:
+            return True
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    return False
+
+
+def start_server(port, workers=None, threads=1, log=None):
+    """
+    Start the app on ``127.0.0.1:port``: gunicorn with ``workers`` processes
+    (and ``threads`` threads each) when given, else the development server.
+    Server output goes to the ``log`` file object (default: discarded).
+    """
+    if workers:
+        command = [
+            sys.executable, '-m', 'gunicorn', 'realtime_tedx.wsgi:application',
+            '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--threads', str(threads),
+            '--timeout', '120', '--log-level', 'warning',
+        ]
+    else:
+        command = [sys.executable, 'manage.py', 'runserver', '--noreload', f'127.0.0.1:{port}']
+    return subprocess.Popen(
+        command,
+        cwd=str(settings.BASE_DIR),
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'realtime_tedx.settings')},
+        stdout=log or subprocess.DEVNULL,
+        stderr=log or subprocess.DEVNULL,
+    )
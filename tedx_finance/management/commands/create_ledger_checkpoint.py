@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tedx_finance.ledger import create_checkpoint
+
+
+class Command(BaseCommand):
+    help = 'Materialize ledger totals as a checkpoint for point-in-time reports (run periodically, e.g. nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--at',
+            type=str,
+            help='ISO timestamp to checkpoint (default: now)'
+        )
+
+    def handle(self, *args, **options):
+        at = None
+        if options.get('at'):
+            try:
+                at = datetime.fromisoformat(options['at'])
+            except ValueError:
+                raise CommandError('--at must be an ISO date/time, e.g. 2025-01-31T23:59')
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        checkpoint = create_checkpoint(at)
+        self.stdout.write(self.style.SUCCESS(
+            f"Checkpoint at {checkpoint.as_of}: income ₹{checkpoint.management_fund_total + checkpoint.sponsor_total}, "
+            f"spent ₹{checkpoint.spent_total}"
+        ))
@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tedx_finance.scale_data import generate_scale_data
+from tedx_finance.views import parse_date
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load a deterministic synthetic dataset (users, categories, budgets, funds, transactions, ...) for performance work'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; same seed and counts give the same data')
+        parser.add_argument('--users', type=int, default=50, help='Users to create')
+        parser.add_argument('--categories', type=int, default=12, help='Categories to create (one budget each)')
+        parser.add_argument('--sponsors', type=int, default=200, help='Sponsors to create')
+        parser.add_argument('--management-funds', type=int, default=100, help='Management funds to create')
+        parser.add_argument('--transactions', type=int, default=100_000, help='Transactions to create')
+        parser.add_argument('--proofs', type=int, default=0, help='Transactions that get a generated proof image')
+        parser.add_argument('--notifications', type=int, default=10_000, help='Notifications to create')
+        parser.add_argument('--login-attempts', type=int, default=10_000, help='Login attempts to create')
+        parser.add_argument('--approval-ratio', type=float, default=0.85, help='Share of approved transactions (0-1)')
+        parser.add_argument('--days', type=int, default=730, help='Days of history the transactions span')
+        parser.add_argument('--end-date', type=str, help='Last day of the range (YYYY-MM-DD, default today)')
+        parser.add_argument('--prefix', type=str, default='scale', help='Username prefix for generated users')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT batch')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['approval_ratio'] <= 1:
+            raise CommandError('--approval-ratio must be between 0 and 1')
+        if options['days'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--days and --batch-size must be positive')
+        counts = ('users', 'categories', 'sponsors', 'management_funds', 'transactions', 'proofs', 'notifications', 'login_attempts')
+        if any(options[name] < 0 for name in counts):
+            raise CommandError('Row counts cannot be negative')
+        if options['proofs'] > options['transactions']:
+            raise CommandError('--proofs cannot exceed --transactions')
+        end_date = parse_date(options.get('end_date'))
+        if options.get('end_date') and not end_date:
+            raise CommandError('--end-date must be a date in YYYY-MM-DD format')
+
+        started = time.monotonic()
+        last_report = {}
+
+        def progress(label, done, total):
+            # One line per ~10% so a million rows do not flood the terminal
+            step = max(total // 10, 1)
+            if done == total or done // step != last_report.get(label, -1):
+                last_report[label] = done // step
+                self.stdout.write(f"  {label}: {done:,}/{total:,} ({time.monotonic() - started:.1f}s)")
+
+        created = generate_scale_data(
+            seed=options['seed'],
+            users=options['users'],
+            categories=options['categories'],
+            sponsors=options['sponsors'],
+            management_funds=options['management_funds'],
+            transactions=options['transactions'],
+            proofs=options['proofs'],
+            notifications=options['notifications'],
+            login_attempts=options['login_attempts'],
+            approval_ratio=options['approval_ratio'],
+            days=options['days'],
+            end_date=end_date,
+            prefix=options['prefix'],
+            batch_size=options['batch_size'],
+            progress=progress,
+        )
+
+        for name, count in created.items():
+            self.stdout.write(f"  {name.replace('_', ' ')}: {count:,}")
+        self.stdout.write(self.style.SUCCESS(f"Generated scale data (seed {options['seed']}) in {time.monotonic() - started:.1f}s"))
@@ -0,0 +1,145 @@
+import importlib.util
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tedx_finance.load_testing import (
+    DEFAULT_PASSWORD, SCENARIOS, ensure_accounts, free_port, run_load_test, start_server, wait_until_ready,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the app with concurrent simulated treasurers, volunteers, dashboard viewers and exports; '
+        'reports throughput, p50/p95/p99 latency and error rate per endpoint'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users (default: 20)')
+        parser.add_argument('--duration', type=float, default=60, help='Seconds of load after ramp-up (default: 60)')
+        parser.add_argument('--ramp-up', type=float, default=10, help='Seconds over which users start (default: 10)')
+        parser.add_argument('--think-time', type=float, default=1.0, help='Mean pause between scenario iterations (seconds)')
+        parser.add_argument(
+            '--mix',
+            type=str,
+            help=(
+                'Scenario weights, e.g. "dashboard_viewer=6,volunteer_submitter=4" (default: '
+                + ','.join(f"{name}={scenario['weight']}" for name, scenario in SCENARIOS.items()) + ')'
+            )
+        )
+        parser.add_argument(
+            '--base-url',
+            type=str,
+            help='Target an already running server that uses this database (default: start one on a free port)'
+        )
+        parser.add_argument('--workers', type=int, help='Start gunicorn with this many worker processes instead of runserver')
+        parser.add_argument('--threads', type=int, default=1, help='Threads per gunicorn worker (default: 1)')
+        parser.add_argument('--treasurers', type=int, default=3, help='Treasurer accounts to create/use')
+        parser.add_argument('--volunteers', type=int, default=10, help='Volunteer accounts to create/use')
+        parser.add_argument('--password', type=str, default=DEFAULT_PASSWORD, help='Password for the loadtest_* accounts')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for scenario assignment and user behaviour')
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout (seconds)')
+        parser.add_argument('--output', type=str, help='Write the summary as JSON to this file')
+
+    def parse_mix(self, value):
+        if not value:
+            return None
+        mix = {}
+        for part in value.split(','):
+            name, _, weight = part.partition('=')
+            name = name.strip()
+            if name not in SCENARIOS:
+                raise CommandError(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+            try:
+                mix[name] = float(weight)
+            except ValueError:
+                raise CommandError(f"Weight for '{name}' must be a number")
+            if mix[name] < 0:
+                raise CommandError('Scenario weights cannot be negative')
+        if not any(mix.values()):
+            raise CommandError('--mix needs at least one positive weight')
+        return mix
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['duration'] <= 0:
+            raise CommandError('--users and --duration must be positive')
+        if options['ramp_up'] < 0 or options['think_time'] < 0:
+            raise CommandError('--ramp-up and --think-time cannot be negative')
+        if options['treasurers'] < 1 or options['volunteers'] < 1:
+            raise CommandError('At least one treasurer and one volunteer account are needed')
+        if options['workers'] and importlib.util.find_spec('gunicorn') is None:
+            raise CommandError('--workers needs gunicorn (pip install gunicorn)')
+        mix = self.parse_mix(options.get('mix'))
+
+        accounts = ensure_accounts(options['treasurers'], options['volunteers'], options['password'])
+
+        server = None
+        log = None
+        base_url = options.get('base_url')
+        if not base_url:
+            port = free_port()
+            base_url = f'http://127.0.0.1:{port}'
+            log = tempfile.TemporaryFile(mode='w+')
+            server = start_server(port, options.get('workers'), options['threads'], log=log)
+            kind = f"gunicorn ({options['workers']} workers x {options['threads']} threads)" if options.get('workers') else 'runserver'
+            self.stdout.write(f'Starting {kind} on {base_url} ...')
+        try:
+            if not wait_until_ready(base_url):
+                output = ''
+                if log:
+                    log.seek(0)
+                    output = log.read()[-2000:]
+                raise CommandError(f'Server at {base_url} did not answer within 30s\n{output}')
+
+            self.stdout.write(
+                f"Running {options['users']} users for {options['duration']:g}s "
+                f"(ramp-up {options['ramp_up']:g}s) against {base_url}"
+            )
+            summary = run_load_test(
+                base_url,
+                accounts,
+                users=options['users'],
+                duration=options['duration'],
+                ramp_up=options['ramp_up'],
+                mix=mix,
+                think_time=options['think_time'],
+                seed=options['seed'],
+                timeout=options['timeout'],
+            )
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=10)
+            if log:
+                log.close()
+
+        summary['workers'] = options.get('workers')
+        self.report(summary)
+        if options.get('output'):
+            with open(options['output'], 'w') as handle:
+                json.dump(summary, handle, indent=2)
+            self.stdout.write(f"Summary written to {options['output']}")
+
+    def report(self, summary):
+        self.stdout.write('  users per scenario: ' + ', '.join(f'{name} {count}' for name, count in summary['scenarios'].items()))
+        header = f"  {'endpoint':<30} {'requests':>9} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}"
+        self.stdout.write(header)
+        rows = list(summary['endpoints'].items())
+        if summary['total']['requests']:
+            rows.append(('TOTAL', summary['total']))
+        for endpoint, stats in rows:
+            line = (
+                f"  {endpoint:<30} {stats['requests']:>9} {stats['throughput_rps']:>8.2f} {stats['p50_ms']:>9.1f} "
+                f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['error_rate']:>8.1%}"
+            )
+            self.stdout.write(self.style.ERROR(line) if stats['errors'] else line)
+        for kind, count in summary['error_kinds'].items():
+            self.stdout.write(self.style.WARNING(f'  {count} x {kind}'))
+
+        total = summary['total']
+        message = (
+            f"{total['requests']} requests in {summary['duration_s']}s: {total['throughput_rps']} req/s, "
+            f"error rate {total['error_rate']:.1%}"
+        )
+        self.stdout.write(self.style.ERROR(message) if total['errors'] or not total['requests'] else self.style.SUCCESS(message))
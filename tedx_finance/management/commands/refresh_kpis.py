@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tedx_finance.kpi_snapshots import default_ranges, is_canonical, purge_snapshots, refresh_snapshot
+from tedx_finance.models import KPISnapshot
+from tedx_finance.views import parse_date
+
+
+class Command(BaseCommand):
+    help = 'Recompute dashboard KPI snapshots for the default date ranges (run periodically, e.g. every few minutes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            type=str,
+            help='Also refresh this range (YYYY-MM-DD start; combine with --end; a whole month or year)'
+        )
+        parser.add_argument(
+            '--end',
+            type=str,
+            help='Also refresh this range (YYYY-MM-DD end)'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Refresh every stored snapshot, not just the default ranges'
+        )
+
+    def handle(self, *args, **options):
+        ranges = default_ranges()
+        if options.get('start') or options.get('end'):
+            start, end = parse_date(options.get('start')), parse_date(options.get('end'))
+            if (options.get('start') and not start) or (options.get('end') and not end):
+                raise CommandError('--start and --end must be dates in YYYY-MM-DD format')
+            if not is_canonical(start, end):
+                raise CommandError('Only whole months or years of this year or last are stored as snapshots')
+            ranges.append((start, end))
+        purged = purge_snapshots()
+        if options['all']:
+            ranges.extend(KPISnapshot.objects.values_list('start_date', 'end_date'))
+
+        refreshed = set()
+        for start, end in ranges:
+            if (start, end) in refreshed:
+                continue
+            refreshed.add((start, end))
+            snapshot = refresh_snapshot(start, end)
+            self.stdout.write(f"  {snapshot.range_key}: ledger v{snapshot.ledger_version}")
+
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {len(refreshed)} KPI snapshot(s), purged {purged}"))
@@ -0,0 +1,84 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tedx_finance.benchmarks import SCENARIOS, compare_results, run_suite
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the dashboard, transactions table, search, budget suggestions, exports and import '
+        'with the test client on generated datasets (a throwaway test database per size)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            default='1000,10000',
+            help='Comma-separated transaction counts to benchmark at (default: 1000,10000)'
+        )
+        parser.add_argument(
+            '--scenarios',
+            type=str,
+            help=f"Comma-separated scenarios to run (default: all of {', '.join(SCENARIOS)})"
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Timed repetitions per scenario (median is reported)')
+        parser.add_argument('--seed', type=int, default=42, help='Dataset seed')
+        parser.add_argument('--output', type=str, help='Write the results as JSON to this file (usable as a baseline)')
+        parser.add_argument('--compare', type=str, help='Baseline JSON to compare against; exits non-zero on regressions')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Relative wall-time/memory growth counted as a regression (default: 0.2 = 20%%)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes must be comma-separated integers')
+        if not sizes or any(size < 1 for size in sizes):
+            raise CommandError('--sizes must be positive')
+        names = [name.strip() for name in (options.get('scenarios') or '').split(',') if name.strip()] or list(SCENARIOS)
+        unknown = [name for name in names if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(unknown)}")
+
+        baseline = None
+        if options.get('compare'):
+            try:
+                with open(options['compare']) as handle:
+                    baseline = json.load(handle)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline {options['compare']}: {e}")
+
+        def progress(size, name, result):
+            self.stdout.write(
+                f"  {size:>9,} tx  {name:<20} {result['wall_ms']:>10.1f} ms  "
+                f"{result['queries']:>5} queries  {result['peak_kib']:>10.1f} KiB peak  status {result['status']}"
+            )
+
+        results = run_suite(sizes, names, repeat=options['repeat'], seed=options['seed'], progress=progress)
+
+        if options.get('output'):
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is None:
+            self.stdout.write(self.style.SUCCESS(f"Benchmarked {len(names)} scenario(s) at {len(sizes)} size(s)"))
+            return
+
+        rows = compare_results(baseline, results, threshold=options['threshold'])
+        regressions = [row for row in rows if row['regression']]
+        for row in rows:
+            line = (
+                f"  {row['size']:>9} tx  {row['scenario']:<20} {row['metric']:<8} "
+                f"{row['baseline']:>10} -> {row['current']:>10}  ({row['change']:+.0%})"
+            )
+            self.stdout.write(self.style.ERROR(line + '  REGRESSION') if row['regression'] else line)
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s) against {options['compare']}")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}"))
@@ -0,0 +1,408 @@
+"""
+Prometheus metrics, served at ``/metrics`` in the text exposition format.
+
+Collected in-process, without ``prometheus_client`` or any outside service:
+
+- ``tedx_http_requests_total`` / ``tedx_http_request_duration_seconds``:
+  requests and latency per URL name (``MetricsMiddleware``)
+- ``tedx_db_queries_per_request``: SQL queries per request, per URL name
+- ``tedx_export_*`` / ``tedx_import_*``: duration and size of exports
+  (response bytes) and imports (uploaded bytes)
+- ``tedx_cache_requests_total``: hits and misses of the category choices
+  and dashboard panel caches (``record_cache``)
+- ``tedx_notification_queue_depth``: unread notifications, counted at
+  scrape time
+
+Gunicorn runs several worker processes, each with its own counters. Every
+process writes its values to ``<METRICS_DIR>/<pid>-<token>.json`` (at most
+every ``METRICS_FLUSH_SECONDS``, and at exit) and a scrape adds up all the
+files, so any worker can answer for all of them. Files of processes that
+have exited are folded into ``archive.json`` so counters stay monotonic
+across worker restarts without the directory growing. A worker's latest
+few seconds of traffic show up on the next scrape after its flush.
+
+Scrapes need ``Authorization: Bearer <METRICS_TOKEN>`` when the token is
+set, and a staff login otherwise. ``METRICS_ENABLED`` turns collection off.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from .instrumentation import track_request
+
+try:
+    import fcntl
+except ImportError:  # Windows: dead-worker files are summed but never archived
+    fcntl = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 100, 200, 500)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+TRANSFER_DURATION_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Metric name -> {'type', 'help', 'buckets' (histograms)}
+METRICS = {
+    'tedx_http_requests_total': {
+        'type': 'counter',
+        'help': 'HTTP requests by URL name, method and status class',
+    },
+    'tedx_http_request_duration_seconds': {
+        'type': 'histogram',
+        'help': 'Time to produce the response, by URL name and method',
+        'buckets': LATENCY_BUCKETS,
+    },
+    'tedx_db_queries_per_request': {
+        'type': 'histogram',
+        'help': 'SQL queries per request, by URL name',
+        'buckets': QUERY_BUCKETS,
+    },
+    'tedx_export_duration_seconds': {
+        'type': 'histogram',
+        'help': 'Export generation time, by kind of export',
+        'buckets': TRANSFER_DURATION_BUCKETS,
+    },
+    'tedx_export_size_bytes': {
+        'type': 'histogram',
+        'help': 'Export response size, by kind of export',
+        'buckets': SIZE_BUCKETS,
+    },
+    'tedx_import_duration_seconds': {
+        'type': 'histogram',
+        'help': 'Import processing time, by kind of import',
+        'buckets': TRANSFER_DURATION_BUCKETS,
+    },
+    'tedx_import_size_bytes': {
+        'type': 'histogram',
+        'help': 'Uploaded import size, by kind of import',
+        'buckets': SIZE_BUCKETS,
+    },
+    'tedx_cache_requests_total': {
+        'type': 'counter',
+        'help': 'Cache lookups by cache and result (hit/miss)',
+    },
+    'tedx_notification_queue_depth': {
+        'type': 'gauge',
+        'help': 'Unread notifications waiting for their users',
+    },
+}
+
+# URL name -> label for views whose responses are exports / whose POSTs are imports
+EXPORT_VIEWS = {
+    'tedx_finance:export_xlsx': 'xlsx',
+    'tedx_finance:export_pdf': 'pdf',
+    'tedx_finance:export_zip': 'zip',
+    'tedx_finance:export_proofs_csv': 'proofs_csv',
+    'tedx_finance:export_proofs_pdf': 'proofs_pdf',
+}
+IMPORT_VIEWS = {
+    'tedx_finance:import_transactions': 'transactions',
+    'tedx_finance:bulk_upload_proofs': 'proofs',
+}
+
+ARCHIVE_FILE = 'archive.json'
+LOCK_FILE = '.lock'
+
+_lock = threading.Lock()
+# (metric name, sorted label pairs) -> float (counters) or {'buckets': [...], 'sum', 'count'}
+_values = {}
+_process = {'token': uuid.uuid4().hex[:12], 'last_flush': 0.0}
+
+
+def _reset_after_fork():
+    # A forked worker starts from zero under its own file
+    global _lock
+    _lock = threading.Lock()
+    _values.clear()
+    _process.update(token=uuid.uuid4().hex[:12], last_flush=0.0)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    """Add ``amount`` to a counter."""
+    if not _enabled():
+        return
+    key = _key(name, labels)
+    with _lock:
+        _values[key] = _values.get(key, 0.0) + amount
+    _maybe_flush()
+
+
+def observe(name, value, **labels):
+    """Record one observation in a histogram."""
+    if not _enabled():
+        return
+    buckets = METRICS[name]['buckets']
+    key = _key(name, labels)
+    with _lock:
+        sample = _values.get(key)
+        if sample is None:
+            sample = _values[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                sample['buckets'][i] += 1
+        sample['sum'] += value
+        sample['count'] += 1
+    _maybe_flush()
+
+
+def record_cache(cache_name, hit):
+    inc('tedx_cache_requests_total', cache=cache_name, result='hit' if hit else 'miss')
+
+
+# --- Per-process files ------------------------------------------------------
+
+def metrics_dir():
+    path = getattr(settings, 'METRICS_DIR', '') or os.path.join(tempfile.gettempdir(), 'tedx_finance_metrics')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _process_file():
+    return os.path.join(metrics_dir(), f"{os.getpid()}-{_process['token']}.json")
+
+
+def _serialize(values):
+    return [[name, dict(labels), value] for (name, labels), value in values.items()]
+
+
+def _write_json(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as handle:
+        json.dump(data, handle)
+    os.replace(tmp, path)
+
+
+def flush():
+    """Write this process's values to its file."""
+    with _lock:
+        data = _serialize(_values)
+        _process['last_flush'] = time.monotonic()
+    if data:
+        _write_json(_process_file(), data)
+
+
+def _maybe_flush():
+    if time.monotonic() - _process['last_flush'] >= getattr(settings, 'METRICS_FLUSH_SECONDS', 5):
+        try:
+            flush()
+        except OSError:
+            pass  # an unwritable metrics directory must not break requests
+
+
+@atexit.register
+def _flush_at_exit():
+    if _values:
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+def _read(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return []
+
+
+def _merge(into, entries):
+    for name, labels, value in entries:
+        key = _key(name, labels)
+        current = into.get(key)
+        if isinstance(value, dict):
+            if current is None:
+                into[key] = {'buckets': list(value['buckets']), 'sum': value['sum'], 'count': value['count']}
+            else:
+                current['buckets'] = [a + b for a, b in zip(current['buckets'], value['buckets'])]
+                current['sum'] += value['sum']
+                current['count'] += value['count']
+        else:
+            into[key] = (current or 0.0) + value
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _archive_dead_processes(directory):
+    """Fold files of exited processes into the archive (one scraper at a time)."""
+    if fcntl is None:
+        return
+    with open(os.path.join(directory, LOCK_FILE), 'a') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return  # another worker is archiving
+        try:
+            dead = []
+            for filename in os.listdir(directory):
+                pid = filename.split('-', 1)[0]
+                if filename.endswith('.json') and pid.isdigit() and not _pid_alive(int(pid)):
+                    dead.append(os.path.join(directory, filename))
+            if not dead:
+                return
+            archive_path = os.path.join(directory, ARCHIVE_FILE)
+            archive = {}
+            _merge(archive, _read(archive_path))
+            for path in dead:
+                _merge(archive, _read(path))
+            _write_json(archive_path, _serialize(archive))
+            for path in dead:
+                os.remove(path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def collect():
+    """Values of every worker, past and present, added up."""
+    flush()
+    directory = metrics_dir()
+    _archive_dead_processes(directory)
+    merged = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.json'):
+            _merge(merged, _read(os.path.join(directory, filename)))
+    return merged
+
+
+# --- Exposition -------------------------------------------------------------
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def gauges():
+    """Gauges computed at scrape time: ``{(name, label pairs): value}``."""
+    from .models import Notification
+    return {('tedx_notification_queue_depth', ()): Notification.objects.filter(is_read=False).count()}
+
+
+def render(values):
+    """Prometheus text exposition of ``values`` (as returned by ``collect``, plus gauges)."""
+    lines = []
+    for name, meta in METRICS.items():
+        samples = sorted((labels, value) for (metric, labels), value in values.items() if metric == name)
+        if not samples:
+            continue
+        lines.append(f"# HELP {name} {meta['help']}")
+        lines.append(f"# TYPE {name} {meta['type']}")
+        for labels, value in samples:
+            if meta['type'] != 'histogram':
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            # Bucket counts are stored per bucket as cumulative "<= bound" counts
+            for bound, count in zip(meta['buckets'], value['buckets']):
+                lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {count}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {value['count']}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(value['sum'])}")
+            lines.append(f"{name}_count{_labels(labels)} {value['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Serve all workers' metrics to Prometheus."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        allowed = constant_time_compare(supplied, token)
+    else:
+        allowed = request.user.is_authenticated and request.user.is_staff
+    if not allowed:
+        return HttpResponse('Forbidden\n', status=403, content_type='text/plain')
+
+    values = collect()
+    values.update(gauges())
+    response = HttpResponse(render(values), content_type='text/plain; version=0.0.4; charset=utf-8')
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+# --- Collection -------------------------------------------------------------
+
+def _count_streamed(content, on_done):
+    size = 0
+    try:
+        for chunk in content:
+            size += len(chunk)
+            yield chunk
+    finally:
+        on_done(size)
+
+
+class MetricsMiddleware:
+    """Record request latency, query count and export/import duration and size per URL name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _enabled():
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with track_request() as timings:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        inc('tedx_http_requests_total', view=view, method=request.method, status=f'{response.status_code // 100}xx')
+        observe('tedx_http_request_duration_seconds', elapsed, view=view, method=request.method)
+        observe('tedx_db_queries_per_request', timings.db_queries, view=view)
+
+        if view in IMPORT_VIEWS and request.method == 'POST':
+            uploaded = sum(upload.size for upload in request.FILES.values())
+            observe('tedx_import_duration_seconds', elapsed, kind=IMPORT_VIEWS[view])
+            observe('tedx_import_size_bytes', uploaded, kind=IMPORT_VIEWS[view])
+        elif view in EXPORT_VIEWS and response.status_code == 200:
+            self.record_export(EXPORT_VIEWS[view], response, start)
+        return response
+
+    def record_export(self, export, response, start):
+        def done(size):
+            observe('tedx_export_duration_seconds', time.perf_counter() - start, kind=export)
+            observe('tedx_export_size_bytes', size, kind=export)
+
+        if getattr(response, 'streaming', False):
+            # Streamed exports are produced while the body is sent
+            response.streaming_content = _count_streamed(response.streaming_content, done)
+        else:
+            done(len(response.content))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tedx_finance', '0008_userpreference'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalmanagementfund',
+            name='history_changed_fields',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='historicalsponsor',
+            name='history_changed_fields',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='historicaltransaction',
+            name='history_changed_fields',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
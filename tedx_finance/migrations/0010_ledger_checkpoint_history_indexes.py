@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tedx_finance', '0009_history_changed_fields'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateTimeField(unique=True)),
+                ('management_fund_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sponsor_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('spent_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('spent_by_category_date', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-as_of'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='historicalmanagementfund',
+            index=models.Index(fields=['id', 'history_date'], name='tedx_financ_id_b94098_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historicalsponsor',
+            index=models.Index(fields=['id', 'history_date'], name='tedx_financ_id_7eea4f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historicaltransaction',
+            index=models.Index(fields=['id', 'history_date'], name='tedx_financ_id_88db3e_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def forwards(apps, schema_editor):
+    Category = apps.get_model('tedx_finance', 'Category')
+    Transaction = apps.get_model('tedx_finance', 'Transaction')
+    HistoricalTransaction = apps.get_model('tedx_finance', 'HistoricalTransaction')
+    LedgerCheckpoint = apps.get_model('tedx_finance', 'LedgerCheckpoint')
+    db_alias = schema_editor.connection.alias
+
+    # One UPDATE per distinct legacy string, creating Category rows as needed
+    names = set(Transaction.objects.using(db_alias).values_list('category', flat=True).distinct())
+    names |= set(HistoricalTransaction.objects.using(db_alias).values_list('category', flat=True).distinct())
+    for name in sorted(n for n in names if n):
+        category, _ = Category.objects.using(db_alias).get_or_create(name=name[:50])
+        Transaction.objects.using(db_alias).filter(category=name).update(category_ref=category)
+        HistoricalTransaction.objects.using(db_alias).filter(category=name).update(category_ref=category)
+
+    # Checkpoints were keyed by category name; the ledger now keys by category id
+    LedgerCheckpoint.objects.using(db_alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tedx_finance', '0010_ledger_checkpoint_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicaltransaction',
+            name='category_ref',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='tedx_finance.category'),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='category_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='tedx_finance.category'),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tedx_finance', '0011_transaction_category_ref'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('approved', True)), fields=['date', 'id'], name='tx_approved_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('approved', False)), fields=['date'], name='tx_pending_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['category_ref', 'approved', 'date'], name='tx_category_approved_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('amount__lt', 0), ('approved', True)), fields=['date', 'category_ref', 'amount'], name='tx_approved_expense_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tedx_finance', '0012_transaction_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tedx_finance', '0013_ledger_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KPISnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('range_key', models.CharField(max_length=32, unique=True)),
+                ('start_date', models.DateField(blank=True, null=True)),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('context', models.JSONField(default=dict)),
+                ('data', models.JSONField(default=dict)),
+                ('ledger_version', models.PositiveBigIntegerField(default=0)),
+                ('computed_for', models.DateField(help_text='Day the date-relative KPIs (30-day windows, month comparison) were computed for')),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'KPI Snapshot',
+                'verbose_name_plural': 'KPI Snapshots',
+            },
+        ),
+    ]
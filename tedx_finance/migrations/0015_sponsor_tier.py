@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:37
+
+from django.db import migrations, models
+
+# The thresholds previously hard-coded in views.get_sponsor_tier
+DEFAULT_TIERS = [
+    ('Gold', 200000, 'bg-yellow-500 text-black'),
+    ('Silver', 50000, 'bg-slate-300 text-slate-900'),
+    ('Bronze', 0, 'bg-amber-700 text-white'),
+]
+
+
+def seed_tiers(apps, schema_editor):
+    SponsorTier = apps.get_model('tedx_finance', 'SponsorTier')
+    db_alias = schema_editor.connection.alias
+    for name, min_amount, badge_class in DEFAULT_TIERS:
+        SponsorTier.objects.using(db_alias).get_or_create(
+            name=name, defaults={'min_amount': min_amount, 'badge_class': badge_class}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tedx_finance', '0014_kpi_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SponsorTier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('min_amount', models.DecimalField(decimal_places=2, max_digits=12, unique=True)),
+                ('badge_class', models.CharField(blank=True, help_text='CSS classes for the tier badge', max_length=100)),
+            ],
+            options={
+                'ordering': ['-min_amount'],
+            },
+        ),
+        migrations.RunPython(seed_tiers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tedx_finance', '0015_sponsor_tier'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(db_index=True, help_text='Hash of the normalized SQL', max_length=32)),
+                ('normalized_sql', models.TextField()),
+                ('params_fingerprint', models.CharField(blank=True, max_length=32)),
+                ('duration_ms', models.FloatField()),
+                ('view', models.CharField(blank=True, help_text='URL name of the view that issued the query', max_length=200)),
+                ('source', models.CharField(blank=True, help_text='Innermost tedx_finance frame (file:line in function)', max_length=300)),
+                ('plan', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Slow Query',
+                'verbose_name_plural': 'Slow Queries',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tedx_finance', '0016_slow_query'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileCapture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('view', models.CharField(blank=True, max_length=200)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('duration_ms', models.FloatField()),
+                ('prof_file', models.CharField(help_text='pstats dump, relative to PROFILING_DIR', max_length=255)),
+                ('collapsed_file', models.CharField(help_text='Collapsed stacks for flamegraph tools, relative to PROFILING_DIR', max_length=255)),
+                ('top_functions', models.TextField(blank=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Profile Capture',
+                'verbose_name_plural': 'Profile Captures',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
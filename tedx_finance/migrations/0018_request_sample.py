@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tedx_finance', '0017_profile_capture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('view', models.CharField(max_length=200)),
+                ('method', models.CharField(max_length=10)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('db_queries', models.PositiveIntegerField()),
+                ('db_ms', models.FloatField()),
+                ('response_bytes', models.PositiveBigIntegerField(blank=True, help_text='Empty for streamed responses', null=True)),
+            ],
+            options={
+                'verbose_name': 'Request Sample',
+                'verbose_name_plural': 'Request Samples',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
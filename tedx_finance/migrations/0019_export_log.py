@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tedx_finance', '0018_request_sample'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('kind', models.CharField(db_index=True, max_length=30)),
+                ('status', models.CharField(choices=[('ok', 'Completed'), ('aborted', 'Aborted (memory limit)'), ('failed', 'Failed')], max_length=10)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('bytes_out', models.PositiveBigIntegerField(default=0)),
+                ('duration_ms', models.FloatField()),
+                ('peak_traced_bytes', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('peak_rss_bytes', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('spooled', models.BooleanField(default=False, help_text='Output was moved to a temporary file on disk')),
+                ('error', models.TextField(blank=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Export Log',
+                'verbose_name_plural': 'Export Logs',
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tedx_finance', '0019_export_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kpisnapshot',
+            name='refresh_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,8 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
-from simple_history.models import HistoricalRecords
 from datetime import timedelta
 from django.utils import timezone
+from .history import ChangedFieldsHistoricalModel, DiffAwareHistoryMixin, IndexedHistoricalRecords
 
 class Category(models.Model):
     """User-defined transaction categories."""
@@ -15,15 +15,15 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
-class ManagementFund(models.Model):
+class ManagementFund(DiffAwareHistoryMixin, models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     date_received = models.DateField()
-    history = HistoricalRecords()
+    history = IndexedHistoricalRecords(bases=[ChangedFieldsHistoricalModel])
 
     def __str__(self):
         return f"Management Fund of {self.amount}"
 
-class Sponsor(models.Model):
+class Sponsor(DiffAwareHistoryMixin, models.Model):
     name = models.CharField(max_length=100)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     date_received = models.DateField()
@@ -33,12 +33,29 @@ class Sponsor(models.Model):
     # to match the fields your SponsorForm is expecting.
     agreement = models.FileField(upload_to='sponsors/', blank=True, null=True)
     contact_email = models.EmailField(max_length=254, blank=True, null=True)
-    history = HistoricalRecords()
+    history = IndexedHistoricalRecords(bases=[ChangedFieldsHistoricalModel])
 
     def __str__(self):
         return self.name
 
-class Transaction(models.Model):
+class SponsorTier(models.Model):
+    """
+    Sponsorship tier: sponsors contributing at least ``min_amount`` get this tier.
+
+    Tiers are assigned in SQL (see ``sponsor_tiers.py``); the tier with the
+    highest threshold not above a sponsor's amount wins.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    min_amount = models.DecimalField(max_digits=12, decimal_places=2, unique=True)
+    badge_class = models.CharField(max_length=100, blank=True, help_text="CSS classes for the tier badge")
+
+    class Meta:
+        ordering = ['-min_amount']
+
+    def __str__(self):
+        return f"{self.name} (≥ ₹{self.min_amount})"
+
+class Transaction(DiffAwareHistoryMixin, models.Model):
     CATEGORY_CHOICES = [
         ('Marketing', 'Marketing'),
         ('Logistics', 'Logistics'),
@@ -48,7 +65,11 @@ class Transaction(models.Model):
     ]
     title = models.CharField(max_length=100)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # Label as entered; queries use category_ref, which follows renames
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
+    category_ref = models.ForeignKey(
+        Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions'
+    )
     date = models.DateField()
     proof = models.FileField(upload_to='proofs/', blank=True, null=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
@@ -57,11 +78,61 @@ class Transaction(models.Model):
     # This will track whether the transaction has been approved by a treasurer.
     # It defaults to False, so all new transactions start as 'pending'.
     approved = models.BooleanField(default=False)
-    history = HistoricalRecords()
+    history = IndexedHistoricalRecords(bases=[ChangedFieldsHistoricalModel])
+
+    class Meta:
+        # Hot paths (dashboard, reports, budgets, proof gallery, exports) filter on
+        # approved/date/category and approved expenses; see query_plans.py.
+        # Django emits approved=True as a bare boolean term, which SQLite cannot
+        # seek in a composite (approved, date) index, so the status split is
+        # expressed as partial indexes (usable on both SQLite and PostgreSQL).
+        indexes = [
+            models.Index(fields=['date', 'id'], condition=models.Q(approved=True), name='tx_approved_date_idx'),
+            models.Index(fields=['date'], condition=models.Q(approved=False), name='tx_pending_date_idx'),
+            models.Index(fields=['category_ref', 'approved', 'date'], name='tx_category_approved_date_idx'),
+            models.Index(
+                fields=['date', 'category_ref', 'amount'],
+                condition=models.Q(approved=True, amount__lt=0),
+                name='tx_approved_expense_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    @property
+    def category_name(self):
+        """
+        Current category name (the stored ``category`` label may predate a rename).
+
+        Reads ``category_ref``: querysets that list transactions load it with
+        ``select_related('category_ref')``, or this is a query per row.
+        """
+        if self.category_ref_id:
+            return self.category_ref.name
+        return self.category
+
+    def _sync_category_ref(self):
+        """Keep ``category_ref`` and the ``category`` label consistent; returns True if either changed."""
+        changed = self.get_changed_tracked_fields()
+        if 'category_ref' in changed and self.category_ref_id:
+            if self.category != self.category_ref.name:
+                self.category = self.category_ref.name
+                return True
+            return False
+        if self.category and ('category' in changed or self.category_ref_id is None):
+            category, _ = Category.objects.get_or_create(name=self.category)
+            if category.pk != self.category_ref_id:
+                self.category_ref = category
+                return True
+        return False
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self._sync_category_ref() and update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'category', 'category_ref'}
+        super().save(*args, **kwargs)
+
 
 class UserPreference(models.Model):
     """Per-user preferences for theme and communications."""
@@ -102,12 +173,36 @@ class Budget(models.Model):
     def __str__(self):
         return f"{self.category.name} Budget ({self.start_date} to {self.end_date})"
     
+    @staticmethod
+    def spent_subquery():
+        """
+        Approved (negative) spending within each budget's period, as a Subquery.
+
+        Usage: ``Budget.objects.annotate(spent_total=Budget.spent_subquery())``;
+        computes spending for any number of budgets in one query.
+        """
+        from django.db.models import OuterRef, Subquery, Sum
+        return Subquery(
+            Transaction.objects.filter(
+                category_ref_id=OuterRef('category_id'),
+                approved=True,
+                amount__lt=0,
+                date__gte=OuterRef('start_date'),
+                date__lte=OuterRef('end_date'),
+            )
+            .values('category_ref_id')
+            .annotate(total=Sum('amount'))
+            .values('total')
+        )
+
     def spent(self):
         """Calculate total approved spending within budget period for this category."""
         from django.db.models import Sum
+        if 'spent_total' in self.__dict__:
+            # Annotated with spent_subquery(): no query per budget
+            return abs(self.spent_total or 0)
         spent_val = Transaction.objects.filter(
-            # Transactions still store category as a string name
-            category=self.category.name,
+            category_ref_id=self.category_id,
             approved=True,
             amount__lt=0,
             date__gte=self.start_date,
@@ -116,15 +211,15 @@ class Budget(models.Model):
         return abs(spent_val)
     
     def remaining(self):
-        return float(self.amount) - self.spent()
+        return float(self.amount) - float(self.spent())
     
     def is_exceeded(self):
-        return self.spent() > float(self.amount)
+        return float(self.spent()) > float(self.amount)
     
     def utilization_percent(self):
         if float(self.amount) == 0:
             return 0
-        return min(100, (self.spent() / float(self.amount)) * 100)
+        return min(100, (float(self.spent()) / float(self.amount)) * 100)
 
 
 # ===== NEW MODELS FOR ENHANCED SECURITY & FEATURES =====
@@ -244,3 +339,181 @@ class Notification(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.title}"
+
+
+class LedgerCheckpoint(models.Model):
+    """
+    Materialized ledger totals at a point in time.
+
+    Point-in-time queries (see ledger.py) start from the nearest checkpoint
+    and replay only the history rows recorded after it.
+    """
+    as_of = models.DateTimeField(unique=True)
+    management_fund_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sponsor_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    spent_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # {"<category id>": {"<YYYY-MM-DD>": "<approved spend>"}} so budget periods can be re-applied
+    spent_by_category_date = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-as_of']
+
+    def __str__(self):
+        return f"Ledger checkpoint at {self.as_of}"
+
+
+class LedgerVersion(models.Model):
+    """
+    Single-row version stamp of the ledger.
+
+    Bumped on every write to transactions, funds, sponsors, sponsor tiers,
+    budgets and categories (see ``ledger.bump_ledger_version``); cache keys and ETags
+    are derived from it.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Ledger version {self.version}"
+
+
+class KPISnapshot(models.Model):
+    """
+    Precomputed dashboard KPI panel for one canonical date range.
+
+    Served as-is by the dashboard and refreshed in the background once the
+    ledger version or the day it was computed for has moved on (see
+    ``kpi_snapshots.py``).
+    """
+    # "all" for the unfiltered dashboard, otherwise "<start>:<end>" (either side may be empty)
+    range_key = models.CharField(max_length=32, unique=True)
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
+    context = models.JSONField(default=dict)
+    data = models.JSONField(default=dict)
+    ledger_version = models.PositiveBigIntegerField(default=0)
+    computed_for = models.DateField(help_text="Day the date-relative KPIs (30-day windows, month comparison) were computed for")
+    computed_at = models.DateTimeField()
+    # Set while a worker recomputes this range; claimed with a conditional UPDATE so workers don't duplicate it
+    refresh_started_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'KPI Snapshot'
+        verbose_name_plural = 'KPI Snapshots'
+
+    def __str__(self):
+        return f"KPI snapshot {self.range_key} (ledger v{self.ledger_version})"
+
+
+class SlowQuery(models.Model):
+    """
+    A SQL statement that exceeded ``SLOW_QUERY_THRESHOLD_MS``.
+
+    Recorded by ``slow_queries.py`` when ``SLOW_QUERY_STORE`` is on. Parameters
+    are not stored, only a fingerprint of them; entries with the same
+    ``fingerprint`` are the same statement shape.
+    """
+    fingerprint = models.CharField(max_length=32, db_index=True, help_text="Hash of the normalized SQL")
+    normalized_sql = models.TextField()
+    params_fingerprint = models.CharField(max_length=32, blank=True)
+    duration_ms = models.FloatField()
+    view = models.CharField(max_length=200, blank=True, help_text="URL name of the view that issued the query")
+    source = models.CharField(max_length=300, blank=True, help_text="Innermost tedx_finance frame (file:line in function)")
+    plan = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Slow Query'
+        verbose_name_plural = 'Slow Queries'
+
+    def __str__(self):
+        return f"{self.duration_ms:.0f} ms: {self.normalized_sql[:80]}"
+
+
+class ProfileCapture(models.Model):
+    """
+    A request run under cProfile on a staff member's request (see ``profiling.py``).
+
+    The ``.prof`` and collapsed-stack files live in ``PROFILING_DIR``;
+    ``top_functions`` keeps the top of the cumulative-time listing.
+    """
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    duration_ms = models.FloatField()
+    prof_file = models.CharField(max_length=255, help_text="pstats dump, relative to PROFILING_DIR")
+    collapsed_file = models.CharField(max_length=255, help_text="Collapsed stacks for flamegraph tools, relative to PROFILING_DIR")
+    top_functions = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Profile Capture'
+        verbose_name_plural = 'Profile Captures'
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+
+class RequestSample(models.Model):
+    """
+    One sampled request for the staff performance page.
+
+    The table is a capped buffer: ``performance.py`` keeps only the newest
+    ``PERFORMANCE_SAMPLE_CAPACITY`` rows, deleting older ones by id range.
+    """
+    recorded_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    view = models.CharField(max_length=200)
+    method = models.CharField(max_length=10)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    db_queries = models.PositiveIntegerField()
+    db_ms = models.FloatField()
+    response_bytes = models.PositiveBigIntegerField(null=True, blank=True, help_text="Empty for streamed responses")
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = 'Request Sample'
+        verbose_name_plural = 'Request Samples'
+
+    def __str__(self):
+        return f"{self.method} {self.view} {self.duration_ms:.0f} ms"
+
+
+class ExportLog(models.Model):
+    """
+    One run of a guarded export (see ``export_guard.py``).
+
+    Peak memory is the growth over the run: ``peak_traced_bytes`` from
+    tracemalloc, ``peak_rss_bytes`` from the worker's resident set (empty
+    where the platform does not report it).
+    """
+    STATUS_CHOICES = [
+        ('ok', 'Completed'),
+        ('aborted', 'Aborted (memory limit)'),
+        ('failed', 'Failed'),
+    ]
+
+    started_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    kind = models.CharField(max_length=30, db_index=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    rows = models.PositiveIntegerField(default=0)
+    bytes_out = models.PositiveBigIntegerField(default=0)
+    duration_ms = models.FloatField()
+    peak_traced_bytes = models.PositiveBigIntegerField(null=True, blank=True)
+    peak_rss_bytes = models.PositiveBigIntegerField(null=True, blank=True)
+    spooled = models.BooleanField(default=False, help_text="Output was moved to a temporary file on disk")
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        verbose_name = 'Export Log'
+        verbose_name_plural = 'Export Logs'
+
+    def __str__(self):
+        return f"{self.kind} {self.get_status_display()} ({self.duration_ms:.0f} ms)"
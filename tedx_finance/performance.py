@@ -0,0 +1,314 @@
+"""
+Staff performance page: recent request samples, table sizes and media usage.
+
+``PerformanceSampleMiddleware`` keeps a sample of requests (URL name,
+status, duration, query count/time, response size) in the
+``RequestSample`` table; query counts come from the request's
+``RequestTimings`` (``instrumentation.track_request``). The table is a ring
+buffer: samples are buffered in the worker and written with one
+``bulk_create`` every ``PERFORMANCE_SAMPLE_FLUSH_SIZE`` samples or
+``PERFORMANCE_SAMPLE_FLUSH_SECONDS``, once the response that made the
+flush due has been sent (``request_finished``), so the writes are not
+counted against that request's queries and time. Once the ids written span more than
+``PERFORMANCE_SAMPLE_CAPACITY``, rows older than the newest ``CAPACITY``
+are deleted by id range. ``PERFORMANCE_SAMPLE_RATE`` (0-1) thins out busy sites;
+``PERFORMANCE_SAMPLING_ENABLED`` turns it off.
+
+``performance_report`` reads the buffer for one window (last hour or day)
+and adds what is not request-shaped: cache hit ratios from the metrics
+registry, row counts and on-disk sizes of the large tables, and media
+storage usage per top-level directory (cached, as it walks the disk).
+"""
+import os
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Avg, Count, Max, Min
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import metrics
+from .instrumentation import track_request
+
+WINDOWS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+SLOWEST_ENDPOINTS = 15
+MEDIA_USAGE_CACHE_KEY = 'tedx_performance_media_usage'
+MEDIA_USAGE_CACHE_SECONDS = 300
+# Pages that would mostly sample themselves
+UNSAMPLED_VIEWS = {'tedx_finance:performance_dashboard', 'metrics'}
+
+_lock = threading.Lock()
+_buffer = []
+_state = {'last_flush': time.monotonic()}
+
+
+def _reset_after_fork():
+    # Samples buffered by the parent are its own to write
+    global _lock
+    _lock = threading.Lock()
+    _buffer.clear()
+    _state['last_flush'] = time.monotonic()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _sampling_enabled():
+    return getattr(settings, 'PERFORMANCE_SAMPLING_ENABLED', True)
+
+
+def record_sample(**fields):
+    """Buffer one ``RequestSample``; it is written after a later response is sent."""
+    from .models import RequestSample
+
+    with _lock:
+        _buffer.append(RequestSample(**fields))
+
+
+def _flush_due():
+    with _lock:
+        return bool(_buffer) and (
+            len(_buffer) >= getattr(settings, 'PERFORMANCE_SAMPLE_FLUSH_SIZE', 20)
+            or time.monotonic() - _state['last_flush'] >= getattr(settings, 'PERFORMANCE_SAMPLE_FLUSH_SECONDS', 10)
+        )
+
+
+@receiver(request_finished, dispatch_uid='tedx_finance_flush_samples')
+def flush_samples_when_due(sender, **kwargs):
+    # Sent once the response is closed, outside every middleware's timings
+    if _flush_due():
+        flush_samples()
+
+
+def flush_samples():
+    """Write buffered samples and trim the table to ``PERFORMANCE_SAMPLE_CAPACITY`` rows."""
+    from .models import RequestSample
+
+    with _lock:
+        samples = _buffer[:]
+        _buffer.clear()
+        _state['last_flush'] = time.monotonic()
+    if not samples:
+        return
+    try:
+        with transaction.atomic():
+            RequestSample.objects.bulk_create(samples)
+            ids = RequestSample.objects.aggregate(oldest=Min('id'), newest=Max('id'))
+            capacity = getattr(settings, 'PERFORMANCE_SAMPLE_CAPACITY', 10000)
+            # Most flushes leave the table under capacity and need no DELETE
+            if ids['newest'] - ids['oldest'] >= capacity:
+                RequestSample.objects.filter(id__lte=ids['newest'] - capacity).delete()
+    except DatabaseError:
+        pass  # losing a few samples must not break the worker that flushed them
+
+
+class PerformanceSampleMiddleware:
+    """Sample request duration, query count/time and response size into ``RequestSample``."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _sampling_enabled() or random.random() >= getattr(settings, 'PERFORMANCE_SAMPLE_RATE', 1.0):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with track_request() as timings:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        if view not in UNSAMPLED_VIEWS:
+            record_sample(
+                view=view[:200],
+                method=request.method[:10],
+                status_code=response.status_code,
+                duration_ms=elapsed * 1000,
+                db_queries=timings.db_queries,
+                db_ms=timings.db_time * 1000,
+                # Streamed exports are produced while the body is sent; their size is unknown here
+                response_bytes=None if getattr(response, 'streaming', False) else len(response.content),
+            )
+        return response
+
+
+# --- Report -----------------------------------------------------------------
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def endpoint_stats(samples):
+    """Per-view count, mean/p95/max duration and mean/max queries, slowest (p95) first."""
+    rows = {
+        row['view']: dict(row, durations=[])
+        for row in samples.values('view').annotate(
+            requests=Count('id'),
+            avg_ms=Avg('duration_ms'),
+            max_ms=Max('duration_ms'),
+            avg_queries=Avg('db_queries'),
+            max_queries=Max('db_queries'),
+            avg_db_ms=Avg('db_ms'),
+        )
+    }
+    # The buffer is capped, so its durations fit in memory
+    for view, duration in samples.values_list('view', 'duration_ms').iterator():
+        rows[view]['durations'].append(duration)
+    for row in rows.values():
+        row['p95_ms'] = _percentile(row.pop('durations'), 0.95)
+    return sorted(rows.values(), key=lambda row: row['p95_ms'], reverse=True)
+
+
+def export_stats(samples):
+    """Duration and size of successful export responses, per kind of export."""
+    rows = samples.filter(view__in=metrics.EXPORT_VIEWS, status_code=200).values('view').annotate(
+        runs=Count('id'), avg_ms=Avg('duration_ms'), max_ms=Max('duration_ms'),
+        avg_bytes=Avg('response_bytes'), max_bytes=Max('response_bytes'),
+    )
+    return sorted(
+        ({'kind': metrics.EXPORT_VIEWS[row.pop('view')], **row} for row in rows),
+        key=lambda row: row['max_ms'], reverse=True,
+    )
+
+
+def cache_stats():
+    """Hit ratio of each cache reported to ``metrics.record_cache``, over all workers."""
+    if not getattr(settings, 'METRICS_ENABLED', True):
+        return []
+    totals = {}
+    for (name, labels), value in metrics.collect().items():
+        if name == 'tedx_cache_requests_total':
+            labels = dict(labels)
+            totals.setdefault(labels['cache'], {'hit': 0, 'miss': 0})[labels['result']] += int(value)
+    return [
+        {
+            'cache': cache_name,
+            'hits': counts['hit'],
+            'misses': counts['miss'],
+            'hit_ratio': round(100 * counts['hit'] / (counts['hit'] + counts['miss']), 1),
+        }
+        for cache_name, counts in sorted(totals.items())
+        if counts['hit'] + counts['miss']
+    ]
+
+
+def table_sizes(tables):
+    """Bytes used by each table and its indexes; empty where the database cannot tell."""
+    placeholders = ', '.join(['%s'] * len(tables))
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        sql = (
+            'SELECT relname, pg_total_relation_size(oid) FROM pg_class '
+            f"WHERE relkind = 'r' AND relname IN ({placeholders}) AND pg_table_is_visible(oid)"
+        )
+    elif vendor == 'sqlite':
+        # dbstat is only there when SQLite was built with SQLITE_ENABLE_DBSTAT_VTAB
+        sql = (
+            'SELECT m.tbl_name, SUM(s.pgsize) FROM dbstat s JOIN sqlite_master m ON m.name = s.name '
+            f'WHERE m.tbl_name IN ({placeholders}) GROUP BY m.tbl_name'
+        )
+    elif vendor == 'mysql':
+        sql = (
+            'SELECT table_name, data_length + index_length FROM information_schema.tables '
+            f'WHERE table_schema = DATABASE() AND table_name IN ({placeholders})'
+        )
+    else:
+        return {}
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, list(tables))
+            return dict(cursor.fetchall())
+    except DatabaseError:
+        return {}
+
+
+def monitored_models():
+    from .models import AuditLog, LoginAttempt, ManagementFund, Notification, Sponsor, Transaction
+
+    return [
+        Transaction,
+        Transaction.history.model,
+        ManagementFund.history.model,
+        Sponsor.history.model,
+        Notification,
+        AuditLog,
+        LoginAttempt,
+    ]
+
+
+def table_stats():
+    """Row count and size of the tables that grow with use."""
+    models = monitored_models()
+    sizes = table_sizes([model._meta.db_table for model in models])
+    return [
+        {
+            'name': model._meta.verbose_name_plural.title(),
+            'table': model._meta.db_table,
+            'rows': model.objects.count(),
+            'bytes': sizes.get(model._meta.db_table),
+        }
+        for model in models
+    ]
+
+
+def _scan_media(root):
+    usage = {}
+    for directory, _subdirs, files in os.walk(root):
+        relative = os.path.relpath(directory, root)
+        top = '(top level)' if relative == '.' else relative.split(os.sep, 1)[0]
+        entry = usage.setdefault(top, {'directory': top, 'files': 0, 'bytes': 0})
+        for filename in files:
+            try:
+                entry['bytes'] += os.stat(os.path.join(directory, filename)).st_size
+            except OSError:
+                continue  # removed while walking
+            entry['files'] += 1
+    return sorted((entry for entry in usage.values() if entry['files']), key=lambda entry: entry['bytes'], reverse=True)
+
+
+def media_usage():
+    """Files and bytes under ``MEDIA_ROOT`` per top-level directory (cached for a few minutes)."""
+    root = settings.MEDIA_ROOT
+    usage = cache.get(MEDIA_USAGE_CACHE_KEY)
+    if usage is None or usage['root'] != root:
+        usage = {'root': root, 'directories': _scan_media(root) if os.path.isdir(root) else []}
+        cache.set(MEDIA_USAGE_CACHE_KEY, usage, MEDIA_USAGE_CACHE_SECONDS)
+    return usage['directories']
+
+
+def performance_report(window='hour'):
+    """Everything the staff performance page shows, for the last hour or day."""
+    from .models import RequestSample
+
+    flush_samples()  # include this worker's latest requests
+    since = timezone.now() - WINDOWS[window]
+    samples = RequestSample.objects.filter(recorded_at__gte=since)
+    endpoints = endpoint_stats(samples)
+    directories = media_usage()
+    return {
+        'window': window,
+        'since': since,
+        'sampled_requests': sum(row['requests'] for row in endpoints),
+        'slowest_endpoints': endpoints[:SLOWEST_ENDPOINTS],
+        'queries_per_view': sorted(endpoints, key=lambda row: row['avg_queries'], reverse=True),
+        'exports': export_stats(samples),
+        'caches': cache_stats(),
+        'tables': table_stats(),
+        'media': directories,
+        'media_bytes': sum(entry['bytes'] for entry in directories),
+        'media_files': sum(entry['files'] for entry in directories),
+    }
@@ -0,0 +1,202 @@
+"""
+On-demand cProfile capture for staff.
+
+A staff member adds a signed token to any request, either as the
+``_profile`` query parameter or the ``X-Profile-Token`` header, and
+``ProfilingMiddleware`` runs that request under cProfile. Tokens come from
+``profiling_token(user)`` (shown on the Profile Captures admin page), are
+tied to the user who requested them and expire after
+``PROFILING_TOKEN_MAX_AGE`` seconds. Requests with a missing, expired or
+foreign token are served normally and nothing reveals that profiling
+exists.
+
+Each capture writes two files to ``PROFILING_DIR``:
+
+- ``<name>.prof``: the pstats dump (``python -m pstats``, snakeviz, ...)
+- ``<name>.collapsed``: collapsed stacks for ``flamegraph.pl`` or
+  speedscope. cProfile only records caller/callee pairs, not whole stacks,
+  so deeper frames are apportioned by each caller's share of the time.
+
+and a ``ProfileCapture`` row with the top functions by cumulative time.
+Streaming responses are profiled up to the point the view returns.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import time
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core import signing
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import ProfileCapture
+
+logger = logging.getLogger(__name__)
+
+QUERY_PARAM = '_profile'
+HEADER = 'X-Profile-Token'
+TOKEN_SALT = 'tedx_finance.profiling'
+TOP_FUNCTIONS = 30
+# Stack paths below this share of a microsecond are dropped from the collapsed file
+MIN_STACK_US = 1
+MAX_STACK_DEPTH = 128
+
+
+def profiling_dir():
+    return getattr(settings, 'PROFILING_DIR', '') or os.path.join(settings.BASE_DIR, 'profiles')
+
+
+def profiling_token(user):
+    """Signed token that lets ``user`` profile requests until it expires."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(str(user.pk))
+
+
+def token_user_id(token):
+    """User pk a token was issued to, or None if it is invalid or expired."""
+    max_age = getattr(settings, 'PROFILING_TOKEN_MAX_AGE', 3600)
+    try:
+        return int(signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=max_age))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def _requested_by_staff(request):
+    token = request.GET.get(QUERY_PARAM) or request.headers.get(HEADER)
+    if not token:
+        return False
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated or not user.is_staff:
+        return False
+    return token_user_id(token) == user.pk
+
+
+def _path_prefixes():
+    """Project and sys.path directories, longest first, to shorten file names in stack frames."""
+    return sorted({str(settings.BASE_DIR), *(path for path in sys.path if path)}, key=len, reverse=True)
+
+
+def _frame_label(func, prefixes):
+    filename, line, name = func
+    if filename == '~':
+        return name  # built-in, e.g. "<method 'join' of 'str' objects>"
+    for prefix in prefixes:
+        if filename.startswith(prefix + os.sep):
+            filename = filename[len(prefix) + 1:]
+            break
+    return f'{name} ({filename}:{line})'.replace(';', ',')
+
+
+def collapsed_stacks(stats):
+    """
+    ``{"root;caller;callee": microseconds}`` of self time per stack, from pstats data.
+
+    A function called from several places has its callees split between
+    those callers in proportion to the time each caller spent in it.
+    """
+    raw = stats.stats
+    callees = defaultdict(list)
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees[caller].append((func, edge[3]))  # (callee, cumulative time from this caller)
+    stacks = defaultdict(float)
+    prefixes = _path_prefixes()
+
+    def walk(func, frames, on_path, share):
+        tt = raw[func][2]
+        frames = frames + (_frame_label(func, prefixes),)
+        if tt * share * 1e6 >= MIN_STACK_US:
+            stacks[';'.join(frames)] += tt * share * 1e6
+        if len(frames) >= MAX_STACK_DEPTH:
+            return
+        for callee, edge_ct in callees.get(func, ()):
+            callee_ct = raw[callee][3]
+            if callee in on_path or not callee_ct or edge_ct * share * 1e6 < MIN_STACK_US:
+                continue
+            walk(callee, frames, on_path | {callee}, share * edge_ct / callee_ct)
+
+    for func, (_, _, _, _, callers) in raw.items():
+        if not callers:
+            walk(func, (), {func}, 1.0)
+    return {stack: round(us) for stack, us in stacks.items() if round(us)}
+
+
+def top_functions(profiler, limit=TOP_FUNCTIONS):
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).strip_dirs().sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue().strip()
+
+
+def save_capture(request, response, profiler, duration):
+    """Write the profile files and the ``ProfileCapture`` row."""
+    stats = pstats.Stats(profiler)
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match else ''
+    directory = profiling_dir()
+    os.makedirs(directory, exist_ok=True)
+    name = f"{timezone.now():%Y%m%d-%H%M%S}-{slugify(view.replace(':', '-')) or 'request'}-{uuid.uuid4().hex[:8]}"
+
+    stats.dump_stats(os.path.join(directory, f'{name}.prof'))
+    with open(os.path.join(directory, f'{name}.collapsed'), 'w', encoding='utf-8') as handle:
+        for stack, us in sorted(collapsed_stacks(stats).items()):
+            handle.write(f'{stack} {us}\n')
+
+    return ProfileCapture.objects.create(
+        user=request.user,
+        method=request.method,
+        path=request.path[:500],
+        view=view,
+        status_code=response.status_code,
+        duration_ms=round(duration * 1000, 1),
+        prof_file=f'{name}.prof',
+        collapsed_file=f'{name}.collapsed',
+        top_functions=top_functions(profiler),
+    )
+
+
+class ProfilingMiddleware:
+    """Run requests carrying a valid staff profiling token under cProfile."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'PROFILING_ENABLED', True) or not _requested_by_staff(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger) is already active on this thread
+            return self.get_response(request)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - start
+
+        try:
+            capture = save_capture(request, response, profiler, duration)
+        except OSError:
+            logger.exception('Could not write profile for %s', request.path)
+        else:
+            response['X-Profile-Capture'] = str(capture.pk)
+        return response
+
+
+@receiver(post_delete, sender=ProfileCapture)
+def delete_profile_files(sender, instance, **kwargs):
+    for filename in (instance.prof_file, instance.collapsed_file):
+        try:
+            os.remove(os.path.join(profiling_dir(), filename))
+        except OSError:
+            pass
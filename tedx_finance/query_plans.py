@@ -0,0 +1,88 @@
+"""
+Index coverage checks for the hot Transaction queries.
+
+``HOT_QUERIES`` mirrors the access patterns of the dashboard, finance report,
+budgets, forecasting, proof gallery and exports. ``full_table_scans()`` runs
+``EXPLAIN`` for a queryset and reports any table read without an index, so
+tests can fail when a model or query change silently loses index coverage.
+
+SQLite reports a full scan as ``SCAN <table>`` (an index scan reads
+``SCAN <table> USING [COVERING] INDEX ...``). On PostgreSQL the planner
+prefers sequential scans on small tables, so sequential scans are disabled
+for the EXPLAIN; a ``Seq Scan`` that remains means no usable index exists.
+"""
+import re
+from datetime import date, timedelta
+
+from django.db import connection, transaction as db_transaction
+from django.db.models import Q, Sum
+
+from .models import Budget, Transaction
+
+# Tables that grow with usage and must never be read in full by hot paths
+WATCHED_TABLES = (Transaction._meta.db_table,)
+
+
+def _hot_queries():
+    today = date.today()
+    month_ago = today - timedelta(days=30)
+    return {
+        'total_spent': Transaction.objects.filter(approved=True, amount__lt=0).only('amount'),
+        'spend_matrix': (
+            Transaction.objects.filter(approved=True, amount__lt=0, date__gte=month_ago, date__lte=today)
+            .values('category_ref_id', 'date')
+            .annotate(total=Sum('amount'))
+            .order_by()
+        ),
+        'approved_by_date': Transaction.objects.filter(approved=True, date__gte=month_ago).order_by('-date'),
+        'pending_queue': Transaction.objects.filter(approved=False).order_by('-date'),
+        'budget_spent': Budget.objects.annotate(spent_total=Budget.spent_subquery()),
+        'category_filter': Transaction.objects.filter(category_ref_id=1, approved=True).order_by('date'),
+        'proof_gallery': (
+            Transaction.objects.filter(approved=True, proof__isnull=False)
+            .exclude(proof='')
+            .filter(Q(date__lt=today) | Q(date=today, id__lt=10 ** 9))
+            .order_by('-date', '-id')
+        ),
+    }
+
+
+HOT_QUERY_NAMES = tuple(_hot_queries())
+
+
+def get_hot_query(name):
+    """Build the named hot query (dates are relative to today)."""
+    return _hot_queries()[name]
+
+
+def explain(queryset):
+    """EXPLAIN output for ``queryset`` with sequential scans discouraged on PostgreSQL."""
+    if connection.vendor == 'postgresql':
+        with db_transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+    return queryset.explain()
+
+
+def full_table_scans(queryset, tables=WATCHED_TABLES):
+    """
+    Return the watched tables that ``queryset`` reads without an index.
+
+    Only SQLite and PostgreSQL plans are understood; other backends return [].
+    """
+    plan = explain(queryset)
+    scanned = []
+    for table in tables:
+        if connection.vendor == 'sqlite':
+            # "SCAN <table>" with no "USING ... INDEX"; subqueries show their alias
+            # (U0, U1, ...) instead of the table name, and hot subqueries only read
+            # transactions
+            pattern = rf'\bSCAN (?:{re.escape(table)}|U\d+)(?: AS \w+)?\s*$'
+        elif connection.vendor == 'postgresql':
+            pattern = rf'Seq Scan on {re.escape(table)}\b'
+        else:
+            return []
+        if re.search(pattern, plan, re.MULTILINE):
+            scanned.append(table)
+    return scanned
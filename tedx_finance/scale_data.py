@@ -0,0 +1,287 @@
+"""
+Synthetic ledger data at production-like volumes.
+
+``generate_scale_data`` fills the database with users, categories, budgets,
+sponsors, management funds, transactions, proof files, notifications and
+login attempts, using ``bulk_create`` in batches so a million transactions
+load in minutes. All randomness comes from one seeded generator, so the
+same arguments always produce the same rows.
+
+Distributions, roughly as seen in a real event cycle:
+
+- transaction dates ramp up towards the event at the end of the range and
+  dip at weekends
+- amounts are log-normal with a per-category scale (venue and speakers are
+  large, logistics small); about 5% are positive (refunds)
+- categories follow a skewed popularity; older transactions are more
+  likely to be approved than recent ones
+
+``bulk_create`` skips model signals and history, so no history rows are
+written; the ledger version is bumped once at the end so cached pages
+refresh.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from .ledger import bump_ledger_version
+from .models import Budget, Category, LoginAttempt, ManagementFund, Notification, Sponsor, Transaction
+
+# (name, median expense in INR, relative popularity)
+BASE_CATEGORIES = [
+    ('Marketing', 8000, 18),
+    ('Logistics', 2500, 30),
+    ('Speakers', 25000, 8),
+    ('Venue', 60000, 4),
+    ('Other', 1500, 12),
+    ('Catering', 12000, 10),
+    ('Printing', 3000, 9),
+    ('Merchandise', 6000, 5),
+    ('Travel', 9000, 6),
+    ('Technology', 15000, 4),
+    ('Decor', 5000, 5),
+    ('Volunteers', 2000, 7),
+]
+TITLE_WORDS = [
+    'Banner', 'Stage', 'Lights', 'Sound', 'Badges', 'Snacks', 'Lunch', 'Cab', 'Flight', 'Hotel',
+    'Posters', 'T-shirts', 'Projector', 'Mics', 'Flowers', 'Tickets', 'Printing', 'Ads', 'Gifts', 'Water',
+]
+SPONSOR_WORDS = ['Acme', 'Globex', 'Initech', 'Umbrella', 'Stark', 'Wayne', 'Hooli', 'Vandelay', 'Soylent', 'Tyrell']
+SPONSOR_SUFFIXES = ['Labs', 'Industries', 'Bank', 'Foundation', 'Systems', 'Media', 'Group', 'Ventures']
+# Relative frequency of each Notification type; types added to the model later get the default
+NOTIFICATION_WEIGHTS = {
+    'transaction_approved': 0.45,
+    'transaction_rejected': 0.1,
+    'fund_created': 0.2,
+    'fund_low': 0.1,
+    'budget_exceeded': 0.15,
+}
+DEFAULT_NOTIFICATION_WEIGHT = 0.1
+
+# Smallest valid PNG (1x1, transparent) for generated proof files
+PROOF_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6300010000050001'
+    '0d0a2db40000000049454e44ae426082'
+)
+
+
+def _batches(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield start, min(start + batch_size, total)
+
+
+def _dates(rng, count, start, days):
+    """Dates ramping up towards the end of the range, with fewer at weekends."""
+    offsets = np.floor(days * rng.beta(2.2, 1.2, count)).astype(np.int64)
+    weekdays = np.array([(start + timedelta(days=int(d))).weekday() for d in range(days)])[offsets]
+    # Move two thirds of weekend dates to the preceding Friday
+    shift = (weekdays >= 5) & (rng.random(count) < 2 / 3)
+    return np.where(shift, np.maximum(offsets - (weekdays - 4), 0), offsets)
+
+
+def generate_scale_data(
+    seed=42,
+    users=50,
+    categories=12,
+    sponsors=200,
+    management_funds=100,
+    transactions=100_000,
+    proofs=0,
+    notifications=10_000,
+    login_attempts=10_000,
+    approval_ratio=0.85,
+    days=730,
+    end_date=None,
+    prefix='scale',
+    batch_size=5000,
+    progress=None,
+):
+    """
+    Bulk-load a synthetic dataset; returns ``{model name: rows created}``.
+
+    Args:
+        seed: Seed for every random choice (same seed and counts, same data)
+        users..login_attempts: Rows to create per model (``proofs`` is the number of
+            transactions that get a generated proof file)
+        approval_ratio: Overall share of approved transactions
+        days, end_date: Transactions fall in the ``days`` days up to ``end_date`` (default today)
+        prefix: Username prefix for generated users (``<prefix>_user_00001``)
+        batch_size: Rows per INSERT batch
+        progress: Optional callable ``(label, done, total)`` for progress output
+    """
+    rng = np.random.default_rng(seed)
+    end_date = end_date or timezone.localdate()
+    start_date = end_date - timedelta(days=days - 1)
+    report = progress or (lambda label, done, total: None)
+    created = {}
+
+    # --- Users: one password hash shared by all, hashing per user is the slow part
+    password = make_password(f'{prefix}-password')
+    usernames = [f'{prefix}_user_{i:05d}' for i in range(1, users + 1)]
+    User.objects.bulk_create(
+        [
+            User(username=name, email=f'{name}@example.com', password=password, first_name='Scale', last_name=f'User {i}')
+            for i, name in enumerate(usernames, 1)
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    user_ids = np.array(sorted(User.objects.filter(username__in=usernames).values_list('pk', flat=True)))
+    created['users'] = len(user_ids)
+
+    # --- Categories: the base list first, then numbered extras
+    specs = BASE_CATEGORIES[:categories] + [
+        (f'Category {i:03d}', int(rng.integers(1000, 20000)), 2) for i in range(len(BASE_CATEGORIES) + 1, categories + 1)
+    ]
+    Category.objects.bulk_create([Category(name=name) for name, _, _ in specs], ignore_conflicts=True)
+    category_ids = dict(Category.objects.filter(name__in=[name for name, _, _ in specs]).values_list('name', 'pk'))
+    names = [name for name, _, _ in specs]
+    medians = np.array([median for _, median, _ in specs], dtype=np.float64)
+    weights = np.array([weight for _, _, weight in specs], dtype=np.float64)
+    weights /= weights.sum()
+    created['categories'] = len(category_ids)
+
+    # --- Budgets: one per category (Budget.category is unique), sized to expected spend
+    expected_spend = medians * weights * transactions * 1.2
+    Budget.objects.bulk_create(
+        [
+            Budget(
+                category_id=category_ids[name],
+                amount=Decimal(str(round(min(expected_spend[i] * rng.uniform(0.7, 1.2), 99_999_999), 2))),
+                start_date=start_date,
+                end_date=end_date,
+            )
+            for i, name in enumerate(names)
+        ],
+        ignore_conflicts=True,
+    )
+    created['budgets'] = Budget.objects.filter(category_id__in=category_ids.values()).count()
+
+    # --- Sponsors and management funds
+    sponsor_amounts = np.round(rng.lognormal(np.log(40000), 1.0, sponsors), -2).clip(1000, 5_000_000)
+    sponsor_days = rng.integers(0, days, sponsors)
+    Sponsor.objects.bulk_create(
+        [
+            Sponsor(
+                name=f'{SPONSOR_WORDS[i % len(SPONSOR_WORDS)]} {SPONSOR_SUFFIXES[(i // len(SPONSOR_WORDS)) % len(SPONSOR_SUFFIXES)]} {i + 1}',
+                amount=Decimal(str(sponsor_amounts[i])),
+                date_received=start_date + timedelta(days=int(sponsor_days[i])),
+                contact_email=f'sponsor{i + 1}@example.com',
+            )
+            for i in range(sponsors)
+        ],
+        batch_size=batch_size,
+    )
+    created['sponsors'] = sponsors
+
+    fund_amounts = np.round(rng.lognormal(np.log(20000), 0.6, management_funds), -2).clip(500, 1_000_000)
+    fund_days = rng.integers(0, days, management_funds)
+    ManagementFund.objects.bulk_create(
+        [
+            ManagementFund(amount=Decimal(str(fund_amounts[i])), date_received=start_date + timedelta(days=int(fund_days[i])))
+            for i in range(management_funds)
+        ],
+        batch_size=batch_size,
+    )
+    created['management_funds'] = management_funds
+
+    # --- Proof files: one file per proof, shared naming so reruns overwrite instead of piling up
+    proof_names = []
+    for i in range(proofs):
+        name = f'proofs/{prefix}/{seed}/proof_{i + 1:06d}.png'
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(PROOF_PNG))
+        proof_names.append(name)
+        if (i + 1) % batch_size == 0:
+            report('proofs', i + 1, proofs)
+    created['proofs'] = proofs
+
+    # --- Transactions, generated column-wise per batch
+    proof_rows = set(rng.choice(transactions, size=min(proofs, transactions), replace=False).tolist()) if proofs else set()
+    proof_iter = iter(proof_names)
+    created['transactions'] = 0
+    for start, stop in _batches(transactions, batch_size):
+        count = stop - start
+        offsets = _dates(rng, count, start_date, days)
+        category_index = rng.choice(len(names), size=count, p=weights)
+        amounts = np.round(rng.lognormal(np.log(medians[category_index]), 0.8), 2).clip(10, 99_999_999)
+        refunds = rng.random(count) < 0.05
+        amounts = np.where(refunds, amounts / 4, -amounts).round(2)
+        # Approval likelihood falls from ~100% for the oldest rows to well under the ratio for the newest
+        age = 1 - offsets / max(days - 1, 1)
+        approve_p = np.clip(approval_ratio + (age - age.mean()) * 2 * (1 - approval_ratio), 0, 1)
+        approved = rng.random(count) < approve_p
+        creators = rng.choice(user_ids, size=count) if len(user_ids) else np.zeros(count, dtype=np.int64)
+        words = rng.integers(0, len(TITLE_WORDS), size=count)
+
+        rows = []
+        for j in range(count):
+            name = names[category_index[j]]
+            rows.append(Transaction(
+                title=f'{TITLE_WORDS[words[j]]} #{start + j + 1}',
+                amount=Decimal(str(amounts[j])),
+                category=name,
+                category_ref_id=category_ids[name],
+                date=start_date + timedelta(days=int(offsets[j])),
+                proof=next(proof_iter) if start + j in proof_rows else None,
+                created_by_id=int(creators[j]) if len(user_ids) else None,
+                approved=bool(approved[j]),
+            ))
+        with db_transaction.atomic():
+            Transaction.objects.bulk_create(rows, batch_size=batch_size)
+        created['transactions'] += count
+        report('transactions', stop, transactions)
+
+    # --- Notifications and login attempts
+    notification_types = [value for value, _ in Notification.NOTIFICATION_TYPES]
+    weights = np.array([NOTIFICATION_WEIGHTS.get(value, DEFAULT_NOTIFICATION_WEIGHT) for value in notification_types])
+    weights /= weights.sum()
+    created['notifications'] = 0
+    for start, stop in _batches(notifications if len(user_ids) else 0, batch_size):
+        count = stop - start
+        kinds = rng.choice(len(notification_types), size=count, p=weights)
+        recipients = rng.choice(user_ids, size=count)
+        read = rng.random(count) < 0.7
+        related_ids = rng.integers(1, max(transactions, 1) + 1, size=count)
+        Notification.objects.bulk_create([
+            Notification(
+                user_id=int(recipients[j]),
+                notification_type=notification_types[kinds[j]],
+                title=dict(Notification.NOTIFICATION_TYPES)[notification_types[kinds[j]]],
+                message=f'Synthetic notification {start + j + 1}',
+                is_read=bool(read[j]),
+                related_object_type='Transaction',
+                related_object_id=int(related_ids[j]),
+            )
+            for j in range(count)
+        ])
+        created['notifications'] += count
+        report('notifications', stop, notifications)
+
+    created['login_attempts'] = 0
+    for start, stop in _batches(login_attempts, batch_size):
+        count = stop - start
+        who = rng.integers(0, max(users, 1), size=count)
+        octets = rng.integers(1, 255, size=(count, 2))
+        success = rng.random(count) < 0.9
+        LoginAttempt.objects.bulk_create([
+            LoginAttempt(
+                username=usernames[who[j]] if users else f'{prefix}_unknown',
+                ip_address=f'10.{octets[j, 0] % 16}.{octets[j, 0]}.{octets[j, 1]}',
+                success=bool(success[j]),
+            )
+            for j in range(count)
+        ])
+        created['login_attempts'] += count
+        report('login attempts', stop, login_attempts)
+
+    bump_ledger_version()
+    return created
@@ -0,0 +1,177 @@
+"""
+Slow-query log.
+
+Statements are timed by the request's ``RequestTimings`` execute wrapper
+(``instrumentation.py``), which hands those slower than
+``SLOW_QUERY_THRESHOLD_MS`` to ``log_slow_query``, so each statement is
+timed once. Statements outside a request (management commands, background
+threads) are not logged. A slow statement is recorded with:
+
+- the normalized SQL (literals and placeholders replaced by ``?``,
+  ``IN (?, ?, ...)`` lists collapsed, whitespace squeezed) and its
+  fingerprint, so the same query with different values groups together
+- a fingerprint of the parameters (the values themselves are not kept)
+- the URL name of the view being served, from ``RequestTimingMiddleware``
+- the innermost ``tedx_finance`` stack frame that issued the query
+- the query plan: ``EXPLAIN QUERY PLAN`` on SQLite, ``EXPLAIN (FORMAT JSON)``
+  on PostgreSQL (SELECTs only; the plan is re-run with the same parameters)
+
+Entries go to the ``tedx_finance.slow_queries`` logger, to a rotating file
+when ``SLOW_QUERY_LOG_FILE`` is set, and to the ``SlowQuery`` table when
+``SLOW_QUERY_STORE`` is on; the admin groups the table by fingerprint to
+show the top offenders. A threshold of 0 turns the log off.
+
+Rows written inside a transaction that is later rolled back are lost with
+it; the log file keeps them.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from .instrumentation import current_request
+
+slow_query_logger = logging.getLogger('tedx_finance.slow_queries')
+
+# Rotating log file: 10 MB per file, 5 old files kept
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUP_COUNT = 5
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Frames from these modules are plumbing, not the code that issued the query
+_SKIPPED_FILES = {
+    os.path.join(_PACKAGE_DIR, 'slow_queries.py'),
+    os.path.join(_PACKAGE_DIR, 'instrumentation.py'),
+}
+
+# Set while the log runs its own EXPLAIN/INSERT, so those are not timed again
+_recording = ContextVar('tedx_slow_query_recording', default=False)
+_file_handler_path = None
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|%\(\w+\)s')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """SQL with values replaced by ``?`` so queries differing only in values compare equal."""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(text):
+    return hashlib.md5(text.encode('utf-8'), usedforsecurity=False).hexdigest()
+
+
+def calling_frame():
+    """``path:line in function`` of the innermost ``tedx_finance`` frame on the stack, or ''."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_PACKAGE_DIR + os.sep) and filename not in _SKIPPED_FILES:
+            return f"{os.path.relpath(filename, os.path.dirname(_PACKAGE_DIR))}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return ''
+
+
+def explain_sql(connection, sql, params):
+    """Query plan for a SELECT as text, or '' when it cannot be explained."""
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return ''
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    elif connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN (FORMAT JSON) '
+    else:
+        prefix = 'EXPLAIN '
+    try:
+        # A savepoint, so a failed EXPLAIN does not break the caller's transaction
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return ''
+    if connection.vendor == 'sqlite':
+        # (id, parent, notused, detail)
+        return '\n'.join(str(row[-1]) for row in rows)
+    if connection.vendor == 'postgresql':
+        plan = rows[0][0]
+        return plan if isinstance(plan, str) else json.dumps(plan, indent=2)
+    return '\n'.join(' '.join(str(value) for value in row) for row in rows)
+
+
+def _ensure_file_handler():
+    """Attach a rotating file handler for ``SLOW_QUERY_LOG_FILE`` (once per path)."""
+    global _file_handler_path
+    path = getattr(settings, 'SLOW_QUERY_LOG_FILE', '')
+    if not path or path == _file_handler_path:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    for handler in list(slow_query_logger.handlers):
+        if getattr(handler, '_slow_query_file', False):
+            slow_query_logger.removeHandler(handler)
+            handler.close()
+    handler = RotatingFileHandler(path, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUP_COUNT, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    handler._slow_query_file = True
+    slow_query_logger.addHandler(handler)
+    if slow_query_logger.level == logging.NOTSET:
+        slow_query_logger.setLevel(logging.WARNING)
+    _file_handler_path = path
+
+
+def record_slow_query(connection, sql, params, many, duration_ms):
+    """Log (and optionally store) one slow statement; returns the entry dict."""
+    request = current_request()
+    match = getattr(request, 'resolver_match', None)
+    normalized = normalize_sql(sql)
+    entry = {
+        'fingerprint': fingerprint(normalized),
+        'normalized_sql': normalized,
+        'params_fingerprint': fingerprint(repr(params)) if params else '',
+        'duration_ms': round(duration_ms, 1),
+        'view': match.view_name if match else '',
+        'source': calling_frame(),
+        'plan': '' if many else explain_sql(connection, sql, params),
+    }
+
+    _ensure_file_handler()
+    slow_query_logger.warning(
+        'slow_query duration_ms=%s fingerprint=%s view=%s source=%s sql=%s%s',
+        entry['duration_ms'], entry['fingerprint'], entry['view'] or '-', entry['source'] or '-', normalized,
+        f"\n{entry['plan']}" if entry['plan'] else '',
+        extra={'slow_query': entry},
+    )
+
+    if getattr(settings, 'SLOW_QUERY_STORE', False):
+        from .models import SlowQuery
+        try:
+            with transaction.atomic(using=connection.alias):
+                SlowQuery.objects.using(connection.alias).create(**entry)
+        except DatabaseError:
+            # e.g. the table is not migrated yet; the log line is already out
+            pass
+    return entry
+
+
+def log_slow_query(connection, sql, params, many, duration_ms):
+    """Record a statement that ``RequestTimings`` timed over the threshold, unless it is the log's own."""
+    if _recording.get():
+        return
+    token = _recording.set(True)
+    try:
+        record_slow_query(connection, sql, params, many, duration_ms)
+    finally:
+        _recording.reset(token)
@@ -0,0 +1,83 @@
+"""
+Sponsor tiers, computed in SQL.
+
+Tier thresholds live in the ``SponsorTier`` table. ``tier_expressions``
+turns them into ``Case/When`` expressions over ``Sponsor.amount``, so sponsor
+lists get their tier name and badge class from the same query that fetches
+the rows, and ``tier_summary`` groups sponsors by tier for per-tier counts
+and totals in a single aggregate query.
+
+The tier table is tiny and rarely edited, so it is cached under the ledger
+version. Writes to it bump that version in the database (``ledger.py``), so
+every worker stops using the old tiers at once, not just the one whose
+per-process cache the write dropped.
+"""
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, Sum, Value, When
+
+from .ledger import ledger_version
+from .models import Sponsor, SponsorTier
+
+TIERS_CACHE_KEY = 'sponsor_tiers:{version}'
+TIERS_CACHE_SECONDS = 60 * 60
+
+
+def get_tiers():
+    """Tiers as ``{'name', 'min_amount', 'badge_class'}`` dicts, highest threshold first."""
+    cache_key = TIERS_CACHE_KEY.format(version=ledger_version())
+    tiers = cache.get(cache_key)
+    if tiers is None:
+        tiers = list(SponsorTier.objects.order_by('-min_amount').values('name', 'min_amount', 'badge_class'))
+        cache.set(cache_key, tiers, TIERS_CACHE_SECONDS)
+    return tiers
+
+
+def tier_expressions(tiers=None, field='amount'):
+    """
+    ``(tier, badge)`` expressions assigning each row the tier with the highest threshold not above ``field``.
+
+    Amounts below every threshold get an empty tier and badge.
+    """
+    tiers = get_tiers() if tiers is None else tiers
+
+    def case(key):
+        return Case(
+            *[When(**{f'{field}__gte': tier['min_amount']}, then=Value(tier[key])) for tier in tiers],
+            default=Value(''),
+            output_field=CharField(),
+        )
+
+    return case('name'), case('badge_class')
+
+
+def with_tiers(queryset, tiers=None):
+    """Annotate a Sponsor queryset with ``tier`` and ``tier_badge``."""
+    tier, badge = tier_expressions(tiers)
+    return queryset.annotate(tier=tier, tier_badge=badge)
+
+
+def tier_summary(queryset=None, tiers=None):
+    """
+    Sponsor count and total amount per tier, from one grouped query.
+
+    Returns one ``{'name', 'badge_class', 'min_amount', 'count', 'total'}``
+    per tier, highest first; tiers without sponsors are included with zeros.
+    """
+    queryset = Sponsor.objects.all() if queryset is None else queryset
+    tiers = get_tiers() if tiers is None else tiers
+    tier, _ = tier_expressions(tiers)
+    rows = {
+        row['tier']: row
+        for row in queryset.annotate(tier=tier).values('tier').annotate(count=Count('pk'), total=Sum('amount')).order_by()
+    }
+    return [
+        {
+            'name': t['name'],
+            'badge_class': t['badge_class'],
+            'min_amount': t['min_amount'],
+            'count': rows.get(t['name'], {}).get('count', 0),
+            'total': rows.get(t['name'], {}).get('total') or 0,
+        }
+        for t in tiers
+    ]
+
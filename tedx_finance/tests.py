@@ -1,4 +1,6 @@
-from django.test import TestCase
+from unittest import mock
+
+from django.test import LiveServerTestCase, TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth.models import User
 
@@ -18,3 +20,1901 @@ class AuthFlowTests(TestCase):
 		# After logout, accessing dashboard should redirect to login
 		resp = self.client.get(reverse("tedx_finance:dashboard"))
 		self.assertIn(resp.status_code, [302, 303])
+
+
+class ProofServingTests(TestCase):
+	def setUp(self):
+		import shutil
+		import tempfile
+		from datetime import date
+		from django.core.files.base import ContentFile
+		from .models import Transaction
+
+		self.media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+		self.settings_override = self.settings(MEDIA_ROOT=self.media_root, PROOF_SERVE_METHOD='django')
+		self.settings_override.enable()
+		self.addCleanup(self.settings_override.disable)
+
+		self.owner = User.objects.create_user(username="owner", password="pass1234")
+		self.other = User.objects.create_user(username="other", password="pass1234")
+		self.tx = Transaction(title="Venue deposit", amount=-500, category="Venue", date=date.today(), created_by=self.owner)
+		self.tx.proof.save("receipt.txt", ContentFile(b"0123456789"), save=False)
+		self.tx.save()
+		self.url = reverse("tedx_finance:serve_proof", args=[self.tx.pk])
+
+	def test_pending_proof_hidden_from_other_members(self):
+		self.client.login(username="other", password="pass1234")
+		self.assertEqual(self.client.get(self.url).status_code, 403)
+		self.client.login(username="owner", password="pass1234")
+		resp = self.client.get(self.url)
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(b"".join(resp.streaming_content), b"0123456789")
+		self.assertIn("immutable", resp["Cache-Control"])
+
+	def test_range_and_conditional_requests(self):
+		self.client.login(username="owner", password="pass1234")
+		resp = self.client.get(self.url, HTTP_RANGE="bytes=2-5")
+		self.assertEqual(resp.status_code, 206)
+		self.assertEqual(resp["Content-Range"], "bytes 2-5/10")
+		self.assertEqual(b"".join(resp.streaming_content), b"2345")
+
+		resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=resp["ETag"])
+		self.assertEqual(resp.status_code, 304)
+
+		resp = self.client.get(self.url, HTTP_RANGE="bytes=50-")
+		self.assertEqual(resp.status_code, 416)
+
+	def test_compressed_proof_served_as_archive(self):
+		from django.core.files.base import ContentFile
+
+		self.tx.proof.save("statement.csv.gz", ContentFile(b"\x1f\x8b" + bytes(8)))
+		self.client.login(username="owner", password="pass1234")
+		resp = self.client.get(self.url)
+		self.assertEqual(resp["Content-Type"], "application/gzip")
+		self.assertFalse(resp.has_header("Content-Encoding"))
+
+	def test_accel_redirect_offloads_transfer(self):
+		self.client.login(username="owner", password="pass1234")
+		with self.settings(PROOF_SERVE_METHOD='x-accel-redirect', PROOF_ACCEL_REDIRECT_PREFIX='/protected-media/'):
+			resp = self.client.get(self.url)
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(resp["X-Accel-Redirect"], "/protected-media/" + self.tx.proof.name)
+		self.assertEqual(resp.content, b"")
+
+
+class ProofGalleryFeedTests(TestCase):
+	def setUp(self):
+		import shutil
+		import tempfile
+		from datetime import date, timedelta
+		from django.core.files.base import ContentFile
+		from .models import Transaction
+
+		self.media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+		self.settings_override = self.settings(MEDIA_ROOT=self.media_root)
+		self.settings_override.enable()
+		self.addCleanup(self.settings_override.disable)
+
+		self.user = User.objects.create_user(username="viewer", password="pass1234")
+		self.client.login(username="viewer", password="pass1234")
+		self.txs = []
+		for i in range(30):
+			tx = Transaction(title=f"Receipt {i}", amount=-10, category="Venue", date=date(2025, 1, 1) + timedelta(days=i // 2), approved=True)
+			tx.proof.save(f"receipt_{i}.pdf", ContentFile(b"%PDF-1.4"), save=False)
+			tx.save()
+			self.txs.append(tx)
+
+	def test_gallery_renders_first_page_and_feed_continues(self):
+		from .views import PROOF_GALLERY_PAGE_SIZE
+
+		resp = self.client.get(reverse("tedx_finance:proof_gallery"))
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(len(resp.context["proof_items"]), PROOF_GALLERY_PAGE_SIZE)
+		self.assertEqual(resp.context["total_count"], 30)
+
+		feed = self.client.get(reverse("tedx_finance:proof_gallery_feed"), {"after": resp.context["next_cursor"]}).json()
+		self.assertEqual(len(feed["items"]), 30 - PROOF_GALLERY_PAGE_SIZE)
+		self.assertIsNone(feed["next_cursor"])
+		seen = [item["id"] for item in resp.context["proof_items"]] + [item["id"] for item in feed["items"]]
+		self.assertEqual(sorted(seen), sorted(tx.id for tx in self.txs))
+
+	def test_deep_link_starts_page_at_requested_proof(self):
+		oldest = self.txs[0]
+		resp = self.client.get(reverse("tedx_finance:proof_gallery"), {"tx_id": oldest.id})
+		self.assertEqual(resp.context["proof_items"][0]["id"], oldest.id)
+		self.assertTrue(resp.context["prev_cursor"])
+
+		feed = self.client.get(reverse("tedx_finance:proof_gallery_feed"), {"before": resp.context["prev_cursor"]}).json()
+		self.assertEqual(len(feed["items"]), 24)
+		self.assertEqual(feed["items"][-1]["id"], self.txs[1].id)
+
+	def test_image_proofs_get_thumbnails(self):
+		from io import BytesIO
+		from PIL import Image
+		from django.core.files.base import ContentFile
+
+		buffer = BytesIO()
+		Image.new("RGB", (1200, 800), "red").save(buffer, format="PNG")
+		tx = self.txs[-1]
+		tx.proof.save("photo.png", ContentFile(buffer.getvalue()))
+
+		item = self.client.get(reverse("tedx_finance:proof_gallery_feed")).json()["items"][0]
+		self.assertEqual(item["id"], tx.id)
+		resp = self.client.get(item["thumbnail_url"])
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(resp["Content-Type"], "image/jpeg")
+		image = Image.open(BytesIO(b"".join(resp.streaming_content)))
+		self.assertLessEqual(max(image.size), 320)
+
+	def test_csv_export_lists_status(self):
+		import csv
+
+		resp = self.client.get(reverse("tedx_finance:export_proofs_csv"))
+		rows = list(csv.reader(resp.content.decode().splitlines()))
+		self.assertEqual(rows[0], ["Date", "Title", "Category", "Amount (₹)", "Status", "Proof File"])
+		self.assertEqual(len(rows), 31)
+		self.assertEqual({row[4] for row in rows[1:]}, {"Approved"})
+
+	def test_thumbnail_names_keep_the_proof_path(self):
+		from .file_serving import get_thumbnail_name
+
+		self.assertEqual(get_thumbnail_name("proofs/2025/bill.png"), "proofs/thumbnails/proofs/2025/bill_320.jpg")
+		self.assertNotEqual(get_thumbnail_name("proofs/a_b.png"), get_thumbnail_name("proofs/a/b.png"))
+
+	def test_invalid_cursor_rejected(self):
+		resp = self.client.get(reverse("tedx_finance:proof_gallery_feed"), {"after": "garbage"})
+		self.assertEqual(resp.status_code, 400)
+
+
+class BulkApprovalTests(TestCase):
+	def setUp(self):
+		from datetime import date
+		from .models import Budget, Category
+
+		self.treasurer = User.objects.create_superuser(username="treasurer", password="pass1234")
+		self.volunteer = User.objects.create_user(username="volunteer", password="pass1234")
+		category = Category.objects.create(name="Venue")
+		Budget.objects.create(category=category, amount=100, start_date=date(2025, 1, 1), end_date=date(2025, 12, 31))
+
+	def _make_pending(self, count, amount=-10):
+		from datetime import date
+		from .models import Transaction
+
+		return [
+			Transaction.objects.create(title=f"Item {i}", amount=amount, category="Venue", date=date(2025, 3, 1), created_by=self.volunteer)
+			for i in range(count)
+		]
+
+	def test_bulk_approve_keeps_history_audit_and_notifications(self):
+		from .models import AuditLog, Notification, Transaction
+
+		txs = self._make_pending(3)
+		self.client.login(username="treasurer", password="pass1234")
+		resp = self.client.post(
+			reverse("tedx_finance:bulk_approve_transactions"),
+			data={"ids": [tx.id for tx in txs]},
+			content_type="application/json",
+		)
+		self.assertEqual(resp.json()["count"], 3)
+		self.assertEqual(Transaction.objects.filter(approved=True).count(), 3)
+		self.assertEqual(Transaction.history.filter(history_type="~", approved=True).count(), 3)
+		self.assertEqual(AuditLog.objects.filter(action="approve_transaction").count(), 3)
+		self.assertEqual(Notification.objects.filter(user=self.volunteer, notification_type="transaction_approved").count(), 3)
+
+	def test_query_count_does_not_grow_with_batch_size(self):
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		from .approvals import approve_transactions
+
+		small = self._make_pending(2)
+		large = self._make_pending(12)
+		with CaptureQueriesContext(connection) as small_ctx:
+			approve_transactions([tx.id for tx in small], self.treasurer)
+		with CaptureQueriesContext(connection) as large_ctx:
+			result = approve_transactions([tx.id for tx in large], self.treasurer)
+		self.assertEqual(len(small_ctx.captured_queries), len(large_ctx.captured_queries))
+		# 14 x 10 spent against a budget of 100: only the batch crossing the limit reports it
+		self.assertEqual(result["budgets_exceeded"], ["Venue"])
+
+	def test_approve_all_matching_filter_in_chunks(self):
+		from .approvals import approve_matching
+		from .models import Transaction
+
+		self._make_pending(7)
+		Transaction.objects.create(title="Speaker fee", amount=-5, category="Speakers", date="2025-03-01", created_by=self.volunteer)
+		result = approve_matching(Transaction.objects.filter(category="Venue"), self.treasurer, chunk_size=3)
+		self.assertEqual(result["count"], 7)
+		self.assertFalse(Transaction.objects.get(title="Speaker fee").approved)
+
+	def test_bulk_reject_notifies_and_records_deletion(self):
+		from .models import Notification, Transaction
+
+		txs = self._make_pending(2)
+		self.client.login(username="treasurer", password="pass1234")
+		resp = self.client.post(
+			reverse("tedx_finance:bulk_reject_transactions"),
+			data={"ids": [tx.id for tx in txs]},
+			content_type="application/json",
+		)
+		self.assertEqual(resp.json()["count"], 2)
+		self.assertFalse(Transaction.objects.exists())
+		self.assertEqual(Transaction.history.filter(history_type="-", history_user=self.treasurer, history_change_reason="Bulk rejection").count(), 2)
+		self.assertEqual(Notification.objects.filter(notification_type="transaction_rejected").count(), 2)
+
+
+class DiffAwareHistoryTests(TestCase):
+	def setUp(self):
+		from datetime import date
+		from .models import Transaction
+
+		self.tx = Transaction.objects.create(title="Banner", amount=-200, category="Marketing", date=date(2025, 2, 1))
+
+	def test_unchanged_save_writes_no_history(self):
+		from .models import Transaction
+
+		tx = Transaction.objects.get(pk=self.tx.pk)
+		tx.save()
+		self.assertEqual(tx.history.count(), 1)
+
+	def test_changed_fields_are_recorded(self):
+		from .models import Transaction
+
+		tx = Transaction.objects.get(pk=self.tx.pk)
+		tx.approved = True
+		tx.save(update_fields=["approved"])
+		latest = tx.history.first()
+		self.assertEqual(tx.history.count(), 2)
+		self.assertEqual(latest.history_changed_fields, ["approved"])
+
+		# Saving again with nothing new is a no-op for history
+		tx.save(update_fields=["approved"])
+		self.assertEqual(tx.history.count(), 2)
+
+	def test_update_fields_ignores_unlisted_changes(self):
+		from .models import Transaction
+
+		tx = Transaction.objects.get(pk=self.tx.pk)
+		tx.title = "Banner v2"
+		tx.save(update_fields=["approved"])
+		self.assertEqual(tx.history.count(), 1)
+		self.assertEqual(Transaction.objects.get(pk=tx.pk).title, "Banner")
+
+		# The unsaved title change is still detected by a later full save
+		tx.save()
+		self.assertEqual(tx.history.first().history_changed_fields, ["title"])
+
+
+class LedgerAsOfTests(TestCase):
+	def setUp(self):
+		from datetime import date, datetime, timezone as dt_timezone
+		from .models import Budget, Category, ManagementFund, Transaction
+
+		self.t = lambda day: datetime(2025, 1, day, 12, tzinfo=dt_timezone.utc)
+		self.treasurer = User.objects.create_user(username="treasurer", password="pass1234", is_staff=True)
+		category = Category.objects.create(name="Venue")
+		Budget.objects.create(category=category, amount=1000, start_date=date(2025, 1, 1), end_date=date(2025, 1, 31))
+
+		fund = ManagementFund(amount=5000, date_received=date(2025, 1, 1))
+		fund._history_date = self.t(1)
+		fund.save()
+
+		tx = Transaction(title="Deposit", amount=-400, category="Venue", date=date(2025, 1, 2), approved=True, created_by=self.treasurer)
+		tx._history_date = self.t(2)
+		tx.save()
+
+		tx = Transaction.objects.get(pk=tx.pk)
+		tx.amount = -1200
+		tx._history_date = self.t(4)
+		tx.save()
+
+		fund = ManagementFund.objects.get(pk=fund.pk)
+		fund._history_date = self.t(5)
+		fund.delete()
+
+	def _assert_snapshots(self):
+		from .ledger import ledger_as_of
+
+		at_3 = ledger_as_of(self.t(3))
+		self.assertEqual(at_3['total_income'], 5000)
+		self.assertEqual(at_3['total_spent'], 400)
+		self.assertEqual(at_3['budgets'][0]['utilization'], 40.0)
+
+		at_4 = ledger_as_of(self.t(4))
+		self.assertEqual(at_4['total_spent'], 1200)
+		self.assertTrue(at_4['budgets'][0]['exceeded'])
+
+		at_6 = ledger_as_of(self.t(6))
+		self.assertEqual(at_6['total_income'], 0)
+		self.assertEqual(at_6['balance'], -1200)
+
+	def test_replay_from_history_without_checkpoint(self):
+		self._assert_snapshots()
+
+	def test_checkpoint_replays_only_later_changes(self):
+		from .ledger import create_checkpoint
+		from .models import Category
+
+		checkpoint = create_checkpoint(self.t(3))
+		self.assertEqual(checkpoint.spent_total, 400)
+		venue_id = str(Category.objects.get(name="Venue").pk)
+		self.assertEqual(checkpoint.spent_by_category_date, {venue_id: {"2025-01-02": "400.00"}})
+		self._assert_snapshots()
+
+	def test_report_is_treasurer_only(self):
+		member = User.objects.create_user(username="member", password="pass1234")
+		self.client.force_login(member)
+		resp = self.client.get(reverse("tedx_finance:ledger_as_of_report"), {"at": "2025-01-03"})
+		self.assertEqual(resp.status_code, 302)
+
+		self.client.force_login(self.treasurer)
+		resp = self.client.get(reverse("tedx_finance:ledger_as_of_report"), {"at": "2025-01-03"})
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(resp.context["report"]["total_spent"], 400)
+
+
+class BudgetForecastTests(TestCase):
+	def setUp(self):
+		from datetime import date, timedelta
+		from .models import Budget, Category, Transaction
+
+		self.today = date(2025, 3, 31)
+		self.user = User.objects.create_user(username="treasurer", password="pass1234", is_staff=True)
+		for name in ("Venue", "Food", "Marketing"):
+			category = Category.objects.create(name=name)
+			Budget.objects.create(category=category, amount=3000, start_date=date(2025, 3, 1), end_date=date(2025, 4, 30))
+		venue = Category.objects.get(name="Venue")
+		# Venue spends a steady 50/day over the last 60 days
+		Transaction.objects.bulk_create([
+			Transaction(title=f"Venue {i}", amount=-50, category="Venue", category_ref=venue, date=self.today - timedelta(days=i), approved=True, created_by=self.user)
+			for i in range(60)
+		])
+
+	def test_forecast_fits_all_categories(self):
+		from .forecasting import forecast_budgets
+
+		with self.assertNumQueries(2):
+			insights, (names, matrix) = forecast_budgets(today=self.today)
+		by_category = {insight["category"]: insight for insight in insights}
+		venue = by_category["Venue"]
+		# 31 days spent in March, 30 more days at 50/day forecast for April
+		self.assertEqual(venue["spent"], 1550)
+		self.assertAlmostEqual(venue["predicted_total_spend"], 3050, places=0)
+		self.assertTrue(venue["needs_increase"])
+		self.assertLessEqual(venue["predicted_low"], venue["predicted_total_spend"])
+		self.assertGreaterEqual(venue["predicted_high"], venue["predicted_total_spend"])
+		self.assertEqual(by_category["Food"]["predicted_total_spend"], 0)
+		self.assertEqual(matrix.shape, (1, 60))
+
+	def test_page_query_count_independent_of_budget_count(self):
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		from .models import Budget, Category
+
+		self.client.force_login(self.user)
+		self.client.get(reverse("tedx_finance:budget_suggestions"))  # warm session/context caches
+		with CaptureQueriesContext(connection) as before:
+			resp = self.client.get(reverse("tedx_finance:budget_suggestions"))
+		self.assertEqual(resp.status_code, 200)
+
+		for i in range(10):
+			category = Category.objects.create(name=f"Extra {i}")
+			Budget.objects.create(category=category, amount=100, start_date=self.today, end_date=self.today)
+		self.client.get(reverse("tedx_finance:budget_suggestions"))  # re-warm the runway cache for the new ledger version
+		with CaptureQueriesContext(connection) as after:
+			resp = self.client.get(reverse("tedx_finance:budget_suggestions"))
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(len(after), len(before))
+
+
+class RunwaySimulationTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username="member", password="pass1234")
+
+	def test_simulation_percentiles(self):
+		import numpy as np
+		from .runway import simulate_runway
+
+		# 100/day every day: exactly 10 days to spend 1000
+		steady = simulate_runway(1000, np.full((1, 30), 100.0), n_paths=500, horizon_days=60, seed=1)
+		self.assertEqual((steady["p10"], steady["p50"], steady["p90"]), (10, 10, 10))
+		self.assertEqual(steady["depletion_probability"], 1.0)
+
+		# Lumpy spend gives a spread, ordered P10 <= P50 <= P90
+		lumpy = np.zeros((2, 30))
+		lumpy[0, ::10] = 1000
+		lumpy[1, :] = 20
+		result = simulate_runway(3000, lumpy, n_paths=2000, horizon_days=365, seed=1)
+		self.assertLess(result["p10"], result["p90"])
+		self.assertLessEqual(result["p10"], result["p50"])
+
+		# No spending: funds never run out within the horizon
+		idle = simulate_runway(1000, np.zeros((1, 30)), n_paths=100, horizon_days=30, seed=1)
+		self.assertIsNone(idle["p50"])
+
+	def test_endpoint_cached_per_ledger_version(self):
+		from datetime import date
+		from django.core.cache import cache
+		from .models import ManagementFund, Transaction
+
+		cache.clear()
+		ManagementFund.objects.create(amount=1000, date_received=date.today())
+		Transaction.objects.create(title="Stage", amount=-100, category="Venue", date=date.today(), approved=True, created_by=self.user)
+		self.client.force_login(self.user)
+
+		first = self.client.get(reverse("tedx_finance:runway_simulation")).json()
+		self.assertEqual(first["balance"], 900)
+		self.assertEqual(self.client.get(reverse("tedx_finance:runway_simulation")).json(), first)
+
+		Transaction.objects.create(title="Lights", amount=-200, category="Venue", date=date.today(), approved=True, created_by=self.user)
+		second = self.client.get(reverse("tedx_finance:runway_simulation")).json()
+		self.assertNotEqual(second["ledger_version"], first["ledger_version"])
+		self.assertEqual(second["balance"], 700)
+
+	def test_only_treasurers_choose_paths_and_horizon(self):
+		from django.contrib.auth.models import Group
+
+		self.client.force_login(self.user)
+		with mock.patch("tedx_finance.runway.get_runway_forecast", return_value={}) as forecast:
+			self.client.get(reverse("tedx_finance:runway_simulation"), {"paths": 10000, "horizon": 730})
+			forecast.assert_called_once_with()
+
+			self.user.groups.add(Group.objects.get_or_create(name="Treasurer")[0])
+			forecast.reset_mock()
+			self.client.get(reverse("tedx_finance:runway_simulation"), {"paths": 5000, "horizon": 400})
+			forecast.assert_called_once_with(n_paths=5000, horizon_days=400)
+
+
+class CategoryRefTests(TestCase):
+	def setUp(self):
+		from datetime import date
+		from .models import Budget, Category, Transaction
+
+		self.treasurer = User.objects.create_user(username="treasurer", password="pass1234", is_staff=True)
+		self.venue = Category.objects.create(name="Venue")
+		Budget.objects.create(category=self.venue, amount=1000, start_date=date(2025, 1, 1), end_date=date(2025, 12, 31))
+		for i in range(3):
+			Transaction.objects.create(title=f"Deposit {i}", amount=-100, category="Venue", date=date(2025, 2, 1), approved=True, created_by=self.treasurer)
+
+	def test_save_links_category_and_creates_legacy_names(self):
+		from datetime import date
+		from .models import Category, Transaction
+
+		self.assertEqual(Transaction.objects.filter(category_ref=self.venue).count(), 3)
+		tx = Transaction.objects.create(title="Flyers", amount=-20, category="Print", date=date(2025, 2, 1))
+		self.assertEqual(tx.category_ref, Category.objects.get(name="Print"))
+
+	def test_exports_do_not_look_up_categories_per_row(self):
+		import logging
+		import shutil
+		import tempfile
+		from django.core.files.base import ContentFile
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		from .models import Category, Transaction
+
+		media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+		logger = logging.getLogger("xhtml2pdf")
+		self.addCleanup(logger.setLevel, logger.level)
+		logger.setLevel(logging.ERROR)
+		with self.settings(MEDIA_ROOT=media_root, KPI_SNAPSHOT_BACKGROUND_REFRESH=False):
+			for i, tx in enumerate(Transaction.objects.all()):
+				tx.category_ref = Category.objects.create(name=f"Stage {i}")
+				tx.proof.save(f"bill{i}.pdf", ContentFile(b"%PDF-1.4"), save=False)
+				tx.save()
+			self.client.force_login(self.treasurer)
+			for name in ("export_xlsx", "export_pdf", "export_zip", "export_proofs_csv", "export_proofs_pdf"):
+				with CaptureQueriesContext(connection) as ctx:
+					resp = self.client.get(reverse(f"tedx_finance:{name}"))
+					b"".join(resp.streaming_content) if resp.streaming else resp.content
+				self.assertEqual(resp.status_code, 200, name)
+				lookups = [q["sql"] for q in ctx.captured_queries if 'FROM "tedx_finance_category" WHERE "tedx_finance_category"."id" =' in q["sql"]]
+				self.assertEqual(lookups, [], name)
+
+	def test_rename_is_single_row_update_and_aggregates_follow(self):
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		from .models import Budget
+
+		self.client.force_login(self.treasurer)
+		url = reverse("tedx_finance:quick_rename_category")
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.post(url, data='{"id": %d, "new_name": "Auditorium"}' % self.venue.pk, content_type="application/json")
+		self.assertEqual(resp.status_code, 200)
+		updates = [
+			q["sql"] for q in ctx.captured_queries
+			if q["sql"].startswith("UPDATE") and "tedx_finance_ledgerversion" not in q["sql"]
+		]
+		self.assertEqual(len(updates), 1)
+		self.assertIn("tedx_finance_category", updates[0])
+
+		self.assertEqual(Budget.objects.get().spent(), 300)
+		resp = self.client.get(reverse("tedx_finance:transactions_table"), {"category": "Auditorium"})
+		self.assertEqual(len(resp.context["transactions"]), 3)
+		self.assertEqual(resp.context["transactions"][0].category_name, "Auditorium")
+
+
+class QueryPlanTests(TestCase):
+	"""EXPLAIN every hot query; runs against whichever backend (SQLite or PostgreSQL) is configured."""
+
+	def test_hot_queries_use_indexes(self):
+		from .query_plans import HOT_QUERY_NAMES, explain, full_table_scans, get_hot_query
+
+		for name in HOT_QUERY_NAMES:
+			with self.subTest(query=name):
+				queryset = get_hot_query(name)
+				self.assertEqual(full_table_scans(queryset), [], explain(queryset))
+
+	def test_unindexed_query_is_detected(self):
+		from .models import Transaction
+		from .query_plans import full_table_scans
+
+		self.assertEqual(full_table_scans(Transaction.objects.filter(title="Venue deposit")), [Transaction._meta.db_table])
+
+
+@override_settings(KPI_SNAPSHOT_BACKGROUND_REFRESH=False)
+class DashboardPanelTests(TestCase):
+	def setUp(self):
+		from datetime import date
+		from django.core.cache import cache
+		from .models import ManagementFund, Sponsor, Transaction
+
+		cache.clear()
+		self.treasurer = User.objects.create_user(username="treasurer", password="pass1234", is_staff=True)
+		self.member = User.objects.create_user(username="member", password="pass1234")
+		ManagementFund.objects.create(amount=5000, date_received=date.today())
+		Sponsor.objects.create(name="Acme", amount=3000, date_received=date.today())
+		Transaction.objects.create(title="Stage", amount=-1200, category="Venue", date=date.today(), approved=True, created_by=self.member)
+		Transaction.objects.create(title="Lights", amount=-300, category="Venue", date=date.today(), approved=False, created_by=self.member)
+
+	def test_shell_renders_without_aggregates(self):
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+
+		self.client.force_login(self.treasurer)
+		self.client.get(reverse("tedx_finance:dashboard"))
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.get(reverse("tedx_finance:dashboard"))
+		self.assertEqual(resp.status_code, 200)
+		self.assertContains(resp, 'data-panel-slot="metrics"')
+		self.assertFalse(any("tedx_finance_transaction" in q["sql"] for q in ctx.captured_queries))
+
+	def test_panels_return_json_with_cache_policy(self):
+		from .dashboard_panels import PANELS
+
+		self.client.force_login(self.treasurer)
+		for name, panel in PANELS.items():
+			resp = self.client.get(reverse("tedx_finance:dashboard_panel", args=[name]))
+			self.assertEqual(resp.status_code, 200, name)
+			self.assertIn("private", resp["Cache-Control"])
+			self.assertIn(f"max-age={panel['max_age']}", resp["Cache-Control"])
+			self.assertEqual(set(resp.json()["html"]), set(panel["slots"]))
+
+		kpis = self.client.get(reverse("tedx_finance:dashboard_panel", args=["kpis"])).json()
+		self.assertEqual(kpis["data"]["income_data"], [5000.0, 3000.0])
+		self.assertIn("6800", kpis["html"]["quick_stats"])
+		self.assertEqual(self.client.get(reverse("tedx_finance:dashboard_panel", args=["nope"])).status_code, 404)
+
+	def test_pending_queue_only_for_treasurers(self):
+		url = reverse("tedx_finance:dashboard_panel", args=["pending"])
+		self.client.force_login(self.treasurer)
+		self.assertIn("Lights", self.client.get(url).json()["html"]["pending_queue"])
+
+		self.client.force_login(self.member)
+		self.assertNotIn("Lights", self.client.get(url).json()["html"]["pending_queue"])
+
+	def test_panel_cache_follows_ledger_writes(self):
+		from datetime import date
+		from .models import Transaction
+
+		url = reverse("tedx_finance:dashboard_panel", args=["spending_trend"])
+		self.client.force_login(self.member)
+		self.assertEqual(self.client.get(url).json()["data"]["category_spending"][0]["total"], -1200.0)
+		Transaction.objects.create(title="Mics", amount=-100, category="Venue", date=date.today(), approved=True, created_by=self.member)
+		self.assertEqual(self.client.get(url).json()["data"]["category_spending"][0]["total"], -1300.0)
+
+
+@override_settings(KPI_SNAPSHOT_BACKGROUND_REFRESH=False)
+class LedgerVersionETagTests(TestCase):
+	def setUp(self):
+		from datetime import date
+		from .models import Transaction
+
+		self.treasurer = User.objects.create_user(username="treasurer", password="pass1234", is_staff=True)
+		self.member = User.objects.create_user(username="member", password="pass1234")
+		self.pending = Transaction.objects.create(title="Stage", amount=-100, category="Venue", date=date.today(), created_by=self.member)
+
+	def test_version_bumps_on_ledger_writes(self):
+		from datetime import date
+		from .approvals import approve_transactions
+		from .ledger import ledger_version
+		from .models import Budget, Category, Sponsor
+
+		versions = [ledger_version()]
+		sponsor = Sponsor.objects.create(name="Acme", amount=500, date_received=date.today())
+		versions.append(ledger_version())
+		category = Category.objects.get(name="Venue")
+		Budget.objects.create(category=category, amount=1000, start_date=date.today(), end_date=date.today())
+		versions.append(ledger_version())
+		approve_transactions([self.pending.pk], self.treasurer)
+		versions.append(ledger_version())
+		sponsor.delete()
+		versions.append(ledger_version())
+		self.assertEqual(versions, sorted(set(versions)))
+
+	def test_unchanged_reload_is_not_modified(self):
+		from datetime import date
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		from .models import Transaction
+
+		url = reverse("tedx_finance:dashboard_panel", args=["kpis"])
+		self.client.force_login(self.treasurer)
+		first = self.client.get(url)
+		self.assertEqual(first.status_code, 200)
+		etag = first["ETag"]
+
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, 304)
+		self.assertFalse(any("tedx_finance_transaction" in q["sql"] for q in ctx.captured_queries))
+
+		# Other params or another user's view get their own tags
+		self.assertNotEqual(self.client.get(url, {"start_date": "2024-01-01"})["ETag"], etag)
+		self.client.force_login(self.member)
+		self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+		self.client.force_login(self.treasurer)
+		etag = self.client.get(url)["ETag"]
+		Transaction.objects.create(title="Lights", amount=-50, category="Venue", date=date.today(), approved=True, created_by=self.member)
+		self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+	def test_theme_change_changes_the_tag(self):
+		from .models import UserPreference
+
+		url = reverse("tedx_finance:dashboard")
+		self.client.force_login(self.member)
+		etag = self.client.get(url)["ETag"]
+		prefs = UserPreference.objects.get(user=self.member)
+		prefs.theme = "light"
+		prefs.save()
+		resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, 200)
+		self.assertContains(resp, 'data-user-theme="light"')
+
+	def test_pages_revalidate(self):
+		self.client.force_login(self.member)
+		for name in ("dashboard", "budgets", "finance_report", "proof_gallery"):
+			resp = self.client.get(reverse(f"tedx_finance:{name}"))
+			self.assertEqual(resp.status_code, 200, name)
+			self.assertIn("no-cache", resp["Cache-Control"])
+			self.assertEqual(self.client.get(reverse(f"tedx_finance:{name}"), HTTP_IF_NONE_MATCH=resp["ETag"]).status_code, 304, name)
+
+
+@override_settings(KPI_SNAPSHOT_BACKGROUND_REFRESH=False)
+class KPISnapshotTests(TestCase):
+	def setUp(self):
+		from datetime import date
+		from django.core.cache import cache
+		from .models import ManagementFund, Transaction
+
+		cache.clear()
+		self.user = User.objects.create_user(username="member", password="pass1234")
+		ManagementFund.objects.create(amount=3000, date_received=date.today())
+		Transaction.objects.create(title="Stage", amount=-300, category="Venue", date=date.today(), approved=True, created_by=self.user)
+
+	def test_snapshot_served_then_refreshed_after_ledger_write(self):
+		from datetime import date
+		from .kpi_snapshots import get_kpi_snapshot, refresh_snapshot
+		from .models import Transaction
+
+		refresh_snapshot()
+		context, data = get_kpi_snapshot()
+		self.assertEqual(context["total_spent"], 300)
+		self.assertFalse(data["snapshot"]["stale"])
+
+		Transaction.objects.create(title="Lights", amount=-200, category="Venue", date=date.today(), approved=True, created_by=self.user)
+		with self.settings(KPI_SNAPSHOT_BACKGROUND_REFRESH=True), mock.patch("tedx_finance.kpi_snapshots.threading.Thread") as thread:
+			context, data = get_kpi_snapshot()
+		# The old values are served at once while the refresh runs elsewhere
+		self.assertEqual(context["total_spent"], 300)
+		self.assertTrue(data["snapshot"]["stale"])
+		thread.return_value.start.assert_called_once()
+
+		with self.settings(KPI_SNAPSHOT_BACKGROUND_REFRESH=True), mock.patch("tedx_finance.kpi_snapshots.threading.Thread") as thread:
+			get_kpi_snapshot()
+		thread.assert_not_called()  # a refresh for this range is already running
+
+	def test_refresh_claim_is_shared_across_worker_caches(self):
+		from datetime import timedelta
+		from django.core.cache import cache
+		from django.utils import timezone
+		from .kpi_snapshots import REFRESH_LOCK_SECONDS, claim_refresh, refresh_snapshot
+		from .models import KPISnapshot
+
+		refresh_snapshot()
+		self.assertTrue(claim_refresh("all"))
+		cache.clear()  # another worker process: nothing in its own cache
+		self.assertFalse(claim_refresh("all"))
+
+		# A claim left behind by a worker that died mid-refresh expires
+		KPISnapshot.objects.filter(range_key="all").update(
+			refresh_started_at=timezone.now() - timedelta(seconds=REFRESH_LOCK_SECONDS + 1)
+		)
+		self.assertTrue(claim_refresh("all"))
+		refresh_snapshot()
+		self.assertIsNone(KPISnapshot.objects.get(range_key="all").refresh_started_at)
+
+	def test_refresh_command_and_panel(self):
+		from io import StringIO
+		from django.core.management import call_command
+		from .models import KPISnapshot
+
+		call_command("refresh_kpis", stdout=StringIO())
+		self.assertEqual(KPISnapshot.objects.count(), 3)
+
+		self.client.force_login(self.user)
+		resp = self.client.get(reverse("tedx_finance:dashboard_panel", args=["kpis"]))
+		self.assertEqual(resp.json()["data"]["income_data"], [3000.0, 0.0])
+		self.assertIn("max-age=60", resp["Cache-Control"])
+
+	def test_only_canonical_ranges_are_stored(self):
+		from datetime import date, timedelta
+		from django.utils import timezone
+		from .kpi_snapshots import get_kpi_snapshot, is_canonical, refresh_snapshot
+		from .models import KPISnapshot
+
+		today = date(2026, 3, 18)
+		self.assertTrue(is_canonical(date(2026, 3, 1), today, today))
+		self.assertTrue(is_canonical(date(2025, 2, 1), date(2025, 2, 28), today))
+		self.assertTrue(is_canonical(date(2025, 1, 1), date(2025, 12, 31), today))
+		self.assertFalse(is_canonical(date(2025, 2, 3), date(2025, 2, 28), today))
+		self.assertFalse(is_canonical(date(2020, 1, 1), date(2020, 12, 31), today))
+
+		context, data = get_kpi_snapshot(date.today() - timedelta(days=3), date.today())
+		self.assertEqual(context["total_spent"], 300)
+		self.assertFalse(data["snapshot"]["stale"])
+		self.assertFalse(KPISnapshot.objects.exists())
+
+		# Rows of ranges that are no longer canonical go once a new snapshot row appears
+		KPISnapshot.objects.create(range_key="old", start_date=date(2020, 1, 5), end_date=date(2020, 2, 3), computed_for=date(2020, 2, 3), computed_at=timezone.now())
+		refresh_snapshot()
+		self.assertEqual(list(KPISnapshot.objects.values_list("range_key", flat=True)), ["all"])
+
+
+class SpendingPivotTests(TestCase):
+	def setUp(self):
+		from datetime import date
+		from .models import Transaction
+
+		def spend(title, amount, category, day):
+			Transaction.objects.create(title=title, amount=amount, category=category, date=day, approved=True)
+
+		spend("Stage", -500, "Venue", date(2025, 1, 10))
+		spend("Hall", -300, "Venue", date(2025, 3, 5))
+		spend("Snacks", -200, "Food", date(2025, 3, 20))
+		spend("Flyers", -50, "Print", date(2025, 1, 2))
+		spend("Refund", 100, "Venue", date(2025, 3, 6))  # income is not spending
+		Transaction.objects.create(title="Pending", amount=-999, category="Venue", date=date(2025, 2, 1))
+
+	def test_dense_month_pivot_with_top_n(self):
+		from datetime import date
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		from .timeseries import pivot_series, spending_pivot
+
+		with CaptureQueriesContext(connection) as ctx:
+			pivot = spending_pivot(date(2025, 1, 1), date(2025, 4, 30), "month", top_n=2, other=True)
+		self.assertEqual(len(ctx.captured_queries), 1)
+		self.assertEqual(pivot["labels"], ["Jan 2025", "Feb 2025", "Mar 2025", "Apr 2025"])
+		self.assertEqual([c["name"] for c in pivot["categories"]], ["Venue", "Food", "Other"])
+		self.assertEqual(pivot_series(pivot)[0]["data"], [500.0, 0.0, 300.0, 0.0])
+		self.assertEqual(pivot_series(pivot)[2]["data"], [50.0, 0.0, 0.0, 0.0])
+		self.assertEqual(pivot["totals"].tolist(), [550.0, 0.0, 500.0, 0.0])
+
+	def test_week_and_day_periods_are_gap_filled(self):
+		from datetime import date
+		from .timeseries import spending_pivot
+
+		weekly = spending_pivot(date(2025, 3, 1), date(2025, 3, 21), "week")
+		self.assertEqual(weekly["periods"][0], date(2025, 2, 24))  # Monday of the first week
+		self.assertEqual(len(weekly["periods"]), 4)
+		self.assertEqual(weekly["totals"].tolist(), [0.0, 300.0, 0.0, 200.0])
+
+		daily = spending_pivot(date(2025, 3, 4), date(2025, 3, 6), "day")
+		self.assertEqual(daily["totals"].tolist(), [0.0, 300.0, 0.0])
+		with self.assertRaises(ValueError):
+			spending_pivot(granularity="year")
+
+	def test_wide_ranges_are_capped_and_do_not_overflow(self):
+		from datetime import date
+		from .timeseries import MAX_PERIODS, fit_granularity, period_count, period_range, spending_pivot
+
+		self.assertEqual(period_range(date(9999, 12, 30), date.max, "day"), [date(9999, 12, 30), date.max])
+		self.assertEqual(period_range(date(9999, 11, 5), date.max, "month"), [date(9999, 11, 1), date(9999, 12, 1)])
+		self.assertEqual(period_count(date(2025, 1, 1), date(2025, 4, 30), "month"), 4)
+		self.assertEqual(period_count(date(2025, 3, 1), date(2025, 3, 21), "week"), 4)
+
+		widest = spending_pivot(date.min, date.max, "day")
+		self.assertEqual(len(widest["periods"]), MAX_PERIODS)
+		self.assertEqual(widest["periods"][-1], date.max)
+		monthly = spending_pivot(date(1, 1, 1), date(2025, 4, 30), "month")
+		self.assertEqual(len(monthly["periods"]), MAX_PERIODS)
+		self.assertEqual(monthly["totals"][-4:].tolist(), [550.0, 0.0, 500.0, 0.0])
+
+		self.assertEqual(fit_granularity(date(2025, 1, 1), date(2025, 12, 31), "day"), "day")
+		self.assertEqual(fit_granularity(date(2000, 1, 1), date(2025, 12, 31), "day"), "week")
+		self.assertEqual(fit_granularity(date(1900, 1, 1), date(2025, 12, 31), "day"), "month")
+		self.assertEqual(fit_granularity(date.min, date.max, "day"), "month")
+
+	def test_dashboard_panel_coarsens_wide_day_ranges(self):
+		from django.contrib.auth.models import User
+
+		self.client.force_login(User.objects.create_user(username="member", password="pass1234"))
+		response = self.client.get(
+			reverse("tedx_finance:dashboard_panel", args=["spending_trend"]),
+			{"start_date": "0001-01-01", "end_date": "9999-12-31", "granularity": "day", "max_points": 2000},
+		)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(len(response.json()["data"]["spending_months"]), 2000)
+
+
+class ChartDownsamplingTests(TestCase):
+	def test_lttb_keeps_endpoints_and_peaks(self):
+		import numpy as np
+		from .charts import lttb_indices
+
+		values = np.zeros(1000)
+		values[437] = 900  # a one-day spike must survive
+		values[800] = -50
+		indices = lttb_indices(values, 50)
+		self.assertEqual(len(indices), 50)
+		self.assertEqual((indices[0], indices[-1]), (0, 999))
+		self.assertIn(437, indices)
+		self.assertIn(800, indices)
+		self.assertTrue(np.all(np.diff(indices) > 0))
+		self.assertEqual(len(lttb_indices(values[:10], 50)), 10)
+
+	def test_panel_series_downsampled_to_max_points(self):
+		from datetime import date, timedelta
+		from .models import Transaction
+
+		user = User.objects.create_user(username="member", password="pass1234")
+		start = date(2022, 1, 1)
+		Transaction.objects.bulk_create([
+			Transaction(title=f"Day {i}", amount=-(10 + i % 7), category="Venue", date=start + timedelta(days=i), approved=True)
+			for i in range(0, 1000, 3)
+		])
+		self.client.force_login(user)
+		url = reverse("tedx_finance:dashboard_panel", args=["spending_trend"])
+		params = {"start_date": "2022-01-01", "end_date": "2024-12-31", "granularity": "day"}
+
+		data = self.client.get(url, {**params, "max_points": 150}).json()["data"]
+		self.assertEqual(len(data["spending_months"]), 150)
+		self.assertEqual(len(data["spending_amounts"]), 150)
+		self.assertEqual(data["spending_months"][0], "01 Jan")
+
+		# 1096 days are more than 10 per point: built weekly, then downsampled
+		data = self.client.get(url, {**params, "max_points": 50}).json()["data"]
+		self.assertEqual(len(data["spending_months"]), 50)
+		self.assertEqual(data["spending_months"][0], "Dec 27")
+
+		self.assertEqual(len(self.client.get(url, {**params, "max_points": 5000}).json()["data"]["spending_months"]), 1096)
+		self.assertEqual(self.client.get(url, {**params, "max_points": "lots"}).status_code, 400)
+		self.assertEqual(self.client.get(url, {**params, "granularity": "hour"}).status_code, 400)
+
+
+class SponsorTierTests(TestCase):
+	def setUp(self):
+		from datetime import date
+		from django.core.cache import cache
+		from .models import Sponsor
+
+		cache.clear()
+		self.addCleanup(cache.clear)
+
+		Sponsor.objects.bulk_create([
+			Sponsor(name="Acme", amount=250000, date_received=date(2024, 1, 5)),
+			Sponsor(name="Globex", amount=200000, date_received=date(2024, 1, 6)),
+			Sponsor(name="Initech", amount=60000, date_received=date(2024, 1, 7)),
+			Sponsor(name="Hooli", amount=1000, date_received=date(2024, 1, 8)),
+		])
+
+	def test_tiers_annotated_in_sql_from_tier_table(self):
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		from .models import Sponsor, SponsorTier
+		from .sponsor_tiers import get_tiers, with_tiers
+
+		get_tiers()  # warm the tier cache
+		with CaptureQueriesContext(connection) as ctx:
+			tiers = dict(with_tiers(Sponsor.objects.all()).values_list("name", "tier"))
+		# The ledger version check for the cache key, then the sponsors with their tiers
+		self.assertEqual(len(ctx.captured_queries), 2)
+		self.assertEqual(tiers, {"Acme": "Gold", "Globex": "Gold", "Initech": "Silver", "Hooli": "Bronze"})
+
+		SponsorTier.objects.create(name="Platinum", min_amount=250000, badge_class="bg-white")
+		tiers = dict(with_tiers(Sponsor.objects.all()).values_list("name", "tier_badge"))
+		self.assertEqual(tiers["Acme"], "bg-white")
+		self.assertEqual(tiers["Globex"], "bg-yellow-500 text-black")
+
+	def test_tier_edit_reaches_workers_whose_cache_was_not_cleared(self):
+		from .ledger import bump_ledger_version
+		from .models import Sponsor, SponsorTier
+		from .sponsor_tiers import get_tiers, with_tiers
+
+		get_tiers()
+		# Another worker's write: the row changes and the shared version moves, this cache is untouched
+		SponsorTier.objects.filter(name="Gold").update(badge_class="bg-orange-500")
+		bump_ledger_version()
+		badges = dict(with_tiers(Sponsor.objects.all()).values_list("name", "tier_badge"))
+		self.assertEqual(badges["Acme"], "bg-orange-500")
+
+	def test_tier_summary_in_one_query(self):
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		from .sponsor_tiers import get_tiers, tier_summary
+
+		tiers = get_tiers()
+		with CaptureQueriesContext(connection) as ctx:
+			summary = tier_summary(tiers=tiers)
+		self.assertEqual(len(ctx.captured_queries), 1)
+		self.assertEqual(
+			[(row["name"], row["count"], int(row["total"])) for row in summary],
+			[("Gold", 2, 450000), ("Silver", 1, 60000), ("Bronze", 1, 1000)],
+		)
+
+	def test_report_and_sponsor_panel_show_tiers(self):
+		user = User.objects.create_user(username="member", password="pass1234")
+		self.client.force_login(user)
+		response = self.client.get(reverse("tedx_finance:finance_report"))
+		self.assertContains(response, "Sponsors by Tier")
+		self.assertEqual([s["tier"] for s in response.context["sponsors_with_tiers"]], ["Gold", "Gold", "Silver", "Bronze"])
+
+		with override_settings(KPI_SNAPSHOT_BACKGROUND_REFRESH=False):
+			payload = self.client.get(reverse("tedx_finance:dashboard_panel", args=["sponsors"])).json()
+		self.assertIn("bg-amber-700 text-white", payload["html"]["sidebar_funds"])
+
+
+class RequestTimingMiddlewareTests(TestCase):
+	def setUp(self):
+		from datetime import date
+		from .models import Transaction
+
+		self.user = User.objects.create_user(username="member", password="pass1234")
+		Transaction.objects.create(title="Mics", amount=-500, category="Logistics", date=date(2024, 2, 1), approved=True, created_by=self.user)
+		self.client.force_login(self.user)
+
+	def test_disabled_by_setting(self):
+		from django.template.base import Template
+		from .instrumentation import _original_template_render
+
+		with override_settings(REQUEST_TIMING_ENABLED=False):
+			response = self.client.get(reverse("tedx_finance:finance_report"))
+			self.assertIs(Template.render, _original_template_render)
+		self.assertFalse(response.has_header("Server-Timing"))
+
+	def test_template_timer_only_patched_while_enabled(self):
+		from django.template.base import Template
+		from .instrumentation import _original_template_render, _timed_template_render
+
+		with override_settings(REQUEST_TIMING_ENABLED=True):
+			self.assertIs(Template.render, _timed_template_render)
+		with override_settings(REQUEST_TIMING_ENABLED=False):
+			self.assertIs(Template.render, _original_template_render)
+
+	@override_settings(REQUEST_TIMING_ENABLED=True)
+	def test_server_timing_header_and_log_line(self):
+		import re
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+
+		with self.assertLogs("tedx_finance.timing", level="INFO") as logs, CaptureQueriesContext(connection) as ctx:
+			response = self.client.get(reverse("tedx_finance:finance_report"))
+		header = response["Server-Timing"]
+		self.assertRegex(header, r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+		self.assertEqual(int(re.search(r'"(\d+) queries"', header).group(1)), len(ctx.captured_queries))
+		self.assertGreater(float(re.search(r"tpl;dur=([\d.]+)", header).group(1)), 0)
+
+		self.assertEqual(len(logs.records), 1)
+		fields = logs.records[0].timing
+		self.assertEqual(fields["view"], "tedx_finance:finance_report")
+		self.assertEqual(fields["status"], 200)
+		self.assertEqual(fields["db_queries"], len(ctx.captured_queries))
+		self.assertIn("view=tedx_finance:finance_report", logs.output[0])
+
+	@override_settings(REQUEST_TIMING_ENABLED=True)
+	def test_export_generation_span(self):
+		with self.assertLogs("tedx_finance.timing", level="INFO"):
+			response = self.client.get(reverse("tedx_finance:export_xlsx"))
+		self.assertEqual(response.status_code, 200)
+		self.assertRegex(response["Server-Timing"], r"xlsx;dur=[\d.]+")
+
+
+class GenerateScaleDataTests(TestCase):
+	def test_command_is_deterministic_and_bulk_loads_every_model(self):
+		from io import StringIO
+		from django.core.management import call_command
+		from .models import Budget, LoginAttempt, ManagementFund, Notification, Sponsor, Transaction
+
+		def run():
+			call_command(
+				"generate_scale_data", "--seed", "3", "--users", "5", "--categories", "14", "--sponsors", "4",
+				"--management-funds", "3", "--transactions", "1200", "--notifications", "30", "--login-attempts", "20",
+				"--batch-size", "500", "--end-date", "2025-06-30", stdout=StringIO(),
+			)
+			return list(Transaction.objects.order_by("pk").values_list("title", "amount", "date", "category_ref__name", "approved", "created_by__username"))
+
+		first = run()
+		self.assertEqual(len(first), 1200)
+		self.assertEqual(User.objects.filter(username__startswith="scale_user_").count(), 5)
+		self.assertEqual(Budget.objects.count(), 14)
+		self.assertEqual((Sponsor.objects.count(), ManagementFund.objects.count()), (4, 3))
+		self.assertEqual((Notification.objects.count(), LoginAttempt.objects.count()), (30, 20))
+		self.assertFalse(Transaction.objects.filter(category_ref__isnull=True).exists())
+		self.assertTrue(all(date.isoformat() <= "2025-06-30" for _, _, date, _, _, _ in first))
+		approved = sum(1 for row in first if row[4]) / len(first)
+		self.assertAlmostEqual(approved, 0.85, delta=0.05)
+
+		Transaction.objects.all().delete()
+		self.assertEqual(run(), first)
+
+	def test_notification_weights_follow_the_model_types(self):
+		from .models import Notification
+		from .scale_data import generate_scale_data
+
+		types = Notification.NOTIFICATION_TYPES + [("digest_ready", "Digest Ready")]
+		with mock.patch.object(Notification, "NOTIFICATION_TYPES", types):
+			generate_scale_data(
+				seed=5, prefix="nw", users=2, sponsors=0, management_funds=0, transactions=0, proofs=0,
+				notifications=400, login_attempts=0,
+			)
+		counts = {kind: Notification.objects.filter(notification_type=kind).count() for kind, _ in types}
+		self.assertEqual(sum(counts.values()), 400)
+		self.assertGreater(counts["digest_ready"], 0)
+		self.assertEqual(max(counts, key=counts.get), "transaction_approved")
+
+
+@override_settings(KPI_SNAPSHOT_BACKGROUND_REFRESH=False)
+class BenchmarkSuiteTests(TestCase):
+	def setUp(self):
+		from .scale_data import generate_scale_data
+
+		generate_scale_data(seed=1, users=3, sponsors=3, management_funds=2, transactions=120, notifications=5, login_attempts=5)
+		self.treasurer = User.objects.create_superuser(username="bench", email="bench@example.com", password=None)
+		self.client.force_login(self.treasurer)
+
+	def test_measure_records_time_queries_and_memory(self):
+		from .benchmarks import measure
+
+		result = measure("search", self.client, repeat=2)
+		self.assertEqual(result["status"], [200])
+		self.assertGreater(result["queries"], 0)
+		self.assertGreater(result["peak_kib"], 0)
+		self.assertLessEqual(result["wall_ms_min"], result["wall_ms"])
+
+	def test_write_scenarios_are_rolled_back(self):
+		from .benchmarks import IMPORT_ROWS, measure
+		from .models import Transaction
+
+		before = Transaction.objects.count()
+		result = measure("import_transactions", self.client, repeat=1)
+		self.assertEqual(result["status"], [200])
+		self.assertGreaterEqual(result["queries"], IMPORT_ROWS)
+		self.assertEqual(Transaction.objects.count(), before)
+
+	def test_compare_flags_regressions(self):
+		from .benchmarks import compare_results
+
+		baseline = {"sizes": {"1000": {"dashboard": {"wall_ms": 100.0, "queries": 20, "peak_kib": 1000.0}}}}
+		current = {"sizes": {"1000": {"dashboard": {"wall_ms": 103.0, "queries": 21, "peak_kib": 1500.0}}, "5000": {}}}
+		rows = {row["metric"]: row for row in compare_results(baseline, current, threshold=0.2)}
+		self.assertFalse(rows["wall_ms"]["regression"])
+		self.assertTrue(rows["queries"]["regression"])
+		self.assertTrue(rows["peak_kib"]["regression"])
+		self.assertAlmostEqual(rows["peak_kib"]["change"], 0.5)
+
+
+# Maximum queries per page view on a cold cache, as (treasurer, regular user).
+# Dashboard panels are listed as "dashboard_panel:<panel>". Every URL in
+# urls.py must have an entry, and no view may issue more queries on a larger
+# dataset than on a smaller one, whatever its budget.
+QUERY_BUDGETS = {
+	"signup": (3, 4),
+	"verify_email": (1, 1),
+	"dashboard": (3, 4),
+	"dashboard_panel:kpis": (28, 29),
+	"dashboard_panel:spending_trend": (8, 9),
+	"dashboard_panel:category_trend": (6, 7),
+	"dashboard_panel:budget": (7, 8),
+	"dashboard_panel:sponsors": (9, 10),
+	"dashboard_panel:pending": (8, 8),
+	"settings": (4, 5),
+	"budgets": (5, 6),
+	"budget_suggestions": (14, 15),
+	"runway_simulation": (7, 8),
+	"transactions_table": (7, 8),
+	"add_transaction": (4, 5),
+	"edit_transaction": (6, 4),
+	"approve_transaction": (3, 4),
+	"reject_transaction": (3, 4),
+	"bulk_approve_transactions": (2, 4),
+	"bulk_reject_transactions": (2, 4),
+	"import_transactions": (4, 4),
+	"manage_categories": (4, 3),
+	"quick_add_category": (2, 3),
+	"quick_rename_category": (2, 3),
+	"proof_gallery": (7, 7),
+	"bulk_upload_proofs": (4, 4),
+	"proof_gallery_feed": (5, 6),
+	"serve_proof": (3, 4),
+	"serve_proof_thumbnail": (3, 4),
+	"add_management_fund": (3, 4),
+	"edit_management_fund": (4, 4),
+	"delete_management_fund": (3, 4),
+	"add_sponsor": (3, 4),
+	"edit_sponsor": (4, 4),
+	"delete_sponsor": (3, 4),
+	"export_xlsx": (5, 6),
+	"export_pdf": (12, 13),
+	"export_zip": (5, 5),
+	"export_proofs_csv": (3, 3),
+	"export_proofs_pdf": (4, 4),
+	"finance_report": (12, 13),
+	"ledger_as_of_report": (9, 3),
+	"performance_dashboard": (16, 2),
+	"notifications_list": (6, 7),
+	"get_unread_count": (3, 3),
+	"mark_notification_read": (3, 3),
+	"mark_all_read": (2, 2),
+}
+
+
+class QueryBudgetMixin:
+	"""Count the queries of every tedx_finance page, cold, for the logged-in client."""
+
+	def url_cases(self):
+		from .dashboard_panels import PANELS
+		from .models import ManagementFund, Sponsor, Transaction
+		from . import urls
+
+		with_proof = Transaction.objects.exclude(proof="").exclude(proof__isnull=True).order_by("pk").first()
+		fund = ManagementFund.objects.order_by("pk").first()
+		sponsor = Sponsor.objects.order_by("pk").first()
+		kwargs = {
+			"verify_email": {"token": "unknown"},
+			"edit_transaction": {"pk": with_proof.pk},
+			"approve_transaction": {"pk": with_proof.pk},
+			"reject_transaction": {"pk": with_proof.pk},
+			"serve_proof": {"pk": with_proof.pk},
+			"serve_proof_thumbnail": {"pk": with_proof.pk},
+			"edit_management_fund": {"pk": fund.pk},
+			"delete_management_fund": {"pk": fund.pk},
+			"edit_sponsor": {"pk": sponsor.pk},
+			"delete_sponsor": {"pk": sponsor.pk},
+			"mark_notification_read": {"pk": 0},
+		}
+		for pattern in urls.urlpatterns:
+			if pattern.name == "dashboard_panel":
+				for panel in PANELS:
+					yield f"dashboard_panel:{panel}", reverse("tedx_finance:dashboard_panel", args=[panel])
+			else:
+				yield pattern.name, reverse(f"tedx_finance:{pattern.name}", kwargs=kwargs.get(pattern.name, {}))
+
+	def count_queries(self, url):
+		from django.core.cache import cache
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		from .models import KPISnapshot
+
+		cache.clear()
+		KPISnapshot.objects.all().delete()
+		with CaptureQueriesContext(connection) as ctx:
+			response = self.client.get(url)
+			if getattr(response, "streaming", False):
+				b"".join(response.streaming_content)
+		self.assertLess(response.status_code, 500, url)
+		return len(ctx.captured_queries)
+
+	def count_all(self, user):
+		self.client.force_login(user)
+		self.client.get(reverse("tedx_finance:dashboard"))  # warm-up: session, content types
+		return {name: self.count_queries(url) for name, url in self.url_cases()}
+
+
+@override_settings(KPI_SNAPSHOT_BACKGROUND_REFRESH=False, REQUEST_TIMING_ENABLED=False, PERFORMANCE_SAMPLING_ENABLED=False)
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+	def setUp(self):
+		import logging
+		import shutil
+		import tempfile
+		from django.contrib.auth.models import Group
+
+		media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+		media = self.settings(MEDIA_ROOT=media_root)
+		media.enable()
+		self.addCleanup(media.disable)
+		# Expected 403/404/405s and xhtml2pdf's rupee-glyph warnings would flood the output
+		for name in ("django.request", "xhtml2pdf"):
+			logger = logging.getLogger(name)
+			self.addCleanup(logger.setLevel, logger.level)
+			logger.setLevel(logging.ERROR)
+
+		self.treasurer = User.objects.create_superuser(username="treasurer", email="treasurer@example.com", password=None)
+		self.treasurer.groups.add(Group.objects.get_or_create(name="Treasurer")[0])
+		self.member = User.objects.create_user(username="member", password="pass1234")
+
+	def add_data(self, seed, transactions, notifications_per_user):
+		from .models import Notification
+		from .scale_data import generate_scale_data
+
+		generate_scale_data(
+			seed=seed, prefix=f"qb{seed}", users=3, sponsors=transactions // 10, management_funds=transactions // 20,
+			transactions=transactions, proofs=transactions // 10, notifications=transactions // 2, login_attempts=10,
+		)
+		Notification.objects.bulk_create([
+			Notification(user=user, notification_type="fund_created", title="Fund", message="Fund received")
+			for user in (self.treasurer, self.member) for _ in range(notifications_per_user)
+		])
+
+	def test_every_url_declares_a_budget(self):
+		self.add_data(1, 20, 1)
+		self.assertEqual(sorted(name for name, _ in self.url_cases()), sorted(QUERY_BUDGETS))
+
+	def test_query_counts_within_budget_and_flat_in_data_size(self):
+		self.add_data(1, 20, 2)
+		small = {role: self.count_all(user) for role, user in (("treasurer", self.treasurer), ("member", self.member))}
+		self.add_data(2, 200, 30)
+		large = {role: self.count_all(user) for role, user in (("treasurer", self.treasurer), ("member", self.member))}
+
+		failures = []
+		for index, role in enumerate(("treasurer", "member")):
+			for name, budget in QUERY_BUDGETS.items():
+				before, after = small[role][name], large[role][name]
+				if after > budget[index]:
+					failures.append(f"{name} as {role}: {after} queries, budget {budget[index]}")
+				if after > before:
+					failures.append(f"{name} as {role}: {before} queries at 20 transactions, {after} at 220")
+		self.assertEqual(failures, [])
+
+
+class SlowQueryLogTests(TestCase):
+	def setUp(self):
+		from datetime import date
+		from .models import Transaction
+
+		self.user = User.objects.create_user(username="member", password="pass1234")
+		for day in (1, 2, 3):
+			Transaction.objects.create(title=f"Mics {day}", amount=-500, category="Logistics", date=date(2024, 2, day), approved=True, created_by=self.user)
+		self.client.force_login(self.user)
+
+	def test_normalize_sql_groups_queries_by_shape(self):
+		from .slow_queries import fingerprint, normalize_sql
+
+		first = normalize_sql("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x'  LIMIT 21")
+		second = normalize_sql("SELECT * FROM t WHERE id IN (%s) AND name = 'it''s'\n LIMIT 5")
+		self.assertEqual(first, "SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?")
+		self.assertEqual(fingerprint(first), fingerprint(second))
+		self.assertEqual(normalize_sql('SELECT "tedx_finance_transaction"."id" FROM x'), 'SELECT "tedx_finance_transaction"."id" FROM x')
+
+	@override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+	def test_disabled_with_zero_threshold(self):
+		from .models import SlowQuery
+
+		with self.assertNoLogs("tedx_finance.slow_queries"):
+			self.client.get(reverse("tedx_finance:transactions_table"))
+		self.assertFalse(SlowQuery.objects.exists())
+
+	def test_slow_queries_logged_and_stored_with_plan_view_and_source(self):
+		from .models import SlowQuery
+
+		# Every query counts as slow, for the request only
+		with override_settings(SLOW_QUERY_THRESHOLD_MS=1e-6, SLOW_QUERY_STORE=True), self.assertLogs("tedx_finance.slow_queries", level="WARNING") as logs:
+			response = self.client.get(reverse("tedx_finance:transactions_table"))
+		self.assertEqual(response.status_code, 200)
+		self.assertTrue(logs.records)
+		self.assertTrue(all(hasattr(record, "slow_query") for record in logs.records))
+
+		entries = SlowQuery.objects.filter(normalized_sql__contains='FROM "tedx_finance_transaction"', view="tedx_finance:transactions_table")
+		self.assertTrue(entries.exists())
+		entry = entries.first()
+		self.assertEqual(len(entry.fingerprint), 32)
+		self.assertTrue(entry.source.startswith("tedx_finance/"))
+		self.assertIn(" in ", entry.source)
+		# EXPLAIN QUERY PLAN output on SQLite
+		self.assertRegex(entry.plan, r"SCAN|SEARCH")
+		self.assertNotIn("2024", entry.normalized_sql)
+		# The log's own EXPLAIN and INSERT statements are not recorded
+		self.assertFalse(SlowQuery.objects.filter(normalized_sql__startswith="EXPLAIN").exists())
+		self.assertFalse(SlowQuery.objects.filter(normalized_sql__contains='INTO "tedx_finance_slowquery"').exists())
+
+	@override_settings(SLOW_QUERY_THRESHOLD_MS=1e-6, METRICS_ENABLED=False, PERFORMANCE_SAMPLING_ENABLED=False, REQUEST_TIMING_ENABLED=False)
+	def test_timed_by_the_request_timings_wrapper(self):
+		from django.db import connection
+		from .instrumentation import RequestTimings
+
+		with mock.patch("tedx_finance.instrumentation.RequestTimings", wraps=RequestTimings) as timings, \
+				self.assertLogs("tedx_finance.slow_queries", level="WARNING"):
+			response = self.client.get(reverse("tedx_finance:transactions_table"))
+		self.assertFalse(response.has_header("Server-Timing"))
+		self.assertEqual(timings.call_count, 1)
+		self.assertEqual(connection.execute_wrappers, [])
+
+	@override_settings(SLOW_QUERY_THRESHOLD_MS=1e-6)
+	def test_rotating_log_file(self):
+		import os
+		import tempfile
+		from logging.handlers import RotatingFileHandler
+		from . import slow_queries
+
+		def remove_file_handler():
+			for handler in list(slow_queries.slow_query_logger.handlers):
+				if isinstance(handler, RotatingFileHandler):
+					slow_queries.slow_query_logger.removeHandler(handler)
+					handler.close()
+			slow_queries._file_handler_path = None
+
+		self.addCleanup(remove_file_handler)
+		with tempfile.TemporaryDirectory() as tmp:
+			path = os.path.join(tmp, "logs", "slow.log")
+			with override_settings(SLOW_QUERY_LOG_FILE=path), self.assertLogs("tedx_finance.slow_queries", level="WARNING"):
+				self.client.get(reverse("tedx_finance:transactions_table"))
+			remove_file_handler()
+			with open(path) as handle:
+				self.assertIn("slow_query duration_ms=", handle.read())
+
+	def test_admin_top_offenders_grouped_by_fingerprint(self):
+		from .models import SlowQuery
+
+		for duration in (10, 30):
+			SlowQuery.objects.create(fingerprint="a" * 32, normalized_sql="SELECT ? FROM a", duration_ms=duration, view="tedx_finance:dashboard")
+		SlowQuery.objects.create(fingerprint="b" * 32, normalized_sql="SELECT ? FROM b", duration_ms=25, view="tedx_finance:budgets")
+		admin_user = User.objects.create_superuser(username="admin", email="admin@example.com", password="pass1234")
+		self.client.force_login(admin_user)
+
+		response = self.client.get(reverse("admin:tedx_finance_slowquery_top_offenders"))
+		self.assertEqual(response.status_code, 200)
+		offenders = list(response.context["offenders"])
+		self.assertEqual([row["fingerprint"] for row in offenders], ["a" * 32, "b" * 32])
+		self.assertEqual(offenders[0]["count"], 2)
+		self.assertEqual(offenders[0]["total_ms"], 40)
+		self.assertEqual(offenders[0]["max_ms"], 30)
+		self.assertContains(response, "SELECT ? FROM a")
+
+		self.client.force_login(self.user)
+		response = self.client.get(reverse("admin:tedx_finance_slowquery_top_offenders"))
+		self.assertEqual(response.status_code, 302)
+
+
+@override_settings(KPI_SNAPSHOT_BACKGROUND_REFRESH=False, METRICS_FLUSH_SECONDS=3600)
+class MetricsEndpointTests(TestCase):
+	def setUp(self):
+		import tempfile
+		from datetime import date
+		from django.core.cache import cache
+		from . import metrics
+		from .models import Notification, Transaction
+
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.metrics_dir = tmp.name
+		settings_override = override_settings(METRICS_DIR=tmp.name, PERFORMANCE_SAMPLING_ENABLED=False)
+		settings_override.enable()
+		self.addCleanup(settings_override.disable)
+		metrics._reset_after_fork()
+		cache.clear()
+
+		self.staff = User.objects.create_superuser(username="admin", email="admin@example.com", password="pass1234")
+		self.member = User.objects.create_user(username="member", password="pass1234")
+		Transaction.objects.create(title="Mics", amount=-500, category="Logistics", date=date(2024, 2, 1), approved=True, created_by=self.member)
+		Notification.objects.create(user=self.member, notification_type="transaction_approved", title="Approved", message="ok")
+		Notification.objects.create(user=self.member, notification_type="transaction_approved", title="Approved", message="ok", is_read=True)
+
+	def scrape(self, **headers):
+		response = self.client.get("/metrics", **headers)
+		return response, response.content.decode()
+
+	def test_request_export_cache_and_queue_metrics(self):
+		self.client.force_login(self.staff)
+		self.client.get(reverse("tedx_finance:transactions_table"))
+		self.client.get(reverse("tedx_finance:dashboard_panel", args=["budget"]))
+		self.client.get(reverse("tedx_finance:dashboard_panel", args=["budget"]))
+		export = self.client.get(reverse("tedx_finance:export_xlsx"))
+
+		response, text = self.scrape()
+		self.assertEqual(response.status_code, 200)
+		self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+		self.assertIn("# TYPE tedx_http_request_duration_seconds histogram", text)
+		self.assertIn('tedx_http_request_duration_seconds_count{method="GET",view="tedx_finance:transactions_table"} 1', text)
+		self.assertIn('tedx_http_request_duration_seconds_bucket{method="GET",view="tedx_finance:transactions_table",le="+Inf"} 1', text)
+		self.assertIn('tedx_http_requests_total{method="GET",status="2xx",view="tedx_finance:dashboard_panel"} 2', text)
+		self.assertIn('tedx_db_queries_per_request_count{view="tedx_finance:transactions_table"} 1', text)
+		self.assertIn('tedx_export_size_bytes_count{kind="xlsx"} 1', text)
+		self.assertIn(f'tedx_export_size_bytes_sum{{kind="xlsx"}} {len(export.content)}', text)
+		self.assertIn('tedx_cache_requests_total{cache="dashboard_panel",result="miss"} 1', text)
+		self.assertIn('tedx_cache_requests_total{cache="dashboard_panel",result="hit"} 1', text)
+		self.assertIn("tedx_notification_queue_depth 1", text)
+
+	def test_import_metrics(self):
+		from django.core.files.uploadedfile import SimpleUploadedFile
+		from .benchmarks import _import_workbook
+
+		self.client.force_login(self.staff)
+		content = _import_workbook(rows=3)
+		self.client.post(reverse("tedx_finance:import_transactions"), {"file": SimpleUploadedFile("import.xlsx", content)})
+		_, text = self.scrape()
+		self.assertIn('tedx_import_duration_seconds_count{kind="transactions"} 1', text)
+		self.assertIn(f'tedx_import_size_bytes_sum{{kind="transactions"}} {len(content)}', text)
+
+	def test_sums_worker_files_and_archives_exited_workers(self):
+		import json
+		import os
+
+		dead_pid = 4194303  # above the default pid_max, never a live process
+		entry = [["tedx_http_requests_total", {"method": "GET", "status": "2xx", "view": "tedx_finance:budgets"}, 3]]
+		histogram = [["tedx_db_queries_per_request", {"view": "tedx_finance:budgets"}, {"buckets": [0, 0, 1, 1, 1, 1, 1, 1, 1, 1], "sum": 4, "count": 1}]]
+		with open(os.path.join(self.metrics_dir, f"{os.getppid()}-live.json"), "w") as handle:
+			json.dump(entry + histogram, handle)
+		with open(os.path.join(self.metrics_dir, f"{dead_pid}-gone.json"), "w") as handle:
+			json.dump(entry + histogram, handle)
+
+		self.client.force_login(self.staff)
+		_, text = self.scrape()
+		self.assertIn('tedx_http_requests_total{method="GET",status="2xx",view="tedx_finance:budgets"} 6', text)
+		self.assertIn('tedx_db_queries_per_request_bucket{view="tedx_finance:budgets",le="5"} 2', text)
+		self.assertIn('tedx_db_queries_per_request_bucket{view="tedx_finance:budgets",le="2"} 0', text)
+		self.assertIn('tedx_db_queries_per_request_sum{view="tedx_finance:budgets"} 8', text)
+		# The exited worker's file was folded into the archive; totals do not change
+		self.assertFalse(os.path.exists(os.path.join(self.metrics_dir, f"{dead_pid}-gone.json")))
+		self.assertTrue(os.path.exists(os.path.join(self.metrics_dir, "archive.json")))
+		_, text = self.scrape()
+		self.assertIn('tedx_http_requests_total{method="GET",status="2xx",view="tedx_finance:budgets"} 6', text)
+
+	def test_access_requires_staff_or_token(self):
+		self.client.force_login(self.member)
+		response, _ = self.scrape()
+		self.assertEqual(response.status_code, 403)
+
+		self.client.logout()
+		with override_settings(METRICS_TOKEN="s3cret"):
+			response, _ = self.scrape(HTTP_AUTHORIZATION="Bearer wrong")
+			self.assertEqual(response.status_code, 403)
+			response, text = self.scrape(HTTP_AUTHORIZATION="Bearer s3cret")
+		self.assertEqual(response.status_code, 200)
+		self.assertIn("tedx_notification_queue_depth", text)
+
+	@override_settings(REQUEST_TIMING_ENABLED=True)
+	def test_query_counts_shared_with_request_timing(self):
+		import re
+		from .instrumentation import RequestTimings
+
+		self.client.force_login(self.staff)
+		with mock.patch("tedx_finance.instrumentation.RequestTimings", wraps=RequestTimings) as timings, \
+				self.assertLogs("tedx_finance.timing", level="INFO"):
+			response = self.client.get(reverse("tedx_finance:transactions_table"))
+		# One execute wrapper times the statements for both middlewares
+		self.assertEqual(timings.call_count, 1)
+		queries = int(re.search(r'"(\d+) queries"', response["Server-Timing"]).group(1))
+		_, text = self.scrape()
+		self.assertIn(f'tedx_db_queries_per_request_sum{{view="tedx_finance:transactions_table"}} {queries}', text)
+
+	@override_settings(METRICS_ENABLED=False)
+	def test_disabled_collects_nothing(self):
+		self.client.force_login(self.staff)
+		self.client.get(reverse("tedx_finance:transactions_table"))
+		_, text = self.scrape()
+		self.assertNotIn("tedx_http_requests_total", text)
+
+
+@override_settings(KPI_SNAPSHOT_BACKGROUND_REFRESH=False)
+class ProfilingCaptureTests(TestCase):
+	def setUp(self):
+		import tempfile
+		from datetime import date
+		from .models import Transaction
+
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.profiling_dir = tmp.name
+		settings_override = override_settings(PROFILING_DIR=tmp.name)
+		settings_override.enable()
+		self.addCleanup(settings_override.disable)
+
+		self.staff = User.objects.create_superuser(username="admin", email="admin@example.com", password="pass1234")
+		self.member = User.objects.create_user(username="member", password="pass1234")
+		Transaction.objects.create(title="Mics", amount=-500, category="Logistics", date=date(2024, 2, 1), approved=True, created_by=self.member)
+
+	def test_signed_query_parameter_captures_profile_and_flamegraph(self):
+		import os
+		from .models import ProfileCapture
+		from .profiling import profiling_token
+
+		self.client.force_login(self.staff)
+		response = self.client.get(reverse("tedx_finance:finance_report"), {"_profile": profiling_token(self.staff)})
+		self.assertEqual(response.status_code, 200)
+		capture = ProfileCapture.objects.get()
+		self.assertEqual(response["X-Profile-Capture"], str(capture.pk))
+		self.assertEqual(capture.view, "tedx_finance:finance_report")
+		self.assertEqual(capture.user, self.staff)
+		self.assertIn("cumulative", capture.top_functions)
+		self.assertIn("finance_report", capture.top_functions)
+
+		self.assertTrue(os.path.getsize(os.path.join(self.profiling_dir, capture.prof_file)))
+		with open(os.path.join(self.profiling_dir, capture.collapsed_file)) as handle:
+			lines = handle.read().splitlines()
+		self.assertTrue(lines)
+		self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+		self.assertTrue(any("finance_report (tedx_finance/views.py:" in line for line in lines))
+
+		# Deleting the capture removes its files
+		capture.delete()
+		self.assertEqual(os.listdir(self.profiling_dir), [])
+
+	def test_header_token(self):
+		from .models import ProfileCapture
+		from .profiling import profiling_token
+
+		self.client.force_login(self.staff)
+		self.client.get(reverse("tedx_finance:transactions_table"), HTTP_X_PROFILE_TOKEN=profiling_token(self.staff))
+		self.assertEqual(ProfileCapture.objects.get().view, "tedx_finance:transactions_table")
+
+	def test_invalid_foreign_expired_and_non_staff_tokens_are_ignored(self):
+		from .models import ProfileCapture
+		from .profiling import profiling_token
+
+		url = reverse("tedx_finance:finance_report")
+		other_staff = User.objects.create_superuser(username="other", email="other@example.com", password="pass1234")
+		self.client.force_login(self.staff)
+		self.client.get(url, {"_profile": "not-a-token"})
+		self.client.get(url, {"_profile": profiling_token(other_staff)})
+		with override_settings(PROFILING_TOKEN_MAX_AGE=-1):
+			self.client.get(url, {"_profile": profiling_token(self.staff)})
+		with override_settings(PROFILING_ENABLED=False):
+			self.client.get(url, {"_profile": profiling_token(self.staff)})
+
+		self.client.force_login(self.member)
+		response = self.client.get(url, {"_profile": profiling_token(self.member)})
+		self.assertEqual(response.status_code, 200)
+		self.assertFalse(response.has_header("X-Profile-Capture"))
+		self.assertFalse(ProfileCapture.objects.exists())
+
+	def test_collapsed_stacks_apportion_shared_callees(self):
+		import cProfile
+		import pstats
+		from .profiling import collapsed_stacks
+
+		def leaf():
+			return sum(range(20000))
+
+		def left():
+			return leaf() + leaf() + leaf()
+
+		def right():
+			return leaf()
+
+		def root():
+			return left() + right()
+
+		profiler = cProfile.Profile()
+		profiler.runcall(root)
+		stacks = collapsed_stacks(pstats.Stats(profiler))
+		left_leaf = sum(us for stack, us in stacks.items() if "left (" in stack and stack.split(";")[-1].startswith("leaf ("))
+		right_leaf = sum(us for stack, us in stacks.items() if "right (" in stack and stack.split(";")[-1].startswith("leaf ("))
+		self.assertGreater(left_leaf, right_leaf)
+
+	def test_admin_lists_captures_with_token_and_downloads(self):
+		from .profiling import profiling_token
+
+		self.client.force_login(self.staff)
+		self.client.get(reverse("tedx_finance:finance_report"), {"_profile": profiling_token(self.staff)})
+		from .models import ProfileCapture
+		capture = ProfileCapture.objects.get()
+
+		response = self.client.get(reverse("admin:tedx_finance_profilecapture_changelist"))
+		self.assertEqual(response.status_code, 200)
+		self.assertContains(response, "?_profile=")
+		self.assertContains(response, "/report/")
+
+		response = self.client.get(reverse("admin:tedx_finance_profilecapture_change", args=[capture.pk]))
+		self.assertContains(response, "Top functions (cumulative time)")
+		self.assertContains(response, "finance_report")
+
+		response = self.client.get(reverse("admin:tedx_finance_profilecapture_download", args=[capture.pk, "collapsed"]))
+		self.assertEqual(response.status_code, 200)
+		self.assertIn(b"finance_report", b"".join(response.streaming_content))
+		response = self.client.get(reverse("admin:tedx_finance_profilecapture_download", args=[capture.pk, "other"]))
+		self.assertEqual(response.status_code, 404)
+
+
+class LoadTestHarnessTests(LiveServerTestCase):
+	def setUp(self):
+		import tempfile
+
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		# A fast hasher, so logins do not eat into the short runs
+		settings_override = override_settings(
+			MEDIA_ROOT=tmp.name, KPI_SNAPSHOT_BACKGROUND_REFRESH=False,
+			PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+		)
+		settings_override.enable()
+		self.addCleanup(settings_override.disable)
+
+	def test_scenarios_drive_live_server(self):
+		from .load_testing import SCENARIOS, ensure_accounts, run_load_test
+		from .models import Transaction
+
+		accounts = ensure_accounts(treasurers=1, volunteers=1)
+		# One user at a time: the live server shares the in-memory test database connection between threads
+		summaries = {}
+		for name in ("volunteer_submitter", "treasurer_approver", "dashboard_viewer", "background_export"):
+			summaries[name] = run_load_test(self.live_server_url, accounts, users=1, duration=0.5, think_time=0.05, mix={name: 1})
+			self.assertEqual(summaries[name]["scenarios"], {name: 1})
+			self.assertEqual(summaries[name]["error_kinds"], {}, name)
+		self.assertEqual(set(summaries), set(SCENARIOS))
+
+		endpoints = {endpoint for summary in summaries.values() for endpoint in summary["endpoints"]}
+		for endpoint in ("login", "add_transaction", "approve_transaction", "dashboard", "dashboard_panel:kpis", "export_xlsx"):
+			self.assertIn(endpoint, endpoints)
+		stats = summaries["dashboard_viewer"]["endpoints"]["dashboard"]
+		self.assertLessEqual(stats["p50_ms"], stats["p95_ms"])
+		self.assertLessEqual(stats["p95_ms"], stats["p99_ms"])
+		self.assertGreater(summaries["dashboard_viewer"]["total"]["throughput_rps"], 0)
+
+		submitted = Transaction.objects.filter(title__startswith="Load test expense")
+		self.assertTrue(submitted.exists())
+		self.assertFalse(submitted.filter(proof="").exists())
+		self.assertTrue(submitted.filter(approved=True).exists())
+
+	def test_wrong_password_fails_login(self):
+		from .load_testing import Recorder, VirtualUser, ensure_accounts
+
+		ensure_accounts(treasurers=1, volunteers=1)
+		recorder = Recorder()
+		self.assertFalse(VirtualUser(self.live_server_url, recorder).login("loadtest_volunteer_001", "wrong"))
+		self.assertTrue(VirtualUser(self.live_server_url, recorder).login("loadtest_volunteer_001", "loadtest-password"))
+		self.assertEqual(sum(bool(error) for *_, error in recorder.samples), 1)
+
+	def test_summary_percentiles_and_error_rates(self):
+		from .load_testing import assign_scenarios, summarize
+
+		samples = [("dashboard", float(ms), 200, "") for ms in range(1, 101)]
+		samples += [("export_xlsx", 500.0, 500, "HTTP 500"), ("export_xlsx", 300.0, 200, "")]
+		summary = summarize(samples, elapsed=10)
+		self.assertEqual(summary["endpoints"]["dashboard"]["p50_ms"], 50.5)
+		self.assertEqual(summary["endpoints"]["dashboard"]["p99_ms"], 99.0)
+		self.assertEqual(summary["endpoints"]["dashboard"]["throughput_rps"], 10.0)
+		self.assertEqual(summary["endpoints"]["export_xlsx"]["error_rate"], 0.5)
+		self.assertEqual(summary["total"]["requests"], 102)
+		self.assertEqual(summary["error_kinds"], {"HTTP 500": 1})
+
+		assigned = assign_scenarios(13)
+		self.assertEqual(len(assigned), 13)
+		self.assertEqual(assigned.count("dashboard_viewer"), 6)
+		self.assertEqual(assigned.count("background_export"), 1)
+
+
+@override_settings(KPI_SNAPSHOT_BACKGROUND_REFRESH=False, PERFORMANCE_SAMPLE_FLUSH_SIZE=1)
+class PerformanceDashboardTests(TestCase):
+	def setUp(self):
+		import os
+		import shutil
+		import tempfile
+		from datetime import date
+		from django.core.cache import cache
+		from . import metrics, performance
+		from .models import Transaction
+
+		media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+		os.makedirs(os.path.join(media_root, "proofs"))
+		with open(os.path.join(media_root, "proofs", "bill.pdf"), "wb") as handle:
+			handle.write(b"x" * 2048)
+		metrics_dir = tempfile.TemporaryDirectory()
+		self.addCleanup(metrics_dir.cleanup)
+		settings_override = override_settings(MEDIA_ROOT=media_root, METRICS_DIR=metrics_dir.name)
+		settings_override.enable()
+		self.addCleanup(settings_override.disable)
+		metrics._reset_after_fork()
+		performance._reset_after_fork()
+		cache.clear()
+
+		self.staff = User.objects.create_superuser(username="admin", email="admin@example.com", password="pass1234")
+		self.member = User.objects.create_user(username="member", password="pass1234")
+		Transaction.objects.create(title="Mics", amount=-500, category="Logistics", date=date(2024, 2, 1), approved=True, created_by=self.member)
+
+	def test_requests_are_sampled_into_a_capped_table(self):
+		from .models import RequestSample
+
+		self.client.force_login(self.staff)
+		with override_settings(PERFORMANCE_SAMPLE_CAPACITY=3):
+			for _ in range(5):
+				self.client.get(reverse("tedx_finance:transactions_table"))
+		samples = list(RequestSample.objects.all())
+		self.assertEqual(len(samples), 3)
+		sample = samples[0]
+		self.assertEqual(sample.view, "tedx_finance:transactions_table")
+		self.assertEqual(sample.method, "GET")
+		self.assertEqual(sample.status_code, 200)
+		self.assertGreater(sample.db_queries, 0)
+		self.assertGreater(sample.response_bytes, 0)
+
+	@override_settings(REQUEST_TIMING_ENABLED=True, PERFORMANCE_SAMPLE_FLUSH_SIZE=1)
+	def test_flush_runs_after_the_response_outside_its_query_count(self):
+		import re
+		from . import metrics
+		from .models import RequestSample
+
+		self.client.force_login(self.staff)
+		with self.assertLogs("tedx_finance.timing", level="INFO"):
+			response = self.client.get(reverse("tedx_finance:transactions_table"))
+		queries = int(re.search(r'"(\d+) queries"', response["Server-Timing"]).group(1))
+		self.assertEqual(RequestSample.objects.get().db_queries, queries)
+		# The sample was written once the response was sent, not within the metrics' count
+		histogram = metrics.collect()[("tedx_db_queries_per_request", (("view", "tedx_finance:transactions_table"),))]
+		self.assertEqual(histogram["sum"], queries)
+
+	def test_flush_trims_only_past_capacity(self):
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		from . import performance
+		from .models import RequestSample
+
+		def flush(count):
+			for _ in range(count):
+				performance._buffer.append(RequestSample(view="tedx_finance:budgets", method="GET", status_code=200, duration_ms=5, db_queries=1, db_ms=1))
+			with CaptureQueriesContext(connection) as ctx:
+				performance.flush_samples()
+			return [query["sql"] for query in ctx.captured_queries if query["sql"].startswith("DELETE")]
+
+		with override_settings(PERFORMANCE_SAMPLE_CAPACITY=5):
+			self.assertEqual(flush(3), [])
+			self.assertEqual(flush(2), [])
+			self.assertEqual(len(flush(2)), 1)
+		self.assertEqual(RequestSample.objects.count(), 5)
+
+	@override_settings(PERFORMANCE_SAMPLING_ENABLED=False)
+	def test_sampling_can_be_turned_off(self):
+		from .models import RequestSample
+
+		self.client.force_login(self.staff)
+		self.client.get(reverse("tedx_finance:transactions_table"))
+		self.assertFalse(RequestSample.objects.exists())
+
+	def test_staff_page_shows_endpoints_exports_caches_tables_and_media(self):
+		from datetime import timedelta
+		from django.utils import timezone
+		from .models import RequestSample
+
+		self.client.force_login(self.staff)
+		self.client.get(reverse("tedx_finance:transactions_table"))
+		self.client.get(reverse("tedx_finance:export_xlsx"))
+		self.client.get(reverse("tedx_finance:dashboard_panel", args=["budget"]))
+		self.client.get(reverse("tedx_finance:dashboard_panel", args=["budget"]))
+		old = RequestSample.objects.create(view="tedx_finance:finance_report", method="GET", status_code=200, duration_ms=9000, db_queries=400, db_ms=100)
+		RequestSample.objects.filter(pk=old.pk).update(recorded_at=timezone.now() - timedelta(hours=3))
+
+		response = self.client.get(reverse("tedx_finance:performance_dashboard"))
+		self.assertEqual(response.status_code, 200)
+		report = response.context["report"]
+		views = {row["view"]: row for row in report["slowest_endpoints"]}
+		self.assertIn("tedx_finance:transactions_table", views)
+		self.assertEqual(views["tedx_finance:dashboard_panel"]["requests"], 2)
+		# Outside the last hour, and the page does not sample itself
+		self.assertNotIn("tedx_finance:finance_report", views)
+		self.assertNotIn("tedx_finance:performance_dashboard", views)
+		self.assertEqual([row["kind"] for row in report["exports"]], ["xlsx"])
+		self.assertGreater(report["exports"][0]["max_bytes"], 0)
+		caches = {row["cache"]: row for row in report["caches"]}
+		self.assertEqual(caches["dashboard_panel"]["hits"], 1)
+		self.assertEqual(caches["dashboard_panel"]["hit_ratio"], 50.0)
+		tables = {row["table"]: row for row in report["tables"]}
+		self.assertEqual(tables["tedx_finance_transaction"]["rows"], 1)
+		self.assertEqual(tables["tedx_finance_historicaltransaction"]["rows"], 1)
+		self.assertIn("tedx_finance_notification", tables)
+		self.assertIn("tedx_finance_auditlog", tables)
+		self.assertIn("tedx_finance_loginattempt", tables)
+		self.assertEqual(report["media"], [{"directory": "proofs", "files": 1, "bytes": 2048}])
+		self.assertContains(response, "Slowest Endpoints")
+
+		day = self.client.get(reverse("tedx_finance:performance_dashboard"), {"window": "day"}).context["report"]
+		self.assertIn("tedx_finance:finance_report", [row["view"] for row in day["slowest_endpoints"]])
+
+	def test_members_are_redirected(self):
+		self.client.force_login(self.member)
+		response = self.client.get(reverse("tedx_finance:performance_dashboard"))
+		self.assertRedirects(response, reverse("tedx_finance:dashboard"), fetch_redirect_response=False)
+
+
+@override_settings(KPI_SNAPSHOT_BACKGROUND_REFRESH=False)
+class ExportGuardTests(TestCase):
+	def setUp(self):
+		import shutil
+		import tempfile
+		from datetime import date
+		from django.core.files.base import ContentFile
+		from .models import Transaction
+
+		media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+		media = self.settings(MEDIA_ROOT=media_root)
+		media.enable()
+		self.addCleanup(media.disable)
+
+		self.staff = User.objects.create_superuser(username="admin", email="admin@example.com", password="pass1234")
+		for day in (1, 2, 3):
+			tx = Transaction(title=f"Mics {day}", amount=-500, category="Logistics", date=date(2024, 2, day), approved=True, created_by=self.staff)
+			tx.proof.save(f"bill{day}.png", ContentFile(b"\x89PNG" + bytes(4096)), save=False)
+			tx.save()
+		self.client.force_login(self.staff)
+
+	@override_settings(EXPORT_TRACEMALLOC=True)
+	def test_export_is_logged_with_rows_bytes_and_peak_memory(self):
+		from .models import ExportLog
+
+		response = self.client.get(reverse("tedx_finance:export_xlsx"))
+		self.assertEqual(response.status_code, 200)
+		self.assertTrue(response["Content-Disposition"].startswith('attachment; filename="tedx_transactions_'))
+		log = ExportLog.objects.get()
+		self.assertEqual((log.kind, log.status, log.user, log.rows), ("xlsx", "ok", self.staff, 3))
+		self.assertEqual(log.bytes_out, len(response.content))
+		self.assertGreater(log.peak_traced_bytes, 0)
+		self.assertGreater(log.duration_ms, 0)
+		self.assertFalse(log.spooled)
+
+		response = self.client.get(reverse("tedx_finance:export_proofs_pdf"))
+		self.assertTrue(response.content.startswith(b"%PDF"))
+		log = ExportLog.objects.get(kind="proofs_pdf")
+		self.assertEqual((log.status, log.rows, log.bytes_out), ("ok", 3, len(response.content)))
+
+	def test_rss_only_by_default(self):
+		import tracemalloc
+		from .models import ExportLog
+
+		with mock.patch("tedx_finance.export_guard.current_rss", return_value=100 * 1024 * 1024):
+			self.client.get(reverse("tedx_finance:export_xlsx"))
+		log = ExportLog.objects.get()
+		self.assertIsNone(log.peak_traced_bytes)
+		self.assertEqual(log.peak_rss_bytes, 0)
+		self.assertFalse(tracemalloc.is_tracing())
+
+	@override_settings(EXPORT_MEMORY_SPOOL_MB=0.001)
+	def test_large_output_is_spooled_to_disk_and_streamed(self):
+		import io
+		import zipfile
+		from .models import ExportLog
+
+		response = self.client.get(reverse("tedx_finance:export_zip"))
+		self.assertEqual(response.status_code, 200)
+		self.assertTrue(response.streaming)
+		content = b"".join(response.streaming_content)
+		response.close()
+		names = zipfile.ZipFile(io.BytesIO(content)).namelist()
+		self.assertEqual(len([name for name in names if name.startswith("proofs/")]), 3)
+		log = ExportLog.objects.get()
+		self.assertEqual((log.kind, log.status, log.rows), ("zip", "ok", 3))
+		self.assertTrue(log.spooled)
+		self.assertEqual(log.bytes_out, len(content))
+
+	@override_settings(EXPORT_MEMORY_LIMIT_MB=50)
+	def test_export_over_the_limit_is_aborted_cleanly(self):
+		import itertools
+		from django.contrib.messages import get_messages
+		from .models import ExportLog
+
+		# The worker's RSS grows by 100 MB per check
+		rss = (step * 100 * 1024 * 1024 for step in itertools.count(1))
+		with mock.patch("tedx_finance.export_guard.current_rss", side_effect=lambda: next(rss)), \
+				self.assertLogs("tedx_finance.exports", level="WARNING"):
+			response = self.client.get(reverse("tedx_finance:export_xlsx"))
+		self.assertRedirects(response, reverse("tedx_finance:transactions_table"), fetch_redirect_response=False)
+		self.assertIn("too large", " ".join(str(message) for message in get_messages(response.wsgi_request)))
+		log = ExportLog.objects.get()
+		self.assertEqual((log.kind, log.status, log.bytes_out), ("xlsx", "aborted", 0))
+		self.assertIn("limit", log.error)
+
+		# The worker carries on serving other pages
+		self.assertEqual(self.client.get(reverse("tedx_finance:transactions_table")).status_code, 200)
@@ -0,0 +1,192 @@
+"""
+Time-series pivots of approved spending.
+
+``spending_pivot`` turns one ``Trunc*``-grouped query into a dense
+``(periods x categories)`` NumPy matrix: every period between the bounds is
+present (gap-filled with zeros) and every category series shares the same
+period axis, so chart labels and datasets always line up. Categories can be
+limited to the top N by spend, optionally folding the rest into "Other".
+
+Ranges come from query parameters, so a pivot lays out at most
+``MAX_PERIODS`` periods, keeping the latest ones; ``fit_granularity``
+picks a coarser granularity for ranges too wide for the requested one.
+
+Used by the dashboard trend panels, the weekly trend on budget suggestions
+and the monthly breakdown in the finance report.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+from django.db.models import Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from .models import Transaction
+
+GRANULARITIES = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+LABEL_FORMATS = {
+    'day': '%d %b',
+    'week': '%b %d',
+    'month': '%b %Y',
+}
+OTHER_LABEL = 'Other'
+# Most periods a pivot lays out (about 5 years of days)
+MAX_PERIODS = 2000
+
+
+def period_start(day, granularity):
+    """First day of the period containing ``day`` (weeks start on Monday, as TruncWeek does)."""
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def period_count(start, end, granularity):
+    """Number of periods ``period_range`` returns for these bounds, without building them."""
+    first, last = period_start(start, granularity), period_start(end, granularity)
+    if first > last:
+        return 0
+    if granularity == 'month':
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    return (last - first).days // (7 if granularity == 'week' else 1) + 1
+
+
+def fit_granularity(start, end, granularity, max_periods=MAX_PERIODS):
+    """``granularity``, or the first coarser one that covers ``start``..``end`` in ``max_periods``."""
+    if not (start and end):
+        return granularity
+    names = list(GRANULARITIES)
+    for name in names[names.index(granularity):]:
+        if period_count(start, end, name) <= max_periods:
+            return name
+    return names[-1]
+
+
+def latest_periods_start(end, granularity, max_periods=MAX_PERIODS):
+    """First day of the earliest of the ``max_periods`` periods ending with the one containing ``end``."""
+    last = period_start(end, granularity)
+    if granularity == 'month':
+        months = last.year * 12 + last.month - 1 - (max_periods - 1)
+        return date(months // 12, months % 12 + 1, 1) if months >= 12 else date.min
+    days = (max_periods - 1) * (7 if granularity == 'week' else 1)
+    return last - timedelta(days=days) if (last - date.min).days >= days else date.min
+
+
+def period_range(start, end, granularity):
+    """Every period start from the period containing ``start`` to the one containing ``end``."""
+    current, last = period_start(start, granularity), period_start(end, granularity)
+    periods = []
+    while current <= last:
+        periods.append(current)
+        if current == last:
+            break  # stepping past the last period could overflow at date.max
+        if granularity == 'month':
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        elif granularity == 'week':
+            current += timedelta(days=7)
+        else:
+            current += timedelta(days=1)
+    return periods
+
+
+def spending_pivot(start=None, end=None, granularity='month', top_n=None, other=False, queryset=None,
+                   max_periods=MAX_PERIODS):
+    """
+    Approved spending per period and category from a single grouped query.
+
+    Args:
+        start, end: Inclusive date bounds; when omitted, the first/last period with spending
+        granularity: 'day', 'week' or 'month'
+        top_n: Keep only the N categories with the most spend in the range
+        other: Fold the categories dropped by ``top_n`` into an "Other" column
+        queryset: Transactions to pivot (default: every approved expense)
+        max_periods: Most periods laid out; longer ranges keep the latest ones
+
+    Returns:
+        dict with ``periods`` (period start dates), ``labels`` (formatted periods),
+        ``categories`` (``{'id', 'name'}`` per column; ``id`` is None for
+        uncategorized and for "Other"), ``matrix`` (positive spend,
+        periods x categories) and ``totals`` (spend per period, all categories)
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity '{granularity}'")
+
+    queryset = Transaction.objects.filter(approved=True, amount__lt=0) if queryset is None else queryset.filter(amount__lt=0)
+    if start and end:
+        start = max(start, latest_periods_start(end, granularity, max_periods))
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lte=end)
+    rows = list(
+        queryset.annotate(period=GRANULARITIES[granularity]('date'))
+        .values('period', 'category_ref_id', 'category_ref__name')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+
+    if rows or (start and end):
+        first = start or min(row['period'] for row in rows)
+        last = end or max(row['period'] for row in rows)
+        first = max(first, latest_periods_start(last, granularity, max_periods))
+        periods = period_range(first, last, granularity)
+    else:
+        periods = []
+    period_index = {period: i for i, period in enumerate(periods)}
+
+    names = {}
+    spend_by_category = {}
+    for row in rows:
+        key = row['category_ref_id']
+        names[key] = row['category_ref__name'] or 'Uncategorized'
+        spend_by_category[key] = spend_by_category.get(key, 0) - float(row['total'])
+    ranked = sorted(spend_by_category, key=lambda key: (-spend_by_category[key], names[key]))
+    kept = ranked[:top_n] if top_n is not None else ranked
+    dropped = set(ranked) - set(kept)
+
+    categories = [{'id': key, 'name': names[key]} for key in kept]
+    if other and dropped:
+        categories.append({'id': None, 'name': OTHER_LABEL})
+    column_index = {key: i for i, key in enumerate(kept)}
+    other_column = len(kept) if other and dropped else None
+
+    matrix = np.zeros((len(periods), len(categories)), dtype=np.float64)
+    totals = np.zeros(len(periods), dtype=np.float64)
+    for row in rows:
+        i = period_index.get(period_start(row['period'], granularity))
+        if i is None:
+            continue
+        amount = -float(row['total'])
+        totals[i] += amount
+        j = column_index.get(row['category_ref_id'], other_column)
+        if j is not None:
+            matrix[i, j] += amount
+
+    return {
+        'periods': periods,
+        'labels': [period.strftime(LABEL_FORMATS[granularity]) for period in periods],
+        'categories': categories,
+        'matrix': matrix,
+        'totals': totals,
+    }
+
+
+def pivot_series(pivot):
+    """Chart-ready series: one ``{'label', 'data'}`` per category column."""
+    return [
+        {'label': category['name'], 'data': pivot['matrix'][:, j].round(2).tolist()}
+        for j, category in enumerate(pivot['categories'])
+    ]
+
+
+def pivot_rows(pivot):
+    """Table-ready rows: one ``{'label', 'values', 'total'}`` per period."""
+    return [
+        {'label': label, 'values': pivot['matrix'][i].round(2).tolist(), 'total': round(float(pivot['totals'][i]), 2)}
+        for i, label in enumerate(pivot['labels'])
+    ]
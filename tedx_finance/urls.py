@@ -10,9 +10,11 @@ urlpatterns = [
 
     # Main dashboard
     path('', views.dashboard, name='dashboard'),
+    path('dashboard/panels/<str:panel>/', views.dashboard_panel, name='dashboard_panel'),
     path('settings/', views.settings_view, name='settings'),
     path('budgets/', views.budgets, name='budgets'),
     path('budget-suggestions/', views.budget_suggestions, name='budget_suggestions'),
+    path('budget-suggestions/runway/', views.runway_simulation, name='runway_simulation'),
     
     # Transactions table view
     path('transactions/', views.transactions_table, name='transactions_table'),
@@ -30,6 +32,9 @@ urlpatterns = [
     path('categories/quick-rename', views.quick_rename_category, name='quick_rename_category'),
     path('proofs/', views.proof_gallery, name='proof_gallery'),
     path('proofs/bulk-upload/', views.bulk_upload_proofs, name='bulk_upload_proofs'),
+    path('proofs/feed/', views.proof_gallery_feed, name='proof_gallery_feed'),
+    path('proofs/<int:pk>/file/', views.serve_proof, name='serve_proof'),
+    path('proofs/<int:pk>/thumbnail/', views.serve_proof_thumbnail, name='serve_proof_thumbnail'),
 
     # Income forms
     path('add-fund/', views.add_management_fund, name='add_management_fund'),
@@ -46,6 +51,8 @@ urlpatterns = [
     path('export/proofs-csv/', views.export_proofs_to_csv, name='export_proofs_csv'),
     path('export/proofs-pdf/', views.export_proofs_to_pdf, name='export_proofs_pdf'),
     path('report/', views.finance_report, name='finance_report'),
+    path('report/as-of/', views.ledger_as_of_report, name='ledger_as_of_report'),
+    path('performance/', views.performance_dashboard, name='performance_dashboard'),
     
     # Notifications
     path('notifications/', views.notifications_list, name='notifications_list'),
@@ -1,28 +1,36 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required, permission_required
 from .forms import UserCreationForm
 from django.contrib import messages
 from django.db.models import Sum, Q
-from django.http import HttpResponse, JsonResponse
-from django.core.exceptions import ValidationError
+from django.http import HttpResponse, JsonResponse, Http404
+from django.core.exceptions import ValidationError, PermissionDenied
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
 from django.core.cache import cache
 from django.template.loader import render_to_string
 from django.core.files.storage import default_storage
 from django.utils import timezone
 from datetime import datetime, timedelta
-from django.db.models.functions import TruncMonth
 import logging
 import json
 import csv
 import io
 import os
+import shutil
 import zipfile
 import openpyxl
 from openpyxl.styles import Font, Alignment, PatternFill
 from openpyxl.utils import get_column_letter
 
 from .models import ManagementFund, Sponsor, Transaction, Category, UserPreference
+from .etags import ledger_conditional
+from .export_guard import ExportMemoryExceeded, ExportRun
+from .instrumentation import timing_span
+from .ledger import ledger_as_of
+from .metrics import record_cache
+from .performance import WINDOWS as PERFORMANCE_WINDOWS, performance_report
+from .sponsor_tiers import get_tiers, tier_summary, with_tiers
 from .forms import (
     TransactionForm,
     ManagementFundForm,
@@ -46,7 +54,12 @@ def is_in_group(user, group_name):
         # Admins get automatic access to Treasurer group
         if group_name == 'Treasurer' and user.is_staff:
             return True
-        return user.groups.filter(name=group_name).exists()
+        # Views, decorators and the context processor all ask; load the groups once per user object
+        group_names = getattr(user, '_group_names_cache', None)
+        if group_names is None:
+            group_names = frozenset(user.groups.values_list('name', flat=True))
+            user._group_names_cache = group_names
+        return group_name in group_names
     return False
 
 
@@ -67,6 +80,7 @@ def get_cached_category_choices():
     """Return merged category choices (dynamic + defaults) with short caching."""
     cache_key = 'tedx_category_choices'
     cached = cache.get(cache_key)
+    record_cache('category_choices', bool(cached))
     if cached:
         return cached
 
@@ -90,24 +104,6 @@ def invalidate_category_cache():
     cache.delete('tedx_category_choices')
 
 
-def get_sponsor_tier(amount):
-    """
-    Returns sponsor tier name and badge class based on amount.
-    Thresholds (INR): Gold ≥ 200,000; Silver ≥ 50,000; Bronze < 50,000
-    """
-    try:
-        amt = float(amount)
-    except (ValueError, TypeError):
-        amt = 0.0
-    
-    if amt >= 200000:
-        return 'Gold', 'bg-yellow-500 text-black'
-    elif amt >= 50000:
-        return 'Silver', 'bg-slate-300 text-slate-900'
-    else:
-        return 'Bronze', 'bg-amber-700 text-white'
-
-
 def apply_transaction_filters(request, queryset=None, user_is_treasurer=False):
     """
     Apply comprehensive filters to transaction queryset based on request parameters.
@@ -122,17 +118,16 @@ def apply_transaction_filters(request, queryset=None, user_is_treasurer=False):
         Filtered queryset
     """
     if queryset is None:
-        queryset = Transaction.objects.all().select_related('created_by')
+        queryset = Transaction.objects.all().select_related('created_by', 'category_ref')
     else:
-        queryset = queryset.select_related('created_by')
+        queryset = queryset.select_related('created_by', 'category_ref')
     
-    # Search filter (searches in title, category, description)
+    # Search filter (searches in title and category; transactions have no description field)
     search_query = request.GET.get('search', '').strip()
     if search_query:
         queryset = queryset.filter(
             Q(title__icontains=search_query) |
-            Q(category__icontains=search_query) |
-            Q(description__icontains=search_query)
+            Q(category_ref__name__icontains=search_query)
         )
     
     # Status filter
@@ -145,7 +140,7 @@ def apply_transaction_filters(request, queryset=None, user_is_treasurer=False):
     # Category filter
     category_filter = request.GET.get('category', 'all')
     if category_filter != 'all':
-        queryset = queryset.filter(category=category_filter)
+        queryset = queryset.filter(category_ref__name=category_filter)
     
     # Date range filters
     start_date = request.GET.get('start_date')
@@ -303,11 +298,16 @@ def login_view(request):
 
 # --- Core Views ---
 @login_required
+@ledger_conditional('budgets')
 def budgets(request):
     """Budget tracking view showing all budgets and their utilization."""
     from .models import Budget
     user_is_treasurer = is_in_group(request.user, 'Treasurer')
-    budgets = Budget.objects.all().order_by('category__name')
+    budgets = (
+        Budget.objects.select_related('category')
+        .annotate(spent_total=Budget.spent_subquery())
+        .order_by('category__name')
+    )
     context = {
         'budgets': budgets,
         'is_treasurer': user_is_treasurer,
@@ -327,15 +327,12 @@ def budget_suggestions(request):
     - Projected budget needs for upcoming period
     - Risk of budget overrun
     """
-    from .models import Budget
-    from django.db.models import Sum, Count, Avg
-    from django.db.models.functions import TruncWeek
+    from .forecasting import BURN_RATE_DAYS, forecast_budgets
+    from .runway import get_runway_forecast
+    from .timeseries import spending_pivot
     
     user_is_treasurer = is_in_group(request.user, 'Treasurer')
     
-    # Get all budgets and current financial state
-    budgets = Budget.objects.all().order_by('category__name')
-    
     # Calculate total income
     total_income = (
         (ManagementFund.objects.aggregate(total=Sum('amount'))['total'] or 0) +
@@ -351,99 +348,24 @@ def budget_suggestions(request):
     
     remaining_funds = total_income - total_spent
     
-    # Analyze spending patterns (last 30 days)
-    thirty_days_ago = datetime.now().date() - timedelta(days=30)
-    recent_spending = abs(Transaction.objects.filter(
-        approved=True,
-        amount__lt=0,
-        date__gte=thirty_days_ago
-    ).aggregate(total=Sum('amount'))['total'] or 0)
-    
-    # Calculate burn rate (spending per day)
-    days_analyzed = min(30, (datetime.now().date() - thirty_days_ago).days)
-    if days_analyzed > 0:
-        daily_burn_rate = recent_spending / days_analyzed
-        weekly_burn_rate = daily_burn_rate * 7
-        monthly_burn_rate = daily_burn_rate * 30
-    else:
-        daily_burn_rate = weekly_burn_rate = monthly_burn_rate = 0
+    # Per-budget forecasts plus the daily spend matrix they were fitted on
+    # (a fixed number of queries however many budgets exist)
+    category_insights, (_, spend_matrix) = forecast_budgets()
+    total_suggested_budget = sum(insight['suggested_budget'] for insight in category_insights)
     
-    # Calculate runway (days until funds run out at current burn rate)
-    if daily_burn_rate > 0:
-        runway_days = int(remaining_funds / daily_burn_rate)
-    else:
-        runway_days = 999  # Infinite if not spending
+    # Calculate burn rate (spending per day) over the last 30 days
+    recent_spending = float(spend_matrix[:, -BURN_RATE_DAYS:].sum())
+    daily_burn_rate = recent_spending / BURN_RATE_DAYS
+    weekly_burn_rate = daily_burn_rate * 7
+    monthly_burn_rate = daily_burn_rate * 30
     
-    # Category-wise analysis with predictions
-    category_insights = []
-    total_suggested_budget = 0
-    
-    for budget in budgets:
-        spent = budget.spent()
-        remaining = budget.remaining()
-        utilization = budget.utilization_percent()
-        
-        # Calculate category burn rate (last 30 days)
-        category_recent_spending = abs(Transaction.objects.filter(
-            category=budget.category.name,
-            approved=True,
-            amount__lt=0,
-            date__gte=thirty_days_ago
-        ).aggregate(total=Sum('amount'))['total'] or 0)
-        
-        if days_analyzed > 0:
-            category_daily_burn = category_recent_spending / days_analyzed
-        else:
-            category_daily_burn = 0
-        
-        # Calculate days remaining in budget period
-        days_remaining = max(0, (budget.end_date - datetime.now().date()).days)
-        
-        # Predict total spending by end of budget period
-        predicted_additional_spend = category_daily_burn * days_remaining
-        predicted_total_spend = spent + predicted_additional_spend
-        
-        # Calculate suggested budget (120% of predicted to have buffer)
-        suggested_budget = predicted_total_spend * 1.2
-        total_suggested_budget += suggested_budget
-        
-        # Determine status and risk level
-        if utilization >= 100:
-            status = 'exceeded'
-            risk_level = 'critical'
-        elif utilization >= 80:
-            status = 'warning'
-            risk_level = 'high'
-        elif utilization >= 60:
-            status = 'moderate'
-            risk_level = 'medium'
-        else:
-            status = 'good'
-            risk_level = 'low'
-        
-        # Calculate if more budget is needed
-        budget_shortage = max(0, predicted_total_spend - float(budget.amount))
-        
-        category_insights.append({
-            'category': budget.category.name,
-            'category_code': budget.category.name,
-            'current_budget': float(budget.amount),
-            'spent': spent,
-            'remaining': remaining,
-            'utilization': round(utilization, 1),
-            'daily_burn_rate': round(category_daily_burn, 2),
-            'predicted_total_spend': round(predicted_total_spend, 2),
-            'suggested_budget': round(suggested_budget, 2),
-            'budget_shortage': round(budget_shortage, 2),
-            'days_remaining': days_remaining,
-            'status': status,
-            'risk_level': risk_level,
-            'needs_increase': budget_shortage > 0,
-        })
+    # Runway distribution from the Monte Carlo simulation (cached per ledger version)
+    runway = get_runway_forecast()
+    runway_days = runway['p50'] if runway['p50'] is not None else 999  # 999 = beyond the horizon
     
     # Overall recommendations
-    overall_budget_needed = max(total_suggested_budget, total_spent + (monthly_burn_rate * 2))
-    additional_funds_needed = max(0, overall_budget_needed - total_income)
+    overall_budget_needed = max(total_suggested_budget, float(total_spent) + (monthly_burn_rate * 2))
+    additional_funds_needed = max(0, overall_budget_needed - float(total_income))
     
     # Generate insights and recommendations
     recommendations = []
@@ -493,20 +415,11 @@ def budget_suggestions(request):
             'action': 'Continue monitoring spending patterns regularly.'
         })
     
-    # Weekly spending trend (last 8 weeks)
-    eight_weeks_ago = datetime.now().date() - timedelta(weeks=8)
-    weekly_spending = Transaction.objects.filter(
-        approved=True,
-        amount__lt=0,
-        date__gte=eight_weeks_ago
-    ).annotate(
-        week=TruncWeek('date')
-    ).values('week').annotate(
-        total=Sum('amount')
-    ).order_by('week')
-    
-    spending_trend_labels = [item['week'].strftime('%b %d') for item in weekly_spending]
-    spending_trend_values = [abs(float(item['total'])) for item in weekly_spending]
+    # Weekly spending trend (last 8 weeks, empty weeks included)
+    today = datetime.now().date()
+    weekly_spending = spending_pivot(today - timedelta(weeks=8), today, 'week')
+    spending_trend_labels = weekly_spending['labels']
+    spending_trend_values = weekly_spending['totals'].round(2).tolist()
     
     context = {
         'is_treasurer': user_is_treasurer,
@@ -517,6 +430,7 @@ def budget_suggestions(request):
         'weekly_burn_rate': round(weekly_burn_rate, 2),
         'monthly_burn_rate': round(monthly_burn_rate, 2),
         'runway_days': runway_days,
+        'runway': runway,
         'category_insights': category_insights,
         'recommendations': recommendations,
         'total_suggested_budget': round(total_suggested_budget, 2),
@@ -526,6 +440,30 @@ def budget_suggestions(request):
     }
     
     return render(request, 'tedx_finance/budget_suggestions.html', context)
+
+
+@login_required
+def runway_simulation(request):
+    """
+    JSON runway distribution for the dashboard chart.
+
+    Returns P10/P50/P90 days until funds run out (null = beyond the
+    simulated horizon) plus a histogram of simulated depletion days.
+    Only treasurers may pick ``paths`` and ``horizon``; everyone else gets
+    the cached default run the dashboard shows.
+    """
+    from .runway import DEFAULT_HORIZON_DAYS, DEFAULT_PATHS, get_runway_forecast
+
+    if not is_in_group(request.user, 'Treasurer'):
+        return JsonResponse(get_runway_forecast())
+    try:
+        paths = min(max(int(request.GET.get('paths', DEFAULT_PATHS)), 100), 10000)
+        horizon = min(max(int(request.GET.get('horizon', DEFAULT_HORIZON_DAYS)), 30), 730)
+    except ValueError:
+        return JsonResponse({'error': 'paths and horizon must be integers'}, status=400)
+    return JsonResponse(get_runway_forecast(n_paths=paths, horizon_days=horizon))
+
+
 @login_required
 def transactions_table(request):
     """Excel-like table view with inline editing capabilities and advanced filtering"""
@@ -538,7 +476,7 @@ def transactions_table(request):
     order_by = request.GET.get('order_by', '-date')
     valid_order_fields = ['date', '-date', 'amount', '-amount', 'title', '-title', 'category', '-category']
     if order_by in valid_order_fields:
-        transactions = transactions.order_by(order_by)
+        transactions = transactions.order_by(order_by.replace('category', 'category_ref__name'))
     else:
         transactions = transactions.order_by('-date')
     
@@ -562,348 +500,83 @@ def transactions_table(request):
     return render(request, 'tedx_finance/transactions_table.html', context)
 
 @login_required
+@ledger_conditional('dashboard')
 def dashboard(request):
     """
-    Dashboard view with analytics, charts, recent transactions, and sponsor tiers.
+    Dashboard page shell.
+
+    Only the header, filters and actions are rendered here; the analytics
+    cards are fetched concurrently by the page from ``dashboard_panel``.
     Supports optional date range filtering via GET parameters.
     """
-    context = {}
-    try:
-        user_is_treasurer = is_in_group(request.user, 'Treasurer')
-
-        # Parse optional date range filters
-        start_date_str = request.GET.get('start_date')
-        end_date_str = request.GET.get('end_date')
-        start_date = parse_date(start_date_str)
-        end_date = parse_date(end_date_str)
-
-        # Income aggregates (respect date range if provided)
-        mf_qs = ManagementFund.objects.all()
-        sp_qs = Sponsor.objects.all()
-        if start_date:
-            mf_qs = mf_qs.filter(date_received__gte=start_date)
-            sp_qs = sp_qs.filter(date_received__gte=start_date)
-        if end_date:
-            mf_qs = mf_qs.filter(date_received__lte=end_date)
-            sp_qs = sp_qs.filter(date_received__lte=end_date)
-
-        management_funds = mf_qs.aggregate(total=Sum('amount'))['total'] or 0
-        sponsor_funds = sp_qs.aggregate(total=Sum('amount'))['total'] or 0
-        total_funds = management_funds + sponsor_funds
-        total_income = total_funds  # alias for clarity in downstream KPIs
-
-        # Approved transactions with optional date filters
-        approved_transactions = Transaction.objects.filter(approved=True)
-        if start_date:
-            approved_transactions = approved_transactions.filter(date__gte=start_date)
-        if end_date:
-            approved_transactions = approved_transactions.filter(date__lte=end_date)
-
-        total_spent_val = approved_transactions.filter(amount__lt=0).aggregate(total=Sum('amount'))['total'] or 0
-        total_spent = abs(total_spent_val)
-        remaining_balance = total_funds - total_spent
-
-        # Chart Data - Category spending (expenses only)
-        category_spending = list(
-            approved_transactions.filter(amount__lt=0)
-            .values('category')
-            .annotate(total=Sum('amount'))
-            .order_by('category')
-        )
+    context = {
+        'user': request.user,
+        'is_treasurer': is_in_group(request.user, 'Treasurer'),
+        'start_date': request.GET.get('start_date') or '',
+        'end_date': request.GET.get('end_date') or '',
+        'granularity': request.GET.get('granularity') or 'month',
+    }
+    return render(request, 'tedx_finance/dashboard.html', context)
 
-        # Convert category codes to human labels
-        category_map = dict(getattr(Transaction, 'CATEGORY_CHOICES', []))
-        for item in category_spending:
-            # If not in default map, keep the raw category string (user-defined)
-            item['category'] = category_map.get(item['category'], item['category'])
-
-        income_data = [float(management_funds), float(sponsor_funds)]
-
-        # Recent and Pending Transactions
-        transactions = approved_transactions.order_by('-date')[:10]
-        pending_transactions = Transaction.objects.filter(approved=False).select_related('created_by').order_by('-date')
-
-        # Sponsor tiers (within selected date range)
-        sponsors_qs = sp_qs.order_by('-amount')
-        sponsors_with_tiers = []
-        for s in sponsors_qs:
-            tier, badge_class = get_sponsor_tier(s.amount)
-            sponsors_with_tiers.append({
-                'name': s.name,
-                'amount': float(s.amount),
-                'tier': tier,
-                'badge_class': badge_class,
-            })
 
-        # Spending Trends: within selected range, else last 6 months
-        if start_date or end_date:
-            trend_qs = approved_transactions.filter(amount__lt=0)
-        else:
-            six_months_ago = datetime.now().date() - timedelta(days=180)
-            trend_qs = approved_transactions.filter(amount__lt=0, date__gte=six_months_ago)
-
-        monthly_spending = (
-            trend_qs
-            .annotate(month=TruncMonth('date'))
-            .values('month')
-            .annotate(total=Sum('amount'))
-            .order_by('month')
-        )
+@login_required
+@ledger_conditional('dashboard_panel')
+def dashboard_panel(request, panel):
+    """
+    JSON for one dashboard panel: rendered HTML per slot plus chart data.
 
-        spending_months = [item['month'].strftime('%b %Y') for item in monthly_spending]
-        spending_amounts = [abs(float(item['total'])) for item in monthly_spending]
+    Each panel carries its own cache policy (see ``dashboard_panels.PANELS``).
+    Trend panels accept ``granularity`` (day/week/month) and ``max_points``;
+    longer series are downsampled server-side (LTTB) to that many points.
+    """
+    from django.utils.cache import patch_cache_control
+    from .charts import DEFAULT_MAX_POINTS, MAX_POINTS, MIN_POINTS
+    from .dashboard_panels import PANELS, get_panel
+    from .timeseries import GRANULARITIES
 
-        # Budget vs Actual Analysis
-        from .models import Budget
-        budgets = Budget.objects.all().order_by('category__name')
-        
-        budget_comparison = []
-        total_budget_amount = 0
-        total_budget_spent = 0
-        budget_exceeded_count = 0
-        budget_warning_count = 0
-        
-        for budget in budgets:
-            spent = budget.spent()
-            remaining = budget.remaining()
-            utilization = budget.utilization_percent()
-            
-            # Categorize budget status
-            if budget.is_exceeded():
-                status = 'exceeded'
-                budget_exceeded_count += 1
-            elif utilization >= 80:
-                status = 'warning'
-                budget_warning_count += 1
-            else:
-                status = 'healthy'
-            
-            budget_comparison.append({
-                'category': budget.category.name,
-                'budget_amount': float(budget.amount),
-                'spent': spent,
-                'remaining': remaining,
-                'utilization': utilization,
-                'status': status,
-                'start_date': budget.start_date,
-                'end_date': budget.end_date,
-            })
-            
-            total_budget_amount += float(budget.amount)
-            total_budget_spent += spent
-        
-        # Overall budget health
-        overall_budget_utilization = (total_budget_spent / total_budget_amount * 100) if total_budget_amount > 0 else 0
-        
-        # Prepare data for budget vs actual chart
-        budget_categories = [item['category'] for item in budget_comparison]
-        budget_amounts = [item['budget_amount'] for item in budget_comparison]
-        actual_amounts = [item['spent'] for item in budget_comparison]
+    if panel not in PANELS:
+        raise Http404("Unknown dashboard panel")
 
-        # ============ ENHANCED KPI CALCULATIONS ============
-        
-        # Spending Analytics (Last 30 days)
-        thirty_days_ago = datetime.now().date() - timedelta(days=30)
-        recent_approved_tx = approved_transactions.filter(date__gte=thirty_days_ago)
-        recent_spending_30d = abs(recent_approved_tx.filter(amount__lt=0).aggregate(total=Sum('amount'))['total'] or 0)
-        
-        # Burn rate (daily/weekly/monthly)
-        days_with_spending = min(30, (datetime.now().date() - thirty_days_ago).days)
-        if days_with_spending > 0:
-            daily_burn_rate = recent_spending_30d / days_with_spending
-            weekly_burn_rate = daily_burn_rate * 7
-            monthly_burn_rate = daily_burn_rate * 30
-        else:
-            daily_burn_rate = weekly_burn_rate = monthly_burn_rate = 0
-        
-        # Runway calculation (how many days until funds run out)
-        if daily_burn_rate > 0 and remaining_balance > 0:
-            runway_days = int(remaining_balance / daily_burn_rate)
-            runway_months = runway_days // 30
-        else:
-            runway_days = 0
-            runway_months = 0
-        
-        # Transaction metrics
-        total_tx_count = approved_transactions.count()
-        pending_tx_count = Transaction.objects.filter(approved=False).count()
-        recent_tx_count = recent_approved_tx.count()
-        
-        # Average transaction size
-        avg_tx_size = (total_spent / total_tx_count) if total_tx_count > 0 else 0
-        
-        # Spending velocity (transactions per day in last 30 days)
-        if days_with_spending > 0:
-            velocity = recent_tx_count / days_with_spending
-        else:
-            velocity = 0
-        
-        # Category concentration (top category spending percentage)
-        if category_spending:
-            category_totals = [abs(cat['total']) for cat in category_spending]
-            max_category_spend = max(category_totals) if category_totals else 0
-            category_concentration = (max_category_spend / total_spent * 100) if total_spent > 0 else 0
-        else:
-            category_concentration = 0
-        
-        # Growth rate (compare last 30 days to previous 30 days)
-        sixty_days_ago = datetime.now().date() - timedelta(days=60)
-        previous_30d_spending = abs(approved_transactions.filter(
-            amount__lt=0,
-            date__gte=sixty_days_ago,
-            date__lt=thirty_days_ago
-        ).aggregate(total=Sum('amount'))['total'] or 0)
-        
-        if previous_30d_spending > 0:
-            growth_rate = ((recent_spending_30d - previous_30d_spending) / previous_30d_spending) * 100
-        else:
-            growth_rate = 0 if recent_spending_30d == 0 else 100
-        
-        # Income vs Spending Ratio
-        if total_income > 0:
-            spending_ratio = (total_spent / total_income) * 100
-        else:
-            spending_ratio = 0
-        
-        # Category Trend Data - Top 3 categories over last 6 months (for trend visualization)
-        last_6_months = datetime.now().date() - timedelta(days=180)
-        
-        # Get top 3 spending categories
-        top_categories_list = list(
-            approved_transactions.filter(amount__lt=0, date__gte=last_6_months)
-            .values('category')
-            .annotate(total=Sum('amount'))
-            .order_by('total')[:3]
-        )
-        
-        category_trend_labels = []
-        category_trend_datasets = []
-        
-        if top_categories_list:
-            # Build trend data for each top category by month
-            for idx, cat_item in enumerate(top_categories_list):
-                cat_code = cat_item['category']
-                cat_name = category_map.get(cat_code, cat_code)
-                
-                # Get monthly totals for this category
-                monthly_totals = {}
-                monthly_txs = approved_transactions.filter(
-                    amount__lt=0,
-                    category=cat_code,
-                    date__gte=last_6_months
-                ).order_by('date')
-                
-                for tx in monthly_txs:
-                    month_key = tx.date.strftime('%b %Y')
-                    monthly_totals[month_key] = monthly_totals.get(month_key, 0) + abs(tx.amount)
-                
-                # Only add if has data
-                if monthly_totals and idx == 0:
-                    category_trend_labels = list(monthly_totals.keys())
-                
-                if monthly_totals:
-                    trend_data = [monthly_totals.get(label, 0) for label in category_trend_labels]
-                    colors = ['#F87171', '#60A5FA', '#34D399']
-                    category_trend_datasets.append({
-                        'label': cat_name,
-                        'data': trend_data,
-                        'borderColor': colors[idx],
-                        'backgroundColor': f'rgba({colors[idx].replace("#", "")}, 0.1)',
-                        'tension': 0.3
-                    })
-        
-        # Monthly Comparison Data (This Month vs Last Month)
-        today = datetime.now().date()
-        first_day_this_month = today.replace(day=1)
-        first_day_last_month = (first_day_this_month - timedelta(days=1)).replace(day=1)
-        last_day_last_month = first_day_this_month - timedelta(days=1)
-        
-        this_month_spending = abs(approved_transactions.filter(
-            amount__lt=0,
-            date__gte=first_day_this_month
-        ).aggregate(total=Sum('amount'))['total'] or 0)
-        
-        last_month_spending = abs(approved_transactions.filter(
-            amount__lt=0,
-            date__gte=first_day_last_month,
-            date__lte=last_day_last_month
-        ).aggregate(total=Sum('amount'))['total'] or 0)
-        
-        month_comparison_data = {
-            'this_month': this_month_spending,
-            'last_month': last_month_spending,
-            'this_month_name': first_day_this_month.strftime('%B'),
-            'last_month_name': first_day_last_month.strftime('%B'),
-            'monthly_change': ((this_month_spending - last_month_spending) / last_month_spending * 100) if last_month_spending > 0 else 0
-        }
-        
-        # Prepare KPI data for template
-        kpis = {
-            'burn_rate_daily': daily_burn_rate,
-            'burn_rate_weekly': weekly_burn_rate,
-            'burn_rate_monthly': monthly_burn_rate,
-            'runway_days': runway_days,
-            'runway_months': runway_months,
-            'total_tx_count': total_tx_count,
-            'pending_tx_count': pending_tx_count,
-            'recent_tx_count_30d': recent_tx_count,
-            'avg_tx_size': avg_tx_size,
-            'velocity_per_day': velocity,
-            'category_concentration': category_concentration,
-            'growth_rate': growth_rate,
-            'spending_ratio': spending_ratio,
-            'recent_spending_30d': recent_spending_30d,
-            'avg_transaction_size': avg_tx_size,
-        }
+    try:
+        max_points = min(max(int(request.GET.get('max_points', DEFAULT_MAX_POINTS)), MIN_POINTS), MAX_POINTS)
+    except ValueError:
+        return JsonResponse({'error': 'max_points must be an integer'}, status=400)
+    granularity = request.GET.get('granularity') or 'month'
+    if granularity not in GRANULARITIES:
+        return JsonResponse({'error': f"granularity must be one of: {', '.join(GRANULARITIES)}"}, status=400)
 
-        context = {
-            'user': request.user,
-            'total_funds': total_funds,
-            'total_spent': total_spent,
-            'remaining_balance': remaining_balance,
-            'transactions': transactions,
-            'pending_transactions': pending_transactions,
-            'category_spending': category_spending,
-            'income_data': income_data,
-            'is_treasurer': user_is_treasurer,
-            'spending_months': spending_months,
-            'spending_amounts': spending_amounts,
-            'start_date': start_date_str or '',
-            'end_date': end_date_str or '',
-            'sponsors_with_tiers': sponsors_with_tiers,
-            'management_funds_list': mf_qs.order_by('-date_received'),
-            'sponsors_list': sp_qs.order_by('-date_received'),
-            # Budget tracking data
-            'budget_comparison': budget_comparison,
-            'budget_categories': budget_categories,
-            'budget_amounts': budget_amounts,
-            'actual_amounts': actual_amounts,
-            'total_budget_amount': total_budget_amount,
-            'total_budget_spent': total_budget_spent,
-            'overall_budget_utilization': overall_budget_utilization,
-            'budget_exceeded_count': budget_exceeded_count,
-            'budget_warning_count': budget_warning_count,
-            'has_budgets': budgets.exists(),
-            # New KPI data
-            'kpis': kpis,
-            # Trend and comparison data
-            'category_trend_labels': category_trend_labels,
-            'category_trend_datasets': category_trend_datasets,
-            'month_comparison_data': month_comparison_data,
-        }
+    user_is_treasurer = is_in_group(request.user, 'Treasurer')
+    start_date = parse_date(request.GET.get('start_date'))
+    end_date = parse_date(request.GET.get('end_date'))
+    try:
+        context, data = get_panel(panel, start_date, end_date, user_is_treasurer, granularity=granularity, max_points=max_points)
     except Exception as e:
-        context['error'] = f"An unexpected error occurred: {e}"
-        logger.error(f"Error in dashboard view: {e}", exc_info=True)
+        logger.error(f"Error building dashboard panel '{panel}': {e}", exc_info=True)
+        return JsonResponse({'error': f'Could not load the {panel} panel'}, status=500)
 
-    return render(request, 'tedx_finance/dashboard.html', context)
+    context = {**context, 'user': request.user, 'is_treasurer': user_is_treasurer}
+    html = {
+        slot: render_to_string(f'tedx_finance/dashboard_panels/{slot}.html', context, request=request)
+        for slot in PANELS[panel]['slots']
+    }
+    response = JsonResponse({'panel': panel, 'html': html, 'data': data})
+    if data.get('snapshot', {}).get('stale'):
+        # A refresh is under way; the next load must fetch the new snapshot
+        patch_cache_control(response, private=True, no_store=True)
+    else:
+        patch_cache_control(response, private=True, max_age=PANELS[panel]['max_age'])
+    return response
 
 
 @login_required
+@ledger_conditional('finance_report')
 def finance_report(request):
     """
     Printable finance report view with optional date range filters.
     Shows all approved transactions, sponsors, and financial summary.
     """
+    from .timeseries import pivot_rows, spending_pivot
+
     try:
         # Parse optional date filters
         start_date_str = request.GET.get('start_date')
@@ -923,18 +596,13 @@ def finance_report(request):
 
         total_income = (mf_qs.aggregate(total=Sum('amount'))['total'] or 0) + (sp_qs.aggregate(total=Sum('amount'))['total'] or 0)
 
-        # Sponsor tiers list within selected date range
-        sponsors_with_tiers = [
-            {
-                'name': s.name,
-                'amount': float(s.amount),
-                'tier': get_sponsor_tier(s.amount)[0]
-            }
-            for s in sp_qs.order_by('-amount')
-        ]
+        # Sponsor tiers list within selected date range (tier assigned in SQL)
+        tiers = get_tiers()
+        sponsors_with_tiers = list(with_tiers(sp_qs, tiers).order_by('-amount').values('name', 'amount', 'tier'))
+        sponsor_tier_summary = tier_summary(sp_qs, tiers)
 
         # Approved transactions within range
-        tx_qs = Transaction.objects.filter(approved=True)
+        tx_qs = Transaction.objects.filter(approved=True).select_related('category_ref')
         if start_date:
             tx_qs = tx_qs.filter(date__gte=start_date)
         if end_date:
@@ -945,20 +613,55 @@ def finance_report(request):
         total_spent = abs(total_spent_val)
         net_balance = total_income - total_spent
 
+        # Monthly spending by category (top 5, rest as "Other")
+        monthly_pivot = spending_pivot(start_date, end_date, 'month', top_n=5, other=True)
+
         context = {
             'transactions': tx_qs,
+            'monthly_categories': [category['name'] for category in monthly_pivot['categories']],
+            'monthly_spending': pivot_rows(monthly_pivot),
             'total_income': total_income,
             'total_spent': total_spent,
             'net_balance': net_balance,
             'start_date': start_date_str or '',
             'end_date': end_date_str or '',
             'sponsors_with_tiers': sponsors_with_tiers,
+            'sponsor_tier_summary': sponsor_tier_summary,
         }
     except Exception as e:
         context = {'transactions': [], 'total_income': 0, 'total_spent': 0, 'net_balance': 0, 'error': str(e)}
     return render(request, 'tedx_finance/finance_report.html', context)
 
 
+@login_required
+def ledger_as_of_report(request):
+    """
+    Point-in-time finance report (Treasurer only).
+
+    ``?at=YYYY-MM-DDTHH:MM`` (or a plain date, meaning end of that day)
+    reconstructs totals and budget utilization from the history tables.
+    """
+    if not is_in_group(request.user, 'Treasurer'):
+        messages.error(request, 'Only treasurers can view historical ledger reports.')
+        return redirect('tedx_finance:dashboard')
+
+    at_str = (request.GET.get('at') or '').strip()
+    at = None
+    if at_str:
+        try:
+            at = datetime.fromisoformat(at_str)
+        except ValueError:
+            messages.error(request, 'Invalid date/time. Use YYYY-MM-DD or YYYY-MM-DDTHH:MM.')
+        else:
+            if len(at_str) == 10:
+                at = datetime.combine(at.date(), datetime.max.time())
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+    report = ledger_as_of(at)
+    return render(request, 'tedx_finance/ledger_as_of.html', {'report': report, 'at': at_str})
+
+
 @login_required
 def export_transactions_pdf(request):
     """
@@ -1003,14 +706,9 @@ def export_transactions_pdf(request):
         management_income = mf_qs.aggregate(total=Sum('amount'))['total'] or 0
         total_income = sponsor_income + management_income
         
-        sponsors_with_tiers = [
-            {
-                'name': s.name,
-                'amount': float(s.amount),
-                'tier': get_sponsor_tier(s.amount)[0]
-            }
-            for s in sp_qs.order_by('-amount')
-        ]
+        tiers = get_tiers()
+        sponsors_with_tiers = list(with_tiers(sp_qs, tiers).order_by('-amount').values('name', 'amount', 'tier'))
+        sponsor_tier_summary = tier_summary(sp_qs, tiers)
         
         # Apply comprehensive transaction filters
         tx_qs = apply_transaction_filters(request, user_is_treasurer=user_is_treasurer)
@@ -1043,6 +741,7 @@ def export_transactions_pdf(request):
             'start_date': start_date_str or '',
             'end_date': end_date_str or '',
             'sponsors_with_tiers': sponsors_with_tiers,
+            'sponsor_tier_summary': sponsor_tier_summary,
             'filter_summary': ' | '.join(filter_summary) if filter_summary else '',
             'for_pdf': True,
         }
@@ -1058,7 +757,8 @@ def export_transactions_pdf(request):
         
         # Generate PDF using xhtml2pdf
         result = io.BytesIO()
-        pdf = pisa.pisaDocument(io.BytesIO(html_string.encode("UTF-8")), result)
+        with timing_span('pdf'):
+            pdf = pisa.pisaDocument(io.BytesIO(html_string.encode("UTF-8")), result)
         
         if not pdf.err:
             response = HttpResponse(result.getvalue(), content_type='application/pdf')
@@ -1103,10 +803,13 @@ def add_transaction(request):
 def approve_transaction(request, pk):
     from .utils import log_audit_action, create_notification
     
-    transaction = get_object_or_404(Transaction, pk=pk)
+    transaction = get_object_or_404(Transaction.objects.select_related('created_by'), pk=pk)
     if request.method == 'POST':
+        if transaction.approved:
+            messages.info(request, f"Transaction '{transaction.title}' is already approved.")
+            return redirect('tedx_finance:dashboard')
         transaction.approved = True
-        transaction.save()
+        transaction.save(update_fields=['approved'])
         
         # Log audit action
         log_audit_action(
@@ -1189,43 +892,56 @@ def reject_transaction(request, pk):
 
 @permission_required('tedx_finance.change_transaction', raise_exception=True)
 def bulk_approve_transactions(request):
-    """Bulk approve multiple transactions."""
+    """
+    Bulk approve multiple transactions.
+
+    Body: {"ids": [...]} approves the given rows, or {"all_matching": true}
+    approves every pending row matching the transaction filters in the query
+    string (processed server-side in chunks). History, audit log entries and
+    notifications are written exactly as for a single approval.
+    """
+    from .approvals import approve_matching, approve_transactions
+
     if request.method == 'POST':
         try:
-            data = json.loads(request.body)
+            data = json.loads(request.body or '{}')
             transaction_ids = data.get('ids', [])
+            ip_address = getattr(request, 'client_ip', None)
             
-            if not transaction_ids:
+            if data.get('all_matching'):
+                queryset = apply_transaction_filters(request, user_is_treasurer=True)
+                result = approve_matching(queryset, request.user, ip_address=ip_address)
+            elif transaction_ids:
+                result = approve_transactions(transaction_ids, request.user, ip_address=ip_address)
+            else:
                 return JsonResponse({'success': False, 'error': 'No transaction IDs provided'}, status=400)
             
-            # Approve all transactions
-            transactions = Transaction.objects.filter(pk__in=transaction_ids)
-            count = transactions.update(approved=True)
-            
+            count = result['count']
             return JsonResponse({
                 'success': True,
                 'count': count,
+                'budgets_exceeded': result['budgets_exceeded'],
                 'message': f'{count} transaction(s) approved successfully'
             })
         except Exception as e:
+            logger.error(f"Bulk approve failed: {str(e)}", exc_info=True)
             return JsonResponse({'success': False, 'error': str(e)}, status=500)
     return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
 
 @permission_required('tedx_finance.delete_transaction', raise_exception=True)
 def bulk_reject_transactions(request):
-    """Bulk reject (delete) multiple transactions."""
+    """Bulk reject (delete) multiple transactions, notifying their submitters."""
+    from .approvals import reject_transactions
+
     if request.method == 'POST':
         try:
-            data = json.loads(request.body)
+            data = json.loads(request.body or '{}')
             transaction_ids = data.get('ids', [])
             
             if not transaction_ids:
                 return JsonResponse({'success': False, 'error': 'No transaction IDs provided'}, status=400)
             
-            # Delete all transactions
-            transactions = Transaction.objects.filter(pk__in=transaction_ids)
-            count = transactions.count()
-            transactions.delete()
+            count = reject_transactions(transaction_ids, request.user, ip_address=getattr(request, 'client_ip', None))
             
             return JsonResponse({
                 'success': True,
@@ -1233,6 +949,7 @@ def bulk_reject_transactions(request):
                 'message': f'{count} transaction(s) rejected and deleted successfully'
             })
         except Exception as e:
+            logger.error(f"Bulk reject failed: {str(e)}", exc_info=True)
             return JsonResponse({'success': False, 'error': str(e)}, status=500)
     return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
 
@@ -1414,11 +1131,6 @@ def export_transactions_xlsx(request):
             messages.warning(request, '⚠️ No transactions found matching your filters.')
             return redirect('tedx_finance:transactions_table')
         
-        # Create Excel workbook
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        )
-        
         # Build filename with filter summary
         filter_parts = []
         if request.GET.get('search'):
@@ -1430,74 +1142,79 @@ def export_transactions_xlsx(request):
         
         filter_suffix = f"_{'_'.join(filter_parts)}" if filter_parts else ''
         filename = f'tedx_transactions{filter_suffix}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
         
-        workbook = openpyxl.Workbook()
-        worksheet = workbook.active
-        worksheet.title = 'Transactions'
+        with ExportRun('xlsx', request.user) as run:
+            workbook = openpyxl.Workbook()
+            worksheet = workbook.active
+            worksheet.title = 'Transactions'
         
-        # Header row with styling
-        columns = ['Date', 'Title', 'Category', 'Amount', 'Status', 'Submitted By']
-        worksheet.append(columns)
+            # Header row with styling
+            columns = ['Date', 'Title', 'Category', 'Amount', 'Status', 'Submitted By']
+            worksheet.append(columns)
         
-        # Style header row
-        header_fill = PatternFill(start_color='4F46E5', end_color='4F46E5', fill_type='solid')
-        header_font = Font(bold=True, color='FFFFFF', size=12)
-        for col_num, column_title in enumerate(columns, 1):
-            cell = worksheet.cell(row=1, column=col_num)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
+            # Style header row
+            header_fill = PatternFill(start_color='4F46E5', end_color='4F46E5', fill_type='solid')
+            header_font = Font(bold=True, color='FFFFFF', size=12)
+            for col_num, column_title in enumerate(columns, 1):
+                cell = worksheet.cell(row=1, column=col_num)
+                cell.fill = header_fill
+                cell.font = header_font
+                cell.alignment = Alignment(horizontal='center', vertical='center')
         
-        # Data rows
-        for tx in transactions:
-            row = [
-                tx.date,
-                tx.title,
-                tx.get_category_display(),
-                float(tx.amount),
-                'Approved' if tx.approved else 'Pending',
-                tx.created_by.username if tx.created_by else 'N/A'
-            ]
-            worksheet.append(row)
+            # Data rows
+            for tx in transactions:
+                row = [
+                    tx.date,
+                    tx.title,
+                    tx.category_name,
+                    float(tx.amount),
+                    'Approved' if tx.approved else 'Pending',
+                    tx.created_by.username if tx.created_by else 'N/A'
+                ]
+                worksheet.append(row)
+                run.add_rows()
         
-        # Auto-adjust column widths
-        for col_num, column_cells in enumerate(worksheet.columns, 1):
-            max_length = 0
-            column = get_column_letter(col_num)
-            for cell in column_cells:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)  # Cap at 50 characters
-            worksheet.column_dimensions[column].width = adjusted_width
+            # Auto-adjust column widths
+            for col_num, column_cells in enumerate(worksheet.columns, 1):
+                max_length = 0
+                column = get_column_letter(col_num)
+                for cell in column_cells:
+                    try:
+                        if len(str(cell.value)) > max_length:
+                            max_length = len(str(cell.value))
+                    except:
+                        pass
+                adjusted_width = min(max_length + 2, 50)  # Cap at 50 characters
+                worksheet.column_dimensions[column].width = adjusted_width
         
-        # Add summary row
-        row_count = worksheet.max_row
-        total_amount = sum(float(tx.amount) for tx in transactions)
-        summary_row = [
-            '',
-            '',
-            'TOTAL',
-            total_amount,
-            '',
-            f'{transactions.count()} transactions'
-        ]
-        worksheet.append(summary_row)
+            # Add summary row
+            row_count = worksheet.max_row
+            total_amount = sum(float(tx.amount) for tx in transactions)
+            summary_row = [
+                '',
+                '',
+                'TOTAL',
+                total_amount,
+                '',
+                f'{transactions.count()} transactions'
+            ]
+            worksheet.append(summary_row)
         
-        # Style summary row
-        summary_fill = PatternFill(start_color='E5E7EB', end_color='E5E7EB', fill_type='solid')
-        summary_font = Font(bold=True)
-        for col_num in range(1, 6):
-            cell = worksheet.cell(row=row_count + 1, column=col_num)
-            cell.fill = summary_fill
-            cell.font = summary_font
+            # Style summary row
+            summary_fill = PatternFill(start_color='E5E7EB', end_color='E5E7EB', fill_type='solid')
+            summary_font = Font(bold=True)
+            for col_num in range(1, 6):
+                cell = worksheet.cell(row=row_count + 1, column=col_num)
+                cell.fill = summary_fill
+                cell.font = summary_font
         
-        workbook.save(response)
-        return response
+            with timing_span('xlsx'):
+                workbook.save(run.output)
+        return run.response('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', filename)
         
+    except ExportMemoryExceeded:
+        messages.error(request, '❌ This export is too large to generate at once. Narrow the filters and try again.')
+        return redirect('tedx_finance:transactions_table')
     except Exception as e:
         logger.error(f"Error exporting transactions to Excel: {str(e)}", exc_info=True)
         messages.error(request, f'❌ Failed to export Excel file: {str(e)}')
@@ -1531,7 +1248,7 @@ def export_transactions_with_proofs(request):
         end_date = parse_date(end_date_str)
 
         # Query approved transactions
-        transactions = Transaction.objects.filter(approved=True)
+        transactions = Transaction.objects.filter(approved=True).select_related('created_by', 'category_ref')
         if start_date:
             transactions = transactions.filter(date__gte=start_date)
         if end_date:
@@ -1542,10 +1259,8 @@ def export_transactions_with_proofs(request):
             messages.warning(request, '⚠️ No approved transactions found for the selected date range.')
             return redirect('tedx_finance:transactions_table')
         
-        # Create in-memory ZIP file
-        zip_buffer = io.BytesIO()
-        
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        # Build the ZIP in the export's output (moved to disk if memory runs high)
+        with ExportRun('zip', request.user) as run, zipfile.ZipFile(run.output, 'w', zipfile.ZIP_DEFLATED) as zip_file:
             # --- 1. Create Excel report ---
             workbook = openpyxl.Workbook()
             worksheet = workbook.active
@@ -1573,12 +1288,13 @@ def export_transactions_with_proofs(request):
                 row = [
                     tx.date,
                     tx.title,
-                    tx.get_category_display(),
+                    tx.category_name,
                     float(tx.amount),
                     tx.created_by.username if tx.created_by else 'N/A',
                     proof_filename or 'No proof uploaded'
                 ]
                 worksheet.append(row)
+                run.add_rows()
             
             # Auto-adjust column widths
             for col_num, column_cells in enumerate(worksheet.columns, 1):
@@ -1616,7 +1332,8 @@ def export_transactions_with_proofs(request):
             
             # Save Excel to buffer
             excel_buffer = io.BytesIO()
-            workbook.save(excel_buffer)
+            with timing_span('xlsx'):
+                workbook.save(excel_buffer)
             excel_buffer.seek(0)
             
             # Add Excel to ZIP
@@ -1634,11 +1351,14 @@ def export_transactions_with_proofs(request):
                         file_extension = os.path.splitext(tx.proof.name)[1]
                         proof_path = f"{folder_name}/proof{file_extension}"
                         
-                        # Read proof file and add to ZIP
+                        # Copy the proof into the ZIP in chunks rather than reading it whole
                         if default_storage.exists(tx.proof.name):
-                            with default_storage.open(tx.proof.name, 'rb') as proof_file:
-                                zip_file.writestr(proof_path, proof_file.read())
+                            with default_storage.open(tx.proof.name, 'rb') as proof_file, zip_file.open(proof_path, 'w') as entry:
+                                shutil.copyfileobj(proof_file, entry, 1024 * 1024)
                                 proofs_added += 1
+                        run.check()
+                    except ExportMemoryExceeded:
+                        raise
                     except Exception as e:
                         logger.warning(f"Could not add proof for transaction {tx.id}: {str(e)}")
             
@@ -1672,14 +1392,14 @@ For questions, contact the TEDx Finance Team.
 """
             zip_file.writestr('README.txt', readme_content)
         
-        # Prepare ZIP response
-        zip_buffer.seek(0)
-        response = HttpResponse(zip_buffer.read(), content_type='application/zip')
-        response['Content-Disposition'] = f'attachment; filename="tedx_report_with_proofs_{timestamp}.zip"'
+        response = run.response('application/zip', f'tedx_report_with_proofs_{timestamp}.zip')
         
         messages.success(request, f'✅ Exported {transactions.count()} transactions with {proofs_added} proof files!')
         return response
         
+    except ExportMemoryExceeded:
+        messages.error(request, '❌ This ZIP export is too large to generate at once. Choose a shorter date range and try again.')
+        return redirect('tedx_finance:transactions_table')
     except Exception as e:
         logger.error(f"Error exporting ZIP with proofs: {str(e)}", exc_info=True)
         messages.error(request, f'❌ Failed to export ZIP file: {str(e)}')
@@ -1731,11 +1451,7 @@ def import_transactions(request):
                             continue
                         
                         # Ensure category exists in Category table (create if missing)
-                        if category:
-                            try:
-                                Category.objects.get_or_create(name=category)
-                            except Exception:
-                                pass
+                        category_ref, _ = Category.objects.get_or_create(name=category[:50])
                         
                         # Find or default user
                         user = None
@@ -1751,7 +1467,8 @@ def import_transactions(request):
                         Transaction.objects.create(
                             title=title,
                             amount=amount,
-                            category=category,
+                            category=category_ref.name,
+                            category_ref=category_ref,
                             date=date_val,
                             created_by=user,
                             approved=False
@@ -1829,12 +1546,117 @@ def manage_categories(request):
     })
 
 
+PROOF_GALLERY_PAGE_SIZE = 24
+
+
+def build_proof_queryset(request):
+    """
+    Approved transactions with an uploaded proof, filtered by the gallery parameters.
+
+    Shared by the gallery, its JSON feed and the proof exports so they always
+    agree on what is shown. Ordered newest first on the (date, id) keyset used
+    by the feed cursors.
+    """
+    search_query = request.GET.get('search', '').strip()
+    category_filter = request.GET.get('category', '')
+    start_date = parse_date(request.GET.get('start_date', ''))
+    end_date = parse_date(request.GET.get('end_date', ''))
+
+    transactions = (
+        Transaction.objects.filter(approved=True, proof__isnull=False)
+        .exclude(proof='')
+        .select_related('created_by', 'category_ref')
+    )
+    if search_query:
+        transactions = transactions.filter(
+            Q(title__icontains=search_query) |
+            Q(created_by__username__icontains=search_query)
+        )
+    if category_filter:
+        transactions = transactions.filter(category_ref__name=category_filter)
+    if start_date:
+        transactions = transactions.filter(date__gte=start_date)
+    if end_date:
+        transactions = transactions.filter(date__lte=end_date)
+    return transactions.order_by('-date', '-id')
+
+
+def encode_proof_cursor(tx):
+    """Opaque keyset cursor for a gallery row: '<iso date>.<id>'."""
+    return f"{tx.date.isoformat()}.{tx.id}"
+
+
+def decode_proof_cursor(cursor):
+    """Return (date, id) from a cursor string, or None if it is malformed."""
+    try:
+        date_str, id_str = (cursor or '').split('.', 1)
+        return datetime.strptime(date_str, '%Y-%m-%d').date(), int(id_str)
+    except (ValueError, TypeError):
+        return None
+
+
+def paginate_proofs(queryset, after=None, before=None, page_size=PROOF_GALLERY_PAGE_SIZE):
+    """
+    Keyset-paginate a queryset from build_proof_queryset().
+
+    ``after`` returns the rows following a cursor (scrolling down), ``before``
+    the rows preceding it (scrolling back up from a deep link). Only
+    ``page_size + 1`` rows are fetched, regardless of how deep the page is.
+
+    Returns:
+        (rows, next_cursor, prev_cursor)
+    """
+    if before:
+        date_val, id_val = before
+        rows = list(
+            queryset.filter(Q(date__gt=date_val) | Q(date=date_val, id__gt=id_val))
+            .order_by('date', 'id')[:page_size + 1]
+        )
+        has_previous = len(rows) > page_size
+        rows = list(reversed(rows[:page_size]))
+        prev_cursor = encode_proof_cursor(rows[0]) if has_previous and rows else None
+        next_cursor = encode_proof_cursor(rows[-1]) if rows else None
+        return rows, next_cursor, prev_cursor
+
+    if after:
+        date_val, id_val = after
+        queryset = queryset.filter(Q(date__lt=date_val) | Q(date=date_val, id__lt=id_val))
+    rows = list(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = encode_proof_cursor(rows[-1]) if has_more and rows else None
+    return rows, next_cursor, None
+
+
+def serialize_proof(tx):
+    """JSON representation of a gallery row for the lazy-loading feed."""
+    from .file_serving import is_thumbnailable
+
+    proof_url = reverse('tedx_finance:serve_proof', args=[tx.pk])
+    return {
+        'id': tx.id,
+        'title': tx.title,
+        'amount': str(tx.amount),
+        'date': tx.date.isoformat(),
+        'category': tx.category_name,
+        'created_by': tx.created_by.username if tx.created_by else None,
+        'proof_url': proof_url,
+        'thumbnail_url': reverse('tedx_finance:serve_proof_thumbnail', args=[tx.pk]) if is_thumbnailable(tx.proof.name) else None,
+        'is_pdf': tx.proof.name.lower().endswith('.pdf'),
+        'cursor': encode_proof_cursor(tx),
+    }
+
+
 @login_required
+@ledger_conditional('proof_gallery')
 def proof_gallery(request):
     """
     Gallery view of all transaction proofs with thumbnails and lightbox.
     Shows only approved transactions with uploaded proof files.
     Includes filtering by category and date range.
+
+    Only the first page is rendered; the rest is loaded from proof_gallery_feed
+    as the user scrolls. A ``tx_id`` deep link starts the page at that proof.
     """
     user_is_treasurer = is_in_group(request.user, 'Treasurer')
     
@@ -1844,32 +1666,35 @@ def proof_gallery(request):
     start_date_str = request.GET.get('start_date', '')
     end_date_str = request.GET.get('end_date', '')
     tx_id_param = request.GET.get('tx_id', '')  # For auto-opening specific transaction
-    start_date = parse_date(start_date_str)
-    end_date = parse_date(end_date_str)
-    
-    # Query transactions with proofs
-    transactions = Transaction.objects.filter(approved=True, proof__isnull=False).exclude(proof='')
-    transactions = transactions.select_related('created_by')
-    
-    if search_query:
-        transactions = transactions.filter(
-            Q(title__icontains=search_query) | 
-            Q(created_by__username__icontains=search_query)
-        )
-    if category_filter:
-        transactions = transactions.filter(category=category_filter)
-    if start_date:
-        transactions = transactions.filter(date__gte=start_date)
-    if end_date:
-        transactions = transactions.filter(date__lte=end_date)
-    
-    transactions = transactions.order_by('-date')
     
+    transactions = build_proof_queryset(request)
+
+    # Deep link: start the page at the requested proof instead of walking earlier pages
+    deep_link_tx = None
+    if tx_id_param.isdigit():
+        deep_link_tx = transactions.filter(pk=int(tx_id_param)).values('id', 'date').first()
+        if deep_link_tx is None:
+            tx_id_param = ''
+
+    if deep_link_tx:
+        # Inclusive start: everything after the row just "before" the linked one
+        link_date, link_id = deep_link_tx['date'], deep_link_tx['id']
+        first_page = transactions.filter(Q(date__lt=link_date) | Q(date=link_date, id__lte=link_id))
+        page, next_cursor, _ = paginate_proofs(first_page)
+        has_earlier = transactions.filter(Q(date__gt=link_date) | Q(date=link_date, id__gt=link_id)).exists()
+        prev_cursor = f"{link_date.isoformat()}.{link_id}" if has_earlier else None
+    else:
+        page, next_cursor, prev_cursor = paginate_proofs(transactions)
+
     # Get unique categories for filter dropdown
     categories = get_cached_category_choices()
     
     context = {
-        'transactions': transactions,
+        'transactions': page,
+        'proof_items': [serialize_proof(tx) for tx in page],
+        'total_count': transactions.count(),
+        'next_cursor': next_cursor or '',
+        'prev_cursor': prev_cursor or '',
         'categories': categories,
         'search_query': search_query,
         'category_filter': category_filter,
@@ -1881,6 +1706,74 @@ def proof_gallery(request):
     return render(request, 'tedx_finance/proof_gallery.html', context)
 
 
+@login_required
+@ledger_conditional('proof_gallery_feed')
+def proof_gallery_feed(request):
+    """
+    JSON feed for the proof gallery's infinite scroll.
+
+    Accepts the gallery filters plus ``after`` or ``before`` cursors and
+    returns one page of proofs with thumbnail URLs.
+    """
+    transactions = build_proof_queryset(request)
+    after = decode_proof_cursor(request.GET.get('after')) if request.GET.get('after') else None
+    before = decode_proof_cursor(request.GET.get('before')) if request.GET.get('before') else None
+    if (request.GET.get('after') and after is None) or (request.GET.get('before') and before is None):
+        return JsonResponse({'success': False, 'error': 'Invalid cursor'}, status=400)
+
+    page, next_cursor, prev_cursor = paginate_proofs(transactions, after=after, before=before)
+    return JsonResponse({
+        'success': True,
+        'items': [serialize_proof(tx) for tx in page],
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor,
+    })
+
+
+def _get_viewable_proof_transaction(request, pk):
+    """Fetch a transaction whose proof the current user may view, or raise 404/403."""
+    tx = get_object_or_404(Transaction.objects.only('id', 'proof', 'approved', 'created_by_id'), pk=pk)
+    if not tx.proof:
+        raise Http404('No proof uploaded for this transaction.')
+
+    if not tx.approved and tx.created_by_id != request.user.id and not is_in_group(request.user, 'Treasurer'):
+        raise PermissionDenied
+
+    if not tx.proof.storage.exists(tx.proof.name):
+        logger.warning(f"Proof file missing from storage for transaction {tx.id}: {tx.proof.name}")
+        raise Http404('Proof file not found.')
+    return tx
+
+
+@login_required
+def serve_proof(request, pk):
+    """
+    Serve a transaction's proof file after checking access.
+
+    Approved proofs are visible to every signed-in member (same as the gallery);
+    pending proofs only to treasurers and the submitter. Delivery is delegated
+    to the front-end server when PROOF_SERVE_METHOD is configured.
+    """
+    from .file_serving import serve_protected_file
+
+    tx = _get_viewable_proof_transaction(request, pk)
+    return serve_protected_file(request, tx.proof, as_attachment=request.GET.get('download') == '1')
+
+
+@login_required
+def serve_proof_thumbnail(request, pk):
+    """Serve a small JPEG thumbnail of an image proof (generated on first request)."""
+    from django.db.models.fields.files import FieldFile
+    from .file_serving import get_or_create_thumbnail, serve_protected_file
+
+    tx = _get_viewable_proof_transaction(request, pk)
+    thumb_name = get_or_create_thumbnail(tx.proof)
+    if not thumb_name:
+        raise Http404('No thumbnail available for this proof.')
+    thumbnail = FieldFile(tx, tx.proof.field, thumb_name)
+    return serve_protected_file(request, thumbnail)
+
+
 @login_required
 @permission_required('tedx_finance.change_transaction', raise_exception=True)
 def bulk_upload_proofs(request):
@@ -1919,7 +1812,7 @@ def bulk_upload_proofs(request):
                         raise Transaction.DoesNotExist
                     tx = Transaction.objects.get(id=tx_id, approved=False)
                     tx.proof = file
-                    tx.save()
+                    tx.save(update_fields=['proof'])
                     success_count += 1
                     
                     # Create notification
@@ -1941,7 +1834,7 @@ def bulk_upload_proofs(request):
                         tx_id = match.group(1)
                         tx = Transaction.objects.get(id=tx_id)
                         tx.proof = file
-                        tx.save()
+                        tx.save(update_fields=['proof'])
                         success_count += 1
                     else:
                         error_count += 1
@@ -1968,7 +1861,7 @@ def bulk_upload_proofs(request):
     # GET: Show upload form with pending transactions
     pending_transactions = Transaction.objects.filter(
         approved=False
-    ).select_related('created_by').order_by('-date')[:50]  # Limit to recent 50
+    ).select_related('created_by', 'category_ref').order_by('-date')[:50]  # Limit to recent 50
     
     context = {
         'pending_transactions': pending_transactions,
@@ -2011,7 +1904,7 @@ def quick_add_category(request):
 
 @login_required
 def quick_rename_category(request):
-    """AJAX: rename a Category and cascade to Transaction.category strings (Treasurer only)."""
+    """AJAX: rename a Category (Treasurer only); transactions follow via category_ref."""
     if not is_in_group(request.user, 'Treasurer'):
         return JsonResponse({'success': False, 'error': 'Forbidden'}, status=403)
     if request.method != 'POST':
@@ -2035,13 +1928,10 @@ def quick_rename_category(request):
             cat, _ = Category.objects.get_or_create(name=old_name)
         if not cat:
             return JsonResponse({'success': False, 'error': 'Category not found'}, status=404)
-        # Rename
-        prev_name = cat.name
+        # Rename: a single-row update, transactions reference the row by id
         cat.name = new_name
-        cat.save()
+        cat.save(update_fields=['name'])
         invalidate_category_cache()
-        # Update Transaction rows that used the old string value
-        Transaction.objects.filter(category=prev_name).update(category=new_name)
         # Build merged list
         try:
             dynamic = list(Category.objects.all().values_list('name', 'name'))
@@ -2066,23 +1956,8 @@ def export_proofs_to_csv(request):
     Includes transaction details and proof file URLs.
     """
     
-    # Apply same filters as proof_gallery view
-    category_filter = request.GET.get('category', '')
-    start_date_str = request.GET.get('start_date', '')
-    end_date_str = request.GET.get('end_date', '')
-    start_date = parse_date(start_date_str)
-    end_date = parse_date(end_date_str)
-    
-    transactions = Transaction.objects.filter(approved=True, proof__isnull=False).exclude(proof='')
-    
-    if category_filter:
-        transactions = transactions.filter(category=category_filter)
-    if start_date:
-        transactions = transactions.filter(date__gte=start_date)
-    if end_date:
-        transactions = transactions.filter(date__lte=end_date)
-    
-    transactions = transactions.order_by('-date')
+    # Same rows as the proof gallery
+    transactions = build_proof_queryset(request)
     
     # Create CSV response
     response = HttpResponse(content_type='text/csv')
@@ -2090,16 +1965,16 @@ def export_proofs_to_csv(request):
     response['Content-Disposition'] = f'attachment; filename="proof_gallery_{timestamp}.csv"'
     
     writer = csv.writer(response)
-    writer.writerow(['Date', 'Title', 'Category', 'Amount (₹)', 'Description', 'Proof File'])
+    writer.writerow(['Date', 'Title', 'Category', 'Amount (₹)', 'Status', 'Proof File'])
     
     for tx in transactions:
-        proof_url = request.build_absolute_uri(tx.proof.url) if tx.proof else ''
+        proof_url = request.build_absolute_uri(reverse('tedx_finance:serve_proof', args=[tx.pk])) if tx.proof else ''
         writer.writerow([
             tx.date.strftime('%Y-%m-%d'),
             tx.title,
-            tx.category,
+            tx.category_name,
             f"{tx.amount:.2f}",
-            tx.description or '',
+            'Approved' if tx.approved else 'Pending',
             proof_url
         ])
     
@@ -2123,110 +1998,105 @@ def export_proofs_to_pdf(request):
         messages.error(request, 'PDF export requires reportlab library. Please install: pip install reportlab')
         return redirect('proof_gallery')
     
-    # Apply same filters as proof_gallery view
+    # Same rows as the proof gallery
     category_filter = request.GET.get('category', '')
-    start_date_str = request.GET.get('start_date', '')
-    end_date_str = request.GET.get('end_date', '')
-    start_date = parse_date(start_date_str)
-    end_date = parse_date(end_date_str)
-    
-    transactions = Transaction.objects.filter(approved=True, proof__isnull=False).exclude(proof='')
-    
-    if category_filter:
-        transactions = transactions.filter(category=category_filter)
-    if start_date:
-        transactions = transactions.filter(date__gte=start_date)
-    if end_date:
-        transactions = transactions.filter(date__lte=end_date)
+    start_date = parse_date(request.GET.get('start_date', ''))
+    end_date = parse_date(request.GET.get('end_date', ''))
+    transactions = build_proof_queryset(request)
     
-    transactions = transactions.order_by('-date')
-    
-    # Create PDF response
-    response = HttpResponse(content_type='application/pdf')
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    response['Content-Disposition'] = f'attachment; filename="proof_gallery_{timestamp}.pdf"'
-    
-    # Create PDF document
-    doc = SimpleDocTemplate(response, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#DC2626'),
-        spaceAfter=30,
-        alignment=TA_CENTER
-    )
-    elements.append(Paragraph('TEDx Proof Gallery Report', title_style))
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Filters info
-    if category_filter or start_date or end_date:
-        info_style = styles['Normal']
-        filter_text = 'Filters: '
-        filters_applied = []
-        if category_filter:
-            filters_applied.append(f"Category: {category_filter}")
-        if start_date:
-            filters_applied.append(f"From: {start_date.strftime('%Y-%m-%d')}")
-        if end_date:
-            filters_applied.append(f"To: {end_date.strftime('%Y-%m-%d')}")
-        filter_text += ', '.join(filters_applied)
-        elements.append(Paragraph(filter_text, info_style))
-        elements.append(Spacer(1, 0.2*inch))
     
-    # Table data
-    data = [['Date', 'Title', 'Category', 'Amount (₹)']]
-    total_amount = 0
+    def check_memory(canvas, doc):
+        run.check()
     
-    for tx in transactions:
-        data.append([
-            tx.date.strftime('%Y-%m-%d'),
-            tx.title[:30] + '...' if len(tx.title) > 30 else tx.title,
-            tx.category[:20] if tx.category else '',
-            f"₹{tx.amount:,.2f}"
-        ])
-        total_amount += tx.amount
-    
-    # Add total row
-    data.append(['', '', 'Total:', f"₹{total_amount:,.2f}"])
-    
-    # Create table
-    table = Table(data, colWidths=[1.5*inch, 2.5*inch, 1.8*inch, 1.5*inch])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#DC2626')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('ALIGN', (3, 0), (3, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
-        ('GRID', (0, 0), (-1, -2), 1, colors.black),
-        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#FEE2E2')),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('LINEABOVE', (0, -1), (-1, -1), 2, colors.HexColor('#DC2626')),
-    ]))
-    
-    elements.append(table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Footer
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.grey
-    )
-    elements.append(Paragraph(f'Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', footer_style))
-    elements.append(Paragraph(f'Total Transactions: {len(transactions)}', footer_style))
+    try:
+        with ExportRun('proofs_pdf', request.user) as run:
+            # Create PDF document
+            doc = SimpleDocTemplate(run.output, pagesize=A4)
+            elements = []
+            styles = getSampleStyleSheet()
+    
+            # Title
+            title_style = ParagraphStyle(
+                'CustomTitle',
+                parent=styles['Heading1'],
+                fontSize=24,
+                textColor=colors.HexColor('#DC2626'),
+                spaceAfter=30,
+                alignment=TA_CENTER
+            )
+            elements.append(Paragraph('TEDx Proof Gallery Report', title_style))
+            elements.append(Spacer(1, 0.3*inch))
+    
+            # Filters info
+            if category_filter or start_date or end_date:
+                info_style = styles['Normal']
+                filter_text = 'Filters: '
+                filters_applied = []
+                if category_filter:
+                    filters_applied.append(f"Category: {category_filter}")
+                if start_date:
+                    filters_applied.append(f"From: {start_date.strftime('%Y-%m-%d')}")
+                if end_date:
+                    filters_applied.append(f"To: {end_date.strftime('%Y-%m-%d')}")
+                filter_text += ', '.join(filters_applied)
+                elements.append(Paragraph(filter_text, info_style))
+                elements.append(Spacer(1, 0.2*inch))
+    
+            # Table data
+            data = [['Date', 'Title', 'Category', 'Amount (₹)']]
+            total_amount = 0
     
-    # Build PDF
-    doc.build(elements)
-    return response
+            for tx in transactions:
+                data.append([
+                    tx.date.strftime('%Y-%m-%d'),
+                    tx.title[:30] + '...' if len(tx.title) > 30 else tx.title,
+                    tx.category_name[:20] if tx.category_name else '',
+                    f"₹{tx.amount:,.2f}"
+                ])
+                total_amount += tx.amount
+                run.add_rows()
+    
+            # Add total row
+            data.append(['', '', 'Total:', f"₹{total_amount:,.2f}"])
+    
+            # Create table
+            table = Table(data, colWidths=[1.5*inch, 2.5*inch, 1.8*inch, 1.5*inch])
+            table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#DC2626')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                ('ALIGN', (3, 0), (3, -1), 'RIGHT'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 12),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
+                ('GRID', (0, 0), (-1, -2), 1, colors.black),
+                ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#FEE2E2')),
+                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+                ('LINEABOVE', (0, -1), (-1, -1), 2, colors.HexColor('#DC2626')),
+            ]))
+    
+            elements.append(table)
+            elements.append(Spacer(1, 0.3*inch))
+    
+            # Footer
+            footer_style = ParagraphStyle(
+                'Footer',
+                parent=styles['Normal'],
+                fontSize=8,
+                textColor=colors.grey
+            )
+            elements.append(Paragraph(f'Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', footer_style))
+            elements.append(Paragraph(f'Total Transactions: {len(transactions)}', footer_style))
+    
+            # Build PDF, checking memory as each page is laid out
+            with timing_span('pdf'):
+                doc.build(elements, onFirstPage=check_memory, onLaterPages=check_memory)
+    except ExportMemoryExceeded:
+        messages.error(request, '❌ This PDF is too large to generate at once. Narrow the filters and try again.')
+        return redirect('tedx_finance:proof_gallery')
+    return run.response('application/pdf', f'proof_gallery_{timestamp}.pdf')
 
 
 # ============================================================================
@@ -2260,6 +2130,26 @@ def settings_view(request):
     return render(request, 'tedx_finance/settings.html', context)
 
 
+@login_required
+def performance_dashboard(request):
+    """
+    Staff-only performance page.
+
+    Slowest endpoints, query counts per view and export durations come from
+    the sampled requests of the last hour (or ``?window=day``); cache hit
+    ratios, table sizes and media usage are current values.
+    """
+    if not request.user.is_staff:
+        messages.error(request, 'Only staff can view the performance page.')
+        return redirect('tedx_finance:dashboard')
+
+    window = request.GET.get('window', 'hour')
+    if window not in PERFORMANCE_WINDOWS:
+        window = 'hour'
+    report = performance_report(window)
+    return render(request, 'tedx_finance/performance.html', {'report': report, 'windows': list(PERFORMANCE_WINDOWS)})
+
+
 # ============================================================================
 # NOTIFICATIONS VIEWS
 # ============================================================================
@@ -2286,7 +2176,7 @@ def notifications_list(request):
         'page_obj': page_obj,
         'notifications': page_obj.object_list,
         'unread_count': unread_count,
-        'total_notifications': notifications.count(),
+        'total_notifications': paginator.count,
     }
     
     return render(request, 'tedx_finance/notifications.html', context)
@@ -2309,7 +2199,7 @@ def mark_notification_read(request, pk):
     try:
         notification = Notification.objects.get(pk=pk, user=request.user)
         notification.is_read = True
-        notification.save()
+        notification.save(update_fields=['is_read'])
         
         # Get remaining unread count
         unread_count = Notification.objects.filter(user=request.user, is_read=False).count()